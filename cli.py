@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Консольна утиліта для пакетної обробки файлів проектів без GUI.
+
+Приклади:
+    python cli.py validate projects/*.xml
+    python cli.py stats "archive/**/*.xml" --workers 16
+    python cli.py convert site.xml --to tsb --output-dir out/
+    python cli.py paths site.xml
+    python cli.py montecarlo site.xml --runs 1000000 --seed 1
+
+Результат виводиться у stdout як JSON. Код завершення 1 означає,
+що хоча б один файл не вдалося обробити або він містить помилки валідації.
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+# Лише Qt-незалежне ядро: утиліта не потребує PyQt6
+from core.project_io import read_project_file, write_project_file
+from core.binary_format import BINARY_EXTENSION
+from core.validator import validate_project_data
+from core.diagnostics import count_severities
+from core.validation_cache import shared_cache # Однакові сценарії у різних файлах воркера перевіряються один раз
+from core.compiler import compile_scenario # Програми однакових сценаріїв кешуються
+from core.path_analysis import enumerate_program_paths
+from core.simulation import DEFAULT_MAX_STEPS
+from core.monte_carlo import run_monte_carlo, DEFAULT_BIN_SECONDS
+
+log = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'xml': '.xml', 'tsb': BINARY_EXTENSION}
+MISSING_REF_RULES = {'missing_zone': 'zones', 'missing_output': 'outputs', 'missing_user': 'users'}
+
+
+def expand_paths(patterns):
+    """Розгортає шаблони (glob, у т.ч. **) у відсортований список файлів без дублікатів."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            log.warning(f"Pattern matched no files: {pattern}")
+        for path in matches:
+            if path not in seen and not os.path.isdir(path):
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def _diagnostics_to_json(report):
+    return {section: {item_id: [d._asdict() for d in diagnostics]
+                      for item_id, diagnostics in items.items() if diagnostics}
+            for section, items in report.items()}
+
+
+def _count_rules(report, rules):
+    counts = {}
+    for items in report.values():
+        for diagnostics in items.values():
+            for d in diagnostics:
+                if d.rule in rules:
+                    counts[d.rule] = counts.get(d.rule, 0) + 1
+    return counts
+
+
+def command_validate(path, project_data, args):
+    report = validate_project_data(project_data, shared_cache)
+    errors, warnings = count_severities(d for items in report.values() for group in items.values() for d in group)
+    return {'ok': errors == 0, 'errors': errors, 'warnings': warnings, 'diagnostics': _diagnostics_to_json(report)}
+
+
+def command_stats(path, project_data, args):
+    report = validate_project_data(project_data, shared_cache)
+    scenarios = project_data.get('scenarios', {})
+    config = project_data.get('config', {})
+    rule_counts = _count_rules(report, {'unreachable', *MISSING_REF_RULES})
+    return {
+        'ok': True,
+        'scenarios': len(scenarios),
+        'macros': len(project_data.get('macros', {})),
+        'nodes': sum(len(s.get('nodes', [])) for s in scenarios.values()),
+        'connections': sum(len(s.get('connections', [])) for s in scenarios.values()),
+        'devices': len(config.get('devices', [])),
+        'zones': sum(len(d.get('zones', [])) for d in config.get('devices', [])),
+        'outputs': sum(len(d.get('outputs', [])) for d in config.get('devices', [])),
+        'users': len(config.get('users', [])),
+        'unreachable_nodes': rule_counts.get('unreachable', 0),
+        'missing_refs': {name: rule_counts.get(rule, 0) for rule, name in MISSING_REF_RULES.items()},
+    }
+
+
+def command_paths(path, project_data, args):
+    macros = project_data.get('macros', {})
+    scenarios = {}
+    for scenario_id, scenario_data in project_data.get('scenarios', {}).items():
+        program = compile_scenario(scenario_data, macros)
+        node_types = program.node_types
+        scenarios[scenario_id] = [
+            {'zone': outcome.zone_id,
+             'conditions': {zone_id: list(states) for zone_id, states in outcome.conditions},
+             'actions': [{'id': node_id, 'type': node_types[program.index[node_id]]} for node_id in outcome.actions],
+             'status': outcome.status}
+            for outcome in enumerate_program_paths(program, max_steps=args.max_steps)]
+    return {'ok': True, 'scenarios': scenarios}
+
+
+def command_montecarlo(path, project_data, args):
+    macros = project_data.get('macros', {})
+    scenarios = {}
+    for scenario_id, scenario_data in project_data.get('scenarios', {}).items():
+        if args.scenario and scenario_id not in args.scenario:
+            continue
+        if hasattr(scenario_data, 'decode'):
+            scenario_data = scenario_data.decode()
+        try:
+            stats = run_monte_carlo(scenario_data, args.runs, args.seed, zone_probabilities=args.zone_probabilities,
+                                    state_probabilities=args.state_probabilities, macros=macros,
+                                    workers=args.workers, max_steps=args.max_steps, bin_seconds=args.bin_seconds)
+        except ValueError as e: # Немає зон тригера
+            scenarios[scenario_id] = {'error': str(e)}
+            continue
+        scenarios[scenario_id] = stats.to_dict()
+    return {'ok': True, 'scenarios': scenarios}
+
+
+def command_convert(path, project_data, args):
+    target_ext = FORMAT_EXTENSIONS[args.to]
+    base_name = os.path.splitext(os.path.basename(path))[0] + target_ext
+    target_dir = args.output_dir or os.path.dirname(path)
+    target_path = os.path.join(target_dir, base_name)
+    if os.path.abspath(target_path) == os.path.abspath(path):
+        return {'ok': False, 'error': "Source and target are the same file."}
+    if target_dir:
+        os.makedirs(target_dir, exist_ok=True)
+    write_project_file(target_path, project_data)
+    return {'ok': True, 'output': target_path, 'size': os.path.getsize(target_path)}
+
+
+COMMANDS = {
+    'validate': command_validate,
+    'stats': command_stats,
+    'convert': command_convert,
+    'paths': command_paths,
+    'montecarlo': command_montecarlo,
+}
+# Команди, які самі розпаралелюють роботу всередині файлу: файли обробляються послідовно
+IN_FILE_PARALLEL_COMMANDS = {'montecarlo'}
+
+
+def process_file(path, args):
+    """Обробляє один файл (виконується у процесі-воркері). Помилки повертаються у результаті."""
+    try:
+        project_data = read_project_file(path, streaming=True)
+        result = COMMANDS[args.command](path, project_data, args)
+    except Exception as e:
+        log.debug(f"Failed to process {path}: {e}", exc_info=True)
+        result = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+    result['path'] = path
+    return result
+
+
+def _process_file_star(item):
+    return process_file(*item)
+
+
+def run(args):
+    paths = expand_paths(args.files)
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    if workers > 1 and len(paths) > 1 and args.command not in IN_FILE_PARALLEL_COMMANDS:
+        # chunksize зменшує накладні витрати на передачу задач для тисяч дрібних файлів
+        chunksize = max(1, len(paths) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_process_file_star, ((p, args) for p in paths), chunksize=chunksize))
+    else:
+        results = [process_file(p, args) for p in paths]
+    failed = sum(1 for r in results if not r.get('ok'))
+    return {'command': args.command, 'files': len(results), 'failed': failed, 'results': results}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Пакетна обробка файлів проектів сценаріїв.")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Кількість процесів (за замовчуванням - кількість ядер).")
+    parser.add_argument('--indent', type=int, default=None, help="Відступ JSON (за замовчуванням - компактний).")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Докладний журнал у stderr.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('validate', "Перевірити сценарії та макроси."),
+                            ('stats', "Статистика та пошук битих посилань.")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('files', nargs='+', help="Файли або glob-шаблони (*.xml, **/*.tsb).")
+
+    convert = subparsers.add_parser('convert', help="Конвертувати між XML та бінарним форматом.")
+    convert.add_argument('files', nargs='+', help="Файли або glob-шаблони.")
+    convert.add_argument('--to', choices=sorted(FORMAT_EXTENSIONS), required=True, help="Цільовий формат.")
+    convert.add_argument('-o', '--output-dir', default=None, help="Каталог для результатів (за замовчуванням - поруч).")
+
+    paths = subparsers.add_parser('paths', help="Перебрати шляхи виконання за станами зон та дії кожного шляху.")
+    paths.add_argument('files', nargs='+', help="Файли або glob-шаблони.")
+    paths.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS,
+                       help="Ліміт кроків ділянки шляху (захист від нескінченних циклів).")
+
+    montecarlo = subparsers.add_parser('montecarlo', help="Статистика прогонів з випадковими станами зон.")
+    montecarlo.add_argument('files', nargs='+', help="Файли або glob-шаблони.")
+    montecarlo.add_argument('-n', '--runs', type=int, default=10000, help="Кількість прогонів на сценарій.")
+    montecarlo.add_argument('--seed', default='0', help="Зерно генератора (результат відтворюваний).")
+    montecarlo.add_argument('-s', '--scenario', action='append', default=None,
+                            help="ID сценарію (можна кілька разів; за замовчуванням - усі).")
+    montecarlo.add_argument('--state-probabilities', type=json.loads, default=None,
+                            help='Ймовірності станів зон, JSON: {"Тривога": 0.1, "Під охороною": 0.9}.')
+    montecarlo.add_argument('--zone-probabilities', type=json.loads, default=None,
+                            help='Ймовірності станів окремих зон, JSON: {"zone_id": {"Тривога": 1}}.')
+    montecarlo.add_argument('--bin-seconds', type=float, default=DEFAULT_BIN_SECONDS,
+                            help="Ширина кошика гістограми часу до першого SMS, с.")
+    montecarlo.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS, help="Ліміт кроків прогону.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(name)-12s: %(levelname)-8s %(message)s', stream=sys.stderr)
+    summary = run(args)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
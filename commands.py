@@ -10,14 +10,14 @@ from PyQt6.QtWidgets import QInputDialog, QLineEdit, QMessageBox  # Додано
 # Імпортуємо DecoratorNode для перевірки в AddConnectionCommand
 # --- ЗМІНА: Додаємо імпорти для UngroupMacroCommand ---
 from nodes import (BaseNode, Connection, CommentItem, FrameItem, TriggerNode, DecoratorNode, MacroNode,
-                   MacroInputNode, MacroOutputNode, NODE_REGISTRY, generate_short_id)
+                   MacroInputNode, MacroOutputNode, NODE_REGISTRY, generate_short_id, scene_graph_of)
 # --- КІНЕЦЬ ЗМІНИ ---
 
 # --- ИСПРАВЛЕНО: Импортируем константы из нового файла ---
 from constants import EDIT_MODE_SCENARIO, EDIT_MODE_MACRO
 
 # --- ЗМІНА: Імпортуємо утиліти для сцени (для UngroupMacroCommand) ---
-from scene_utils import populate_scene_from_data, extract_data_from_scene
+from scene_utils import populate_scene_from_data, extract_data_from_scene, scene_graph
 
 # --- КІНЕЦЬ ЗМІНИ ---
 
@@ -68,7 +68,7 @@ class AddNodeCommand(QUndoCommand):
         self.setText(f"Додати вузол {self.node.node_type}")
 
         if self.main_window and hasattr(self.main_window, 'project_manager'):  # Перевіряємо наявність менеджера
-            config_data = self.main_window.project_manager.get_config_data()
+            config_data = self.main_window.project_manager.get_config_index()
             self.node.update_display_properties(config_data)
         elif self.main_window:
             log.warning("AddNodeCommand: Could not find ProjectManager on MainWindow.")
@@ -128,9 +128,7 @@ class AddNodeAndConnectCommand(QUndoCommand):
             else:
                 log.debug(f"  Node {self.new_node.id} already on scene.")
 
-            start_node = next(
-                (item for item in self.scene.items() if isinstance(item, BaseNode) and item.id == self.start_node_id),
-                None)
+            start_node = scene_graph(self.scene).nodes.get(self.start_node_id)
             if not start_node:
                 log.error(f"  Start node {self.start_node_id} not found.")
                 self.setObsolete(True)
@@ -188,7 +186,7 @@ class AddNodeAndConnectCommand(QUndoCommand):
             log.debug(f"  Connection path updated.")
 
             if self.main_window and hasattr(self.main_window, 'project_manager'):
-                config_data = self.main_window.project_manager.get_config_data()
+                config_data = self.main_window.project_manager.get_config_index()
                 self.new_node.update_display_properties(config_data)
                 log.debug(f"  Node display properties updated.")
             else:
@@ -295,11 +293,10 @@ class AddConnectionCommand(QUndoCommand):
         self.setText(f"З'єднати '{start_node_name}' та '{end_node_name}'")
 
     def _find_sockets(self):
-        start_node = next((item for item in self.scene.items() if
-                           isinstance(item, BaseNode) and item.id == self.start_socket_ref['node_id']), None)
-        end_node = next(
-            (item for item in self.scene.items() if isinstance(item, BaseNode) and item.id == self.end_socket_ref['node_id']),
-            None)
+        # Пошук вузлів за ID через модель графа сцени (O(1) замість перебору елементів)
+        nodes = scene_graph(self.scene).nodes
+        start_node = nodes.get(self.start_socket_ref['node_id'])
+        end_node = nodes.get(self.end_socket_ref['node_id'])
         if start_node and end_node:
             start_socket = start_node.get_socket(self.start_socket_ref['socket_name'])
             end_socket = end_node.get_socket(self.end_socket_ref['socket_name'])
@@ -512,10 +509,8 @@ class RemoveItemsCommand(QUndoCommand):
             end_socket_name = conn.end_socket.socket_name if conn.end_socket else None
 
             # Знаходимо відновлені або існуючі вузли
-            start_node = restored_nodes.get(start_node_id) or \
-                         next((i for i in self.scene.items() if isinstance(i, BaseNode) and i.id == start_node_id), None)
-            end_node = restored_nodes.get(end_node_id) or \
-                       next((i for i in self.scene.items() if isinstance(i, BaseNode) and i.id == end_node_id), None)
+            start_node = restored_nodes.get(start_node_id) or scene_graph(self.scene).nodes.get(start_node_id)
+            end_node = restored_nodes.get(end_node_id) or scene_graph(self.scene).nodes.get(end_node_id)
 
             if start_node and end_node and start_socket_name and end_socket_name:
                 start_socket = start_node.get_socket(start_socket_name)
@@ -572,6 +567,9 @@ class ChangePropertiesCommand(QUndoCommand):
             props_list = data.get('props', [])
             self.node.properties = list(props_list) if isinstance(props_list, (list, tuple)) else []
             log.debug(f"  Node properties set to: {self.node.properties}")
+            graph = scene_graph_of(self.node)
+            if graph is not None:
+                graph.mark_dirty(self.node.id) # Для інкрементної валідації
 
             # Оновлення macro_id для MacroNode
             if isinstance(self.node, MacroNode):
@@ -593,7 +591,7 @@ class ChangePropertiesCommand(QUndoCommand):
 
             # Оновлюємо відображення властивостей
             if self.main_window and hasattr(self.main_window, 'project_manager'):
-                 config = self.main_window.project_manager.get_config_data()
+                 config = self.main_window.project_manager.get_config_index()
                  self.node.update_display_properties(config)
             else:
                  self.node.update_display_properties() # Без конфігурації
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Ядро редактора сценаріїв без залежності від Qt.
+
+Тут знаходиться логіка, яку можна виконувати поза GUI (консольні утиліти,
+воркери, CI). Модулі пакета не повинні імпортувати PyQt6.
+
+    xml_codec     - XML-формат проекту (кодеки вузлів, потоковий/паралельний імпорт)
+    binary_format - бінарний контейнер *.tsb
+    project_io    - читання/запис файлів проекту з вибором формату за розширенням
+    project       - ProjectModel: операції над даними проекту
+    node_schema   - сокети типів вузлів
+    graph         - ScenarioGraph: вузли за ID, списки суміжності за (node_id, socket), SCC та
+                    матриця досяжності входів макросу до виходів
+    config_index  - індекс конфігурації (зони, виходи, користувачі за ID)
+    events        - типізовані події змін проекту (ProjectChange)
+    validator     - валідація сценаріїв та макросів на рівні даних
+    diagnostics   - DiagnosticsStore: реєстр результатів валідації за (node_id, rule)
+    validation_cache - LRU-кеш результатів валідації сценаріїв за хешем вмісту
+    loop_analysis - статичний аналіз циклів і нескінченного виконання (з розгорнутими макросами)
+    compiler      - компіляція сценарію (з розгорнутими макросами) у пласку програму для симуляції
+                    (коди операцій, розібрані операнди, номери наступників) та її кеш
+    simulation    - безголова симуляція сценарію з віртуальним часом (SimulationEngine, оракул ZoneState, траса)
+    path_analysis - перебір шляхів виконання за станами зон з запам'ятовуванням спільних ділянок
+    monte_carlo   - статистика прогонів з випадковими станами зон (пул процесів, відтворювані зерна)
+"""
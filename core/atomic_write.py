@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Атомарний запис файлів проекту: дані пишуться у тимчасовий файл поруч із ціллю,
+який після успішного запису замінює ціль (os.replace). Помилка на будь-якому етапі
+не пошкоджує наявний файл, а тимчасовий файл видаляється.
+"""
+import contextlib
+import logging
+import os
+import shutil
+
+log = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """Контекстний менеджер: повертає бінарний файл для запису, який по виході замінює path."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            yield f
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path) # Права наявного файлу зберігаються
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
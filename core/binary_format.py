@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Компактний бінарний контейнер проекту (*.tsb).
+
+Зберігає той самий словник project_data, що й XML, але без перетворення
+координат та властивостей у рядки. Структура файлу:
+
+    MAGIC (4 байти) | версія формату (uint16) | прапорці (uint16) | тіло
+
+Тіло - дерево значень у тегованому кодуванні (None/bool/int/float/str/
+bytes/list/tuple/dict). Рядки інтернуються: повторна поява рядка
+записується як посилання на його індекс, тому ключі словників та
+типові імена вузлів займають лише кілька байтів. Якщо встановлено
+прапорець FLAG_ZLIB, тіло стиснуте zlib.
+"""
+import logging
+import struct
+import zlib
+
+from core.atomic_write import atomic_write
+
+log = logging.getLogger(__name__)
+
+BINARY_EXTENSION = ".tsb"
+MAGIC = b"TSPB"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x0001
+
+_HEADER = struct.Struct("<4sHH")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# Теги значень
+_T_NONE = 0x00
+_T_FALSE = 0x01
+_T_TRUE = 0x02
+_T_INT = 0x03
+_T_BIGINT = 0x04  # int поза межами int64 - зберігається десятковим рядком
+_T_FLOAT = 0x05
+_T_STR = 0x06     # новий рядок, додається до таблиці
+_T_STR_REF = 0x07 # посилання на вже записаний рядок
+_T_BYTES = 0x08
+_T_LIST = 0x09
+_T_TUPLE = 0x0A
+_T_DICT = 0x0B
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class BinaryFormatError(ValueError):
+    """Файл не є коректним бінарним контейнером проекту."""
+
+
+def is_binary_path(path):
+    """Чи відповідає шлях бінарному формату (за розширенням файлу)."""
+    return str(path).lower().endswith(BINARY_EXTENSION)
+
+
+# --- Кодування ---
+
+def _encode_value(value, out, strings):
+    # bool перевіряється раніше за int, оскільки bool є підкласом int
+    if value is None:
+        out.append(_T_NONE)
+    elif value is True:
+        out.append(_T_TRUE)
+    elif value is False:
+        out.append(_T_FALSE)
+    elif isinstance(value, str):
+        index = strings.get(value)
+        if index is not None:
+            out.append(_T_STR_REF)
+            out += _U32.pack(index)
+        else:
+            strings[value] = len(strings)
+            encoded = value.encode("utf-8")
+            out.append(_T_STR)
+            out += _U32.pack(len(encoded))
+            out += encoded
+    elif isinstance(value, int):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            out.append(_T_INT)
+            out += _I64.pack(value)
+        else:
+            encoded = str(value).encode("ascii")
+            out.append(_T_BIGINT)
+            out += _U32.pack(len(encoded))
+            out += encoded
+    elif isinstance(value, float):
+        out.append(_T_FLOAT)
+        out += _F64.pack(value)
+    elif isinstance(value, dict):
+        out.append(_T_DICT)
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _encode_value(key, out, strings)
+            _encode_value(item, out, strings)
+    elif isinstance(value, list):
+        out.append(_T_LIST)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode_value(item, out, strings)
+    elif isinstance(value, tuple):
+        out.append(_T_TUPLE)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode_value(item, out, strings)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_T_BYTES)
+        out += _U32.pack(len(value))
+        out += value
+    else:
+        raise TypeError(f"Unsupported value type for binary project format: {type(value).__name__}")
+
+
+def encode_project(project_data, compress=True):
+    """Кодує словник project_data у байти бінарного контейнера."""
+    body = bytearray()
+    _encode_value(project_data, body, {})
+    flags = 0
+    if compress:
+        body = zlib.compress(bytes(body), 6)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, flags) + bytes(body)
+
+
+# --- Декодування ---
+
+class _Reader:
+    __slots__ = ('data', 'pos', 'strings')
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.strings = []
+
+    def read_u32(self):
+        value = _U32.unpack_from(self.data, self.pos)[0]
+        self.pos += 4
+        return value
+
+    def read_bytes(self, length):
+        end = self.pos + length
+        if end > len(self.data):
+            raise BinaryFormatError("Unexpected end of data.")
+        chunk = bytes(self.data[self.pos:end])
+        self.pos = end
+        return chunk
+
+    def read_value(self):
+        try:
+            tag = self.data[self.pos]
+        except IndexError:
+            raise BinaryFormatError("Unexpected end of data.") from None
+        self.pos += 1
+        if tag == _T_STR_REF:
+            index = self.read_u32()
+            if index >= len(self.strings):
+                raise BinaryFormatError(f"Invalid string reference {index} at offset {self.pos - 4}.")
+            return self.strings[index]
+        if tag == _T_STR:
+            value = self.read_bytes(self.read_u32()).decode("utf-8")
+            self.strings.append(value)
+            return value
+        if tag == _T_INT:
+            value = _I64.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return value
+        if tag == _T_DICT:
+            count = self.read_u32()
+            result = {}
+            for _ in range(count):
+                key = self.read_value()
+                result[key] = self.read_value()
+            return result
+        if tag == _T_LIST:
+            return [self.read_value() for _ in range(self.read_u32())]
+        if tag == _T_TUPLE:
+            return tuple([self.read_value() for _ in range(self.read_u32())])
+        if tag == _T_FLOAT:
+            value = _F64.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return value
+        if tag == _T_NONE:
+            return None
+        if tag == _T_TRUE:
+            return True
+        if tag == _T_FALSE:
+            return False
+        if tag == _T_BIGINT:
+            return int(self.read_bytes(self.read_u32()).decode("ascii"))
+        if tag == _T_BYTES:
+            return self.read_bytes(self.read_u32())
+        raise BinaryFormatError(f"Unknown value tag 0x{tag:02x} at offset {self.pos - 1}.")
+
+
+def decode_project(data):
+    """Декодує байти бінарного контейнера у словник project_data."""
+    if len(data) < _HEADER.size:
+        raise BinaryFormatError("File is too short to be a binary project.")
+    magic, version, flags = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise BinaryFormatError("Not a binary project file (bad signature).")
+    if version > FORMAT_VERSION:
+        raise BinaryFormatError(f"Unsupported binary project version {version} (max {FORMAT_VERSION}).")
+    body = memoryview(data)[_HEADER.size:]
+    try:
+        if flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        project_data = _Reader(body).read_value()
+    # Пошкоджений або обрізаний файл: помилки розпакування, структури, кодування чи
+    # ключів (незмінних значень) не повинні виходити за межі BinaryFormatError
+    except (zlib.error, struct.error, IndexError, ValueError, TypeError, RecursionError) as e:
+        raise BinaryFormatError(f"Corrupted binary project data: {e}") from e
+    if not isinstance(project_data, dict):
+        raise BinaryFormatError("Binary project root is not a dictionary.")
+    return project_data
+
+
+def read_project(path):
+    """Читає бінарний файл проекту. Помилки формату - BinaryFormatError."""
+    log.info(f"Reading binary project from: {path}")
+    with open(path, "rb") as f:
+        return decode_project(f.read())
+
+
+def write_project(path, project_data, compress=True):
+    """Записує project_data у бінарний файл проекту (атомарно, див. core.atomic_write)."""
+    log.info(f"Writing binary project to: {path}")
+    payload = encode_project(project_data, compress=compress)
+    with atomic_write(path) as f:
+        f.write(payload)
+    return len(payload)
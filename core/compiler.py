@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Компіляція сценарію у пласку програму для симуляції.
+
+Граф сценарію (з розгорнутими макросами, див. core.loop_analysis.expand_macros)
+перетворюється на Program - набір масивів, індексованих номером вузла:
+код операції, розібрані операнди (кількість повторів, зона та очікуваний стан
+умови, секунди затримки, ціль дії) і номери наступників для кожного виходу.
+Двигун core.simulation інтерпретує програму без звернень до графа, словників
+властивостей та вузлів сцени.
+
+Вузли верхнього рівня зберігають свої ID, вузли всередині макросів мають ID-кортежі
+шляху (ID MacroNode, ..., ID вузла). Скомпільовані програми даних кешуються
+за хешем вмісту (shared_program_cache).
+"""
+import logging
+
+from core.graph import ScenarioGraph, data_node_info
+from core.loop_analysis import expand_macros
+from core.node_schema import TERMINAL_NODE_TYPES
+from core.validation_cache import scenario_cache_key
+from core.lru_cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+# Коди операцій
+OP_PASS = 0       # Перехід за всіма ребрами виходу (послідовність, вузли входів/виходів макросу, ...)
+OP_TRIGGER = 1    # Тригер: операнд - кортеж зон
+OP_ACTION = 2     # Дія (вихід, SMS): операнд - (тип вузла, ID цілі)
+OP_DELAY = 3      # Затримка: операнд - секунди
+OP_CONDITION = 4  # Умова: операнд - (zone_id, очікуваний стан); виходи - (успіх, невдача)
+OP_REPEAT = 5     # Повтор: операнд - кількість ітерацій; виходи - (тіло, завершення)
+
+# Кількість ітерацій "Повтору" з count = -1 ("нескінченно")
+INFINITE_REPEAT_ITERATIONS = 1000
+
+_OPCODES = {'TriggerNode': OP_TRIGGER, 'DelayNode': OP_DELAY, 'ConditionNodeZoneState': OP_CONDITION,
+            'RepeatNode': OP_REPEAT, **{node_type: OP_ACTION for node_type in TERMINAL_NODE_TYPES}}
+# Вихідні сокети за кодом операції (порядок - номер виходу в Program.outputs)
+_OUTPUT_SOCKETS = {OP_CONDITION: ('out_true', 'out_false'), OP_REPEAT: ('out_loop', 'out_end')}
+# Вузли входів/виходів макросу лише передають виконання: після розгортання їхні ребра
+# мають імена сокетів MacroNode, тому вони переходять за всіма ребрами
+_IO_NODE_TYPES = frozenset({'MacroInputNode', 'MacroOutputNode'})
+# Ціль дії за типом вузла
+_ACTION_TARGETS = {'ActivateOutputNode': 'output_id', 'DeactivateOutputNode': 'output_id', 'SendSMSNode': 'user_id'}
+
+DEFAULT_PROGRAM_CACHE_SIZE = 256
+
+
+def repeat_count(props):
+    try:
+        count = int(props.get('count', 1))
+    except (ValueError, TypeError):
+        return 1
+    return INFINITE_REPEAT_ITERATIONS if count == -1 else count
+
+
+def delay_seconds(props):
+    try:
+        return max(0.0, float(props.get('seconds', 0)))
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _operand(opcode, node_type, props):
+    if opcode == OP_TRIGGER:
+        return tuple(props.get('zones', []))
+    if opcode == OP_ACTION:
+        return node_type, props.get(_ACTION_TARGETS.get(node_type))
+    if opcode == OP_DELAY:
+        return delay_seconds(props)
+    if opcode == OP_CONDITION:
+        return props.get('zone_id'), props.get('state')
+    if opcode == OP_REPEAT:
+        return repeat_count(props)
+    return None
+
+
+class Program:
+    """
+    Скомпільований сценарій. Масиви (кортежі) за номером вузла:
+    ids - ID вузла; node_types - тип; opcodes - код операції; operands - розібраний операнд;
+    outputs - кортеж виходів, вихід - кортеж переходів (номер наступника, ребро (from_id, socket, to_id, to_socket));
+    parents - номер першого попередника (для пошуку активного "Повтору") або -1;
+    has_outputs - чи має вузол хоча б одне вихідне ребро.
+    trigger - номер першого тригера верхнього рівня або -1; index - {ID вузла: номер}.
+    """
+    __slots__ = ('ids', 'node_types', 'opcodes', 'operands', 'outputs', 'parents', 'has_outputs',
+                 'trigger', 'index', '_condition_zones_from')
+
+    def __init__(self, ids, node_types, opcodes, operands, outputs, parents, has_outputs, trigger):
+        self.ids = ids
+        self.node_types = node_types
+        self.opcodes = opcodes
+        self.operands = operands
+        self.outputs = outputs
+        self.parents = parents
+        self.has_outputs = has_outputs
+        self.trigger = trigger
+        self.index = {node_id: number for number, node_id in enumerate(ids)}
+        self._condition_zones_from = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def trigger_zones(self):
+        return list(self.operands[self.trigger]) if self.trigger >= 0 else []
+
+    def condition_zones(self):
+        """Множина зон, стан яких перевіряють вузли "Умова"."""
+        return {operand[0] for opcode, operand in zip(self.opcodes, self.operands) if opcode == OP_CONDITION}
+
+    def successor_graph(self):
+        """ScenarioGraph за номерами вузлів (для аналізу структури програми)."""
+        graph = ScenarioGraph()
+        for number in range(len(self.ids)):
+            graph.add_node(number)
+        for number, outputs in enumerate(self.outputs):
+            for slot, transitions in enumerate(outputs):
+                for target, _edge in transitions:
+                    graph.add_edge(number, slot, target, 'in')
+        return graph
+
+    def condition_zones_from(self):
+        """[frozenset зон умов, досяжних з вузла] за номером вузла (динаміка по компонентах сильної зв'язності)."""
+        if self._condition_zones_from is None:
+            graph = self.successor_graph()
+            zones_from, component_of, component_zones = [frozenset()] * len(self.ids), {}, []
+            for number, component in enumerate(graph.strongly_connected_components()):
+                zones = set()
+                for node in component:
+                    component_of[node] = number
+                    if self.opcodes[node] == OP_CONDITION:
+                        zones.add(self.operands[node][0])
+                    for next_node in graph.flow_successors(node):
+                        if component_of.get(next_node, number) != number:
+                            zones |= component_zones[component_of[next_node]]
+                component_zones.append(frozenset(zones))
+                for node in component:
+                    zones_from[node] = component_zones[number]
+            self._condition_zones_from = zones_from
+        return self._condition_zones_from
+
+
+def compile_graph(graph, macros=None, node_info=data_node_info):
+    """
+    Компілює граф сценарію (ScenarioGraph з вузлами-словниками або вузлами сцени з
+    відповідним node_info) у Program. MacroNode з визначенням у macros розгортаються.
+    """
+    macros = macros or {}
+    if any(info[0] == 'MacroNode' and info[2] in macros for info in map(node_info, graph.nodes.values())):
+        flow, _recursive = expand_macros(graph, macros, node_info)
+        node_id_of = lambda path: path[0] if len(path) == 1 else path
+        flow_info = lambda payload: (payload['node_type'], payload['properties'])
+    else:
+        flow, node_id_of, flow_info = graph, (lambda node_id: node_id), node_info
+
+    vertices = list(flow.nodes)
+    number_of = {vertex: number for number, vertex in enumerate(vertices)}
+    ids, node_types, opcodes, operands, outputs, parents, has_outputs = [], [], [], [], [], [], []
+    trigger = -1
+    for number, vertex in enumerate(vertices):
+        node_type, properties = flow_info(flow.nodes[vertex])[:2]
+        props = dict(properties or [])
+        opcode = _OPCODES.get(node_type, OP_PASS)
+        node_id = node_id_of(vertex)
+        if opcode == OP_TRIGGER and trigger < 0 and (flow is graph or len(vertex) == 1): # Лише тригер сценарію
+            trigger = number
+        sockets = _OUTPUT_SOCKETS.get(opcode, (None if node_type in _IO_NODE_TYPES else 'out',))
+        node_outputs = []
+        for socket_name in sockets:
+            node_outputs.append(tuple((number_of[to_vertex], (node_id, from_socket, node_id_of(to_vertex), to_socket))
+                                      for from_socket, to_vertex, to_socket in _targets(flow, vertex, socket_name)))
+        incoming = flow.predecessors(vertex, 'in') or (flow.predecessors(vertex) if node_type in _IO_NODE_TYPES else [])
+        ids.append(node_id)
+        node_types.append(node_type)
+        opcodes.append(opcode)
+        operands.append(_operand(opcode, node_type, props))
+        outputs.append(tuple(node_outputs))
+        parents.append(number_of[incoming[0][0]] if incoming else -1)
+        has_outputs.append(bool(flow.connected_outputs(vertex)))
+    return Program(tuple(ids), tuple(node_types), tuple(opcodes), tuple(operands), tuple(outputs),
+                   tuple(parents), tuple(has_outputs), trigger)
+
+
+def _targets(flow, vertex, socket_name):
+    """(from_socket, to_vertex, to_socket) ребер сокета socket_name (None - усіх вихідних сокетів)."""
+    if socket_name is None:
+        return flow.out_edges(vertex)
+    return [(socket_name, to_vertex, to_socket) for to_vertex, to_socket in flow.successors(vertex, socket_name)]
+
+
+class ProgramCache(LRUCache):
+    """LRU-кеш {ключ вмісту: Program}; потокобезпечний, статистика звернень - hits/misses."""
+    __slots__ = ()
+
+    def __init__(self, maxsize=DEFAULT_PROGRAM_CACHE_SIZE):
+        super().__init__(maxsize)
+
+
+shared_program_cache = ProgramCache()
+
+
+def compile_scenario(scenario_data, macros=None, cache=shared_program_cache):
+    """
+    Компілює дані сценарію (словник або LazyScenarioData) з макросами macros.
+    Результат кешується за хешем вмісту сценарію та використаних макросів (cache=None - без кешу);
+    порядок з'єднань входить у ключ: від нього залежать порядок виходів та parents програми.
+    """
+    key = scenario_cache_key(scenario_data, None, macros, ordered=True) if cache is not None else None
+    program = cache.get(key) if cache is not None else None
+    if program is not None:
+        return program
+    if hasattr(scenario_data, 'decode'):
+        scenario_data = scenario_data.decode()
+    program = compile_graph(ScenarioGraph.from_data(scenario_data, macros), macros)
+    log.debug(f"Compiled scenario: {len(program)} instructions.")
+    return cache.put(key, program) if cache is not None else program
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Індекс конфігурації системи для O(1) пошуку зон, виходів та користувачів за ID.
+
+Індекс будується одним проходом по config['devices'] і кешується у
+ProjectModel разом з номером версії конфігурації; будь-яка зміна
+конфігурації збільшує версію, і індекс перебудовується при наступному запиті.
+"""
+import hashlib
+import logging
+
+log = logging.getLogger(__name__)
+
+NOT_FOUND_LABEL = "НЕ ЗНАЙДЕНО"
+
+
+class ConfigIndex:
+    """
+    Незмінний знімок конфігурації з таблицями:
+    devices - {id: device}, zones/outputs - {id: {'id', 'name', 'parent_name', 'device_id'}},
+    users - {id: user}.
+    """
+    __slots__ = ('config', 'version', 'devices', 'zones', 'outputs', 'users', '_id_fingerprint')
+
+    def __init__(self, config, version=0):
+        self.config = config or {}
+        self.version = version
+        self.devices, self.zones, self.outputs = {}, {}, {}
+        for device in self.config.get('devices', []):
+            parent_name = device.get('name', '')
+            device_id = device.get('id')
+            self.devices[device_id] = device
+            for zone in device.get('zones', []):
+                self.zones[zone['id']] = {**zone, 'parent_name': parent_name, 'device_id': device_id}
+            for output in device.get('outputs', []):
+                self.outputs[output['id']] = {**output, 'parent_name': parent_name, 'device_id': device_id}
+        self.users = {user['id']: user for user in self.config.get('users', [])}
+        self._id_fingerprint = None
+        log.debug(f"Config index v{version} built: {len(self.zones)} zones, {len(self.outputs)} outputs, {len(self.users)} users.")
+
+    def get(self, key, default=None):
+        """Доступ до сирої конфігурації, щоб індекс можна було передавати замість словника config."""
+        return self.config.get(key, default)
+
+    def id_fingerprint(self):
+        """
+        Стабільний (між процесами) хеш наборів ID зон, виходів та користувачів.
+        Валідація залежить лише від них, тому перейменування не змінює відбиток.
+        """
+        if self._id_fingerprint is None:
+            ids = tuple(sorted(map(str, table)) for table in (self.zones, self.outputs, self.users))
+            self._id_fingerprint = hashlib.blake2b(repr(ids).encode('utf-8'), digest_size=16).digest()
+        return self._id_fingerprint
+
+    def zone_label(self, zone_id, default=NOT_FOUND_LABEL):
+        """Повертає 'Пристрій: Зона' або default, якщо зону не знайдено."""
+        zone = self.zones.get(zone_id)
+        return f"{zone['parent_name']}: {zone['name']}" if zone else default
+
+    def output_label(self, output_id, default=NOT_FOUND_LABEL):
+        """Повертає 'Пристрій: Вихід' або default, якщо вихід не знайдено."""
+        output = self.outputs.get(output_id)
+        return f"{output['parent_name']}: {output['name']}" if output else default
+
+    def user_name(self, user_id, default=NOT_FOUND_LABEL):
+        """Повертає ім'я користувача або default."""
+        user = self.users.get(user_id)
+        return user['name'] if user else default
+
+
+def as_config_index(config):
+    """Повертає ConfigIndex для config (готовий індекс повертається без змін)."""
+    if isinstance(config, ConfigIndex):
+        return config
+    return ConfigIndex(config)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Структуровані результати валідації.
+
+Diagnostic - одна знайдена проблема вузла (node_id, rule, message, severity).
+DiagnosticsStore - реєстр діагностик сцени за ключем (node_id, rule): валідація
+записує в нього результати, а GUI застосовує до вузлів лише змінені записи
+(take_changed()) і відповідає на запит "чи є помилки" за O(1).
+Валідатори записують для вузла лише діагностику з найвищим пріоритетом
+(як і раніше показувалось на вузлі), тому результати на сцені та в
+core.validator збігаються.
+"""
+import logging
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+# Рівні серйозності
+ERROR = 'error'
+WARNING = 'warning'
+
+Diagnostic = namedtuple('Diagnostic', 'node_id rule message severity', defaults=(ERROR,))
+
+
+def count_severities(diagnostics):
+    """Повертає (помилок, попереджень) для ітерованої послідовності Diagnostic."""
+    errors = warnings = 0
+    for diagnostic in diagnostics:
+        if diagnostic.severity == ERROR:
+            errors += 1
+        else:
+            warnings += 1
+    return errors, warnings
+
+
+class DiagnosticsStore:
+    """
+    Реєстр діагностик: {node_id: {rule: Diagnostic}}.
+    version збільшується при кожній зміні (для кешування похідних результатів).
+    """
+    __slots__ = ('_entries', '_error_count', '_changed', 'version')
+
+    def __init__(self):
+        self._entries = {}
+        self._error_count = 0
+        self._changed = set()
+        self.version = 0
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._entries.values())
+
+    def __iter__(self):
+        for rules in self._entries.values():
+            yield from rules.values()
+
+    def _changed_node(self, node_id):
+        self._changed.add(node_id)
+        self.version += 1
+
+    # --- Зміни ---
+
+    def add(self, node_id, rule, message, severity=ERROR):
+        """Додає або замінює діагностику (node_id, rule). Повертає True, якщо запис змінився."""
+        diagnostic = Diagnostic(node_id, rule, message, severity)
+        rules = self._entries.setdefault(node_id, {})
+        previous = rules.get(rule)
+        if previous == diagnostic:
+            return False
+        if previous is not None and previous.severity == ERROR:
+            self._error_count -= 1
+        if severity == ERROR:
+            self._error_count += 1
+        rules[rule] = diagnostic
+        self._changed_node(node_id)
+        return True
+
+    def discard(self, node_id, rule):
+        rules = self._entries.get(node_id)
+        previous = rules.pop(rule, None) if rules else None
+        if previous is None:
+            return False
+        if previous.severity == ERROR:
+            self._error_count -= 1
+        if not rules:
+            del self._entries[node_id]
+        self._changed_node(node_id)
+        return True
+
+    def clear_node(self, node_id):
+        rules = self._entries.pop(node_id, None)
+        if not rules:
+            return False
+        self._error_count -= sum(1 for diagnostic in rules.values() if diagnostic.severity == ERROR)
+        self._changed_node(node_id)
+        return True
+
+    def replace_node(self, node_id, diagnostics):
+        """Замінює всі діагностики вузла на diagnostics (ітерабельне Diagnostic)."""
+        new_rules = {diagnostic.rule: diagnostic for diagnostic in diagnostics}
+        if self._entries.get(node_id, {}) == new_rules:
+            return False
+        self.clear_node(node_id)
+        if new_rules:
+            self._entries[node_id] = new_rules
+            self._error_count += sum(1 for diagnostic in new_rules.values() if diagnostic.severity == ERROR)
+        self._changed_node(node_id)
+        return True
+
+    def load(self, diagnostics, node_ids=None):
+        """
+        Масово замінює вміст реєстру. node_ids - вузли, яких стосується результат
+        (для решти записи видаляються); за замовчуванням - весь реєстр.
+        """
+        grouped = {}
+        for diagnostic in diagnostics:
+            grouped.setdefault(diagnostic.node_id, []).append(diagnostic)
+        stale_ids = set(self._entries) - set(grouped)
+        if node_ids is not None:
+            stale_ids &= set(node_ids)
+        for node_id in stale_ids:
+            self.clear_node(node_id)
+        for node_id, node_diagnostics in grouped.items():
+            self.replace_node(node_id, node_diagnostics)
+
+    def clear(self):
+        if self._entries:
+            self._changed.update(self._entries)
+            self.version += 1
+        self._entries.clear()
+        self._error_count = 0
+
+    def take_changed(self):
+        """Повертає і скидає множину ID вузлів, чиї діагностики змінились з попереднього виклику."""
+        changed, self._changed = self._changed, set()
+        return changed
+
+    # --- Запити ---
+
+    def has_errors(self):
+        """Чи є хоча б одна помилка (O(1))."""
+        return self._error_count > 0
+
+    def error_count(self):
+        return self._error_count
+
+    def has_node_errors(self, node_id):
+        return any(diagnostic.severity == ERROR for diagnostic in self._entries.get(node_id, {}).values())
+
+    def node_diagnostics(self, node_id):
+        return list(self._entries.get(node_id, {}).values())
+
+    def primary(self, node_id):
+        """Діагностика, що показується на вузлі: перша помилка, інакше перше попередження, або None."""
+        rules = self._entries.get(node_id)
+        if not rules:
+            return None
+        return next((d for d in rules.values() if d.severity == ERROR), None) or next(iter(rules.values()))
+
+    def node_ids(self):
+        return self._entries.keys()
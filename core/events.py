@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Типізовані події змін проекту.
+
+ProjectModel передає список ProjectChange через _notify_changed(); GUI-адаптер
+перетворює його на сигнал project_changed, і кожна панель застосовує лише
+зміни свого типу замість повної перебудови інтерфейсу.
+"""
+from collections import namedtuple
+
+# Типи об'єктів
+PROJECT = 'project'   # Проект замінено повністю (новий/завантажений) - потрібне повне оновлення
+SCENARIO = 'scenario'
+MACRO = 'macro'
+DEVICE = 'device'
+ZONE = 'zone'
+OUTPUT = 'output'
+USER = 'user'
+
+# Дії
+ADDED = 'added'
+REMOVED = 'removed'
+RENAMED = 'renamed'
+CHANGED = 'changed'
+RESET = 'reset'
+
+# Відповідність ключів update_config_item типам подій
+CONFIG_ITEM_KINDS = {'devices': DEVICE, 'zones': ZONE, 'outputs': OUTPUT, 'users': USER}
+
+# kind/action - константи вище; item_id - ID об'єкта (для сценаріїв - ім'я);
+# old_id - попередній ID при перейменуванні сценарію; parent_id - ID пристрою для зон/виходів;
+# key - змінене поле (наприклад 'name' або 'phone') для CHANGED
+ProjectChange = namedtuple('ProjectChange', 'kind action item_id old_id parent_id key',
+                           defaults=(None, None, None, None))
+
+
+def device_changes(device, action):
+    """Події для пристрою та всіх його зон/виходів (додавання або видалення)."""
+    changes = [ProjectChange(DEVICE, action, device.get('id'))]
+    changes.extend(ProjectChange(ZONE, action, zone['id'], parent_id=device.get('id'))
+                   for zone in device.get('zones', []))
+    changes.extend(ProjectChange(OUTPUT, action, output['id'], parent_id=device.get('id'))
+                   for output in device.get('outputs', []))
+    return changes
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Легка модель графа сценарію/макросу без залежності від Qt.
+
+ScenarioGraph тримає таблицю вузлів за ID та прямі/зворотні списки
+суміжності за ключем (node_id, socket_name), тому пошук вузла, сусідів
+та обхід графа коштують O(степеня), а не O(кількості елементів сцени).
+Граф будується з даних (from_data) або синхронізується зі сценою
+(див. scene_utils.EditorScene).
+"""
+import logging
+from collections import deque
+
+from core.node_schema import node_sockets
+from core.lru_cache import LRUCache
+from core.validation_cache import macro_digests
+
+log = logging.getLogger(__name__)
+
+# Після такої кількості незабраних змін журнал відкидається (споживач виконає повну перевірку)
+MAX_TRACKED_CHANGES = 10000
+
+# Записи журналу змін: (NODE_CHANGED, node_id), (EDGE_ADDED, edge), (EDGE_REMOVED, edge)
+NODE_CHANGED = 'node'
+EDGE_ADDED = 'edge+'
+EDGE_REMOVED = 'edge-'
+
+# Розмір кешу матриць досяжності входів до виходів макросів (за відбитком вмісту макросу)
+MACRO_IO_CACHE_SIZE = 1024
+
+
+def data_node_info(payload):
+    """(тип, властивості, macro_id) вузла графа, побудованого з даних."""
+    return payload.get('node_type'), payload.get('properties'), payload.get('macro_id')
+
+
+class ScenarioGraph:
+    """
+    nodes - {node_id: payload} (вузол сцени або словник даних вузла).
+    Ребро - (from_id, from_socket, to_id, to_socket); ребро існує лише між зареєстрованими вузлами.
+    Якщо track_changes=True, граф веде журнал змін для інкрементної валідації (take_changes()).
+    """
+    __slots__ = ('nodes', '_forward', '_reverse', '_edges', '_changes', '_track_changes')
+
+    def __init__(self, track_changes=False):
+        self.nodes = {}
+        self._forward = {}  # {node_id: {socket_name: [(to_id, to_socket), ...]}}
+        self._reverse = {}  # {node_id: {socket_name: [(from_id, from_socket), ...]}}
+        self._edges = set()
+        self._track_changes = track_changes
+        self._changes = []  # None - журнал переповнено
+
+    @classmethod
+    def from_data(cls, graph_data, macros=None):
+        """
+        Будує граф з даних сценарію/макросу ({'nodes', 'connections'}).
+        З'єднання з неіснуючими вузлами або сокетами ігноруються (як і при побудові сцени).
+        """
+        graph = cls()
+        sockets = {}
+        for node_data in (graph_data or {}).get('nodes', []):
+            node_id = node_data.get('id')
+            if node_id is not None:
+                graph.add_node(node_id, node_data)
+                sockets[node_id] = node_sockets(node_data, macros)
+        for conn in (graph_data or {}).get('connections', []):
+            from_id, to_id = conn.get('from_node'), conn.get('to_node')
+            if from_id not in sockets or to_id not in sockets:
+                continue
+            from_socket, to_socket = conn.get('from_socket', 'out'), conn.get('to_socket', 'in')
+            if from_socket in sockets[from_id][1] and to_socket in sockets[to_id][0]:
+                graph.add_edge(from_id, from_socket, to_id, to_socket)
+        return graph
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def clear(self):
+        self.nodes.clear()
+        self._forward.clear()
+        self._reverse.clear()
+        self._edges.clear()
+        self._changes = []
+
+    # --- Журнал змін ---
+
+    def _record(self, kind, value):
+        if not self._track_changes or self._changes is None:
+            return
+        self._changes.append((kind, value))
+        if len(self._changes) > MAX_TRACKED_CHANGES:
+            log.debug("Graph change journal overflow, consumers will fall back to a full pass.")
+            self._changes = None
+
+    def mark_dirty(self, node_id):
+        """Позначає вузол зміненим (наприклад, змінились його властивості)."""
+        self._record(NODE_CHANGED, node_id)
+
+    def take_changes(self):
+        """
+        Повертає і очищає журнал змін: список записів або None, якщо журнал переповнено
+        і споживач має виконати повну перевірку.
+        """
+        changes, self._changes = self._changes, []
+        return changes
+
+    # --- Зміни ---
+
+    def add_node(self, node_id, payload=None):
+        self.nodes[node_id] = payload
+        self._forward.setdefault(node_id, {})
+        self._reverse.setdefault(node_id, {})
+        self._record(NODE_CHANGED, node_id)
+
+    def remove_node(self, node_id):
+        """Видаляє вузол разом з усіма його ребрами."""
+        if node_id not in self.nodes:
+            return
+        for from_socket, targets in list(self._forward.get(node_id, {}).items()):
+            for to_id, to_socket in list(targets):
+                self.remove_edge(node_id, from_socket, to_id, to_socket)
+        for to_socket, sources in list(self._reverse.get(node_id, {}).items()):
+            for from_id, from_socket in list(sources):
+                self.remove_edge(from_id, from_socket, node_id, to_socket)
+        del self.nodes[node_id]
+        self._forward.pop(node_id, None)
+        self._reverse.pop(node_id, None)
+        self._record(NODE_CHANGED, node_id)
+
+    def add_edge(self, from_id, from_socket, to_id, to_socket):
+        """Додає ребро між зареєстрованими вузлами. Повертає True, якщо ребро додано."""
+        edge = (from_id, from_socket, to_id, to_socket)
+        if edge in self._edges or from_id not in self.nodes or to_id not in self.nodes:
+            return False
+        self._edges.add(edge)
+        self._forward[from_id].setdefault(from_socket, []).append((to_id, to_socket))
+        self._reverse[to_id].setdefault(to_socket, []).append((from_id, from_socket))
+        self._record(EDGE_ADDED, edge)
+        return True
+
+    def remove_edge(self, from_id, from_socket, to_id, to_socket):
+        """Видаляє ребро. Повертає True, якщо ребро існувало."""
+        edge = (from_id, from_socket, to_id, to_socket)
+        if edge not in self._edges:
+            return False
+        self._edges.discard(edge)
+        targets = self._forward[from_id][from_socket]
+        targets.remove((to_id, to_socket))
+        if not targets:
+            del self._forward[from_id][from_socket]
+        sources = self._reverse[to_id][to_socket]
+        sources.remove((from_id, from_socket))
+        if not sources:
+            del self._reverse[to_id][to_socket]
+        self._record(EDGE_REMOVED, edge)
+        return True
+
+    # --- Запити ---
+
+    def has_edge(self, from_id, from_socket, to_id, to_socket):
+        return (from_id, from_socket, to_id, to_socket) in self._edges
+
+    def edges(self):
+        return iter(self._edges)
+
+    def successors(self, node_id, socket_name=None):
+        """Повертає [(to_id, to_socket)] для сокета або для всіх вихідних сокетів вузла."""
+        out = self._forward.get(node_id, {})
+        if socket_name is not None:
+            return list(out.get(socket_name, ()))
+        return [target for targets in out.values() for target in targets]
+
+    def out_edges(self, node_id):
+        """Повертає [(from_socket, to_id, to_socket)] усіх вихідних ребер вузла в порядку додавання."""
+        return [(socket_name, to_id, to_socket) for socket_name, targets in self._forward.get(node_id, {}).items()
+                for to_id, to_socket in targets]
+
+    def predecessors(self, node_id, socket_name=None):
+        """Повертає [(from_id, from_socket)] для сокета або для всіх вхідних сокетів вузла."""
+        incoming = self._reverse.get(node_id, {})
+        if socket_name is not None:
+            return list(incoming.get(socket_name, ()))
+        return [source for sources in incoming.values() for source in sources]
+
+    def connected_outputs(self, node_id):
+        """Множина імен вихідних сокетів вузла, що мають з'єднання."""
+        return set(self._forward.get(node_id, ()))
+
+    def connected_inputs(self, node_id):
+        """Множина імен вхідних сокетів вузла, що мають з'єднання."""
+        return set(self._reverse.get(node_id, ()))
+
+    def reachable_from(self, start_id, socket_reachability=None):
+        """
+        Множина ID вузлів, досяжних від start_id (включно), - BFS по прямих ребрах.
+        socket_reachability - {node_id: {вхідний сокет: frozenset(вихідних сокетів)}} для вузлів-
+        "чорних скриньок" (MacroNode, див. macro_socket_summaries): з такого вузла виконання
+        продовжується лише з виходів, досяжних із входів, до яких воно дійшло.
+        """
+        if start_id not in self.nodes:
+            return set()
+        socket_reachability = socket_reachability or {}
+        reachable = {start_id}
+        opened = {}  # {ID "чорної скриньки": множина відкритих вихідних сокетів}
+        entered = set()  # (ID "чорної скриньки", вхідний сокет)
+        queue = deque([(start_id, None)])
+        while queue:
+            node_id, in_socket = queue.popleft()
+            summary = socket_reachability.get(node_id)
+            if summary is None:
+                sockets = self._forward.get(node_id, {}).items()
+            else:
+                node_opened = opened.setdefault(node_id, set())
+                new_sockets = summary.get(in_socket, frozenset()) - node_opened
+                node_opened |= new_sockets
+                sockets = ((socket_name, targets) for socket_name, targets in self._forward.get(node_id, {}).items()
+                           if socket_name in new_sockets)
+            for _socket_name, targets in sockets:
+                for next_id, next_socket in targets:
+                    if next_id in socket_reachability: # Кожен новий вхід може відкрити інші виходи
+                        if (next_id, next_socket) not in entered:
+                            entered.add((next_id, next_socket))
+                            reachable.add(next_id)
+                            queue.append((next_id, next_socket))
+                    elif next_id not in reachable:
+                        reachable.add(next_id)
+                        queue.append((next_id, next_socket))
+        return reachable
+
+    def update_reachable(self, reachable, start_id, added_edges=(), removed_edges=()):
+        """
+        Інкрементно оновлює reachable (множину вузлів, досяжних від start_id) після
+        додавання/видалення ребер і вузлів; видалений вузол має бути представлений
+        видаленими ребрами. Змінює reachable на місці, обходячи лише зачеплену частину графа.
+        Повертає множину ID, чия досяжність змінилась.
+        """
+        regained = set()
+        # Видалення: вузли, досяжні від кінців видалених ребер, могли втратити досяжність
+        affected = set()
+        queue = deque(edge[2] for edge in removed_edges if edge[2] in reachable)
+        while queue:
+            node_id = queue.popleft()
+            if node_id in affected:
+                continue
+            affected.add(node_id)
+            for targets in self._forward.get(node_id, {}).values():
+                queue.extend(next_id for next_id, _socket in targets
+                             if next_id in reachable and next_id not in affected)
+        if affected:
+            reachable -= affected
+            # Повертаємо ті, до яких лишився шлях від досяжних вузлів
+            queue = deque(node_id for node_id in affected if node_id in self.nodes and (
+                node_id == start_id or any(source in reachable for source, _socket in self.predecessors(node_id))))
+            self._grow_reachable(reachable, queue, regained)
+        # Додавання: нові ребра з досяжних вузлів розширюють множину
+        queue = deque(edge[2] for edge in added_edges
+                      if edge[0] in reachable and edge[2] not in reachable and self.has_edge(*edge))
+        self._grow_reachable(reachable, queue, regained)
+        return affected ^ regained
+
+    def _grow_reachable(self, reachable, queue, added):
+        while queue:
+            node_id = queue.popleft()
+            if node_id in reachable:
+                continue
+            reachable.add(node_id)
+            added.add(node_id)
+            for targets in self._forward.get(node_id, {}).values():
+                queue.extend(next_id for next_id, _socket in targets if next_id not in reachable)
+
+    def flow_successors(self, node_id, skip_socket=None):
+        """ID вузлів-наступників; ребра з сокетів, для яких skip_socket(node_id, socket) істинне, пропускаються."""
+        return [to_id for socket_name, targets in self._forward.get(node_id, {}).items()
+                if skip_socket is None or not skip_socket(node_id, socket_name)
+                for to_id, _socket in targets]
+
+    def strongly_connected_components(self, skip_socket=None):
+        """
+        Компоненти сильної зв'язності (ітеративний алгоритм Тар'яна, O(вузлів + ребер)).
+        Повертає список списків ID у зворотному топологічному порядку: компонента
+        з'являється раніше за ті, з яких до неї є ребра.
+        skip_socket(node_id, socket_name) - необов'язковий фільтр ребер (див. flow_successors).
+        """
+        index, lowlink = {}, {}
+        on_stack, stack, components = set(), [], []
+        counter = 0
+        for root in self.nodes:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.flow_successors(root, skip_socket)))]
+            while work:
+                node_id, targets = work[-1]
+                for next_id in targets:
+                    if next_id not in index:
+                        index[next_id] = lowlink[next_id] = counter
+                        counter += 1
+                        stack.append(next_id)
+                        on_stack.add(next_id)
+                        work.append((next_id, iter(self.flow_successors(next_id, skip_socket))))
+                        break
+                    if next_id in on_stack:
+                        lowlink[node_id] = min(lowlink[node_id], index[next_id])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node_id])
+                    if lowlink[node_id] == index[node_id]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node_id:
+                                break
+                        components.append(component)
+        return components
+
+    def reachable_subsets(self, source_ids, target_ids):
+        """
+        Для кожного source_id - множина target_ids, досяжних з нього (вузол досяжний сам з себе).
+        Один прохід по конденсації графа (компоненти сильної зв'язності) з бітовими масками
+        цілей: O((вузлів + ребер) * цілей / розрядність слова) замість обходу з кожного джерела.
+        Повертає {source_id: frozenset(target_id)}.
+        """
+        targets = list(dict.fromkeys(target_ids))
+        target_bits = {target_id: 1 << bit for bit, target_id in enumerate(targets)}
+        component_of, masks = {}, []
+        # Тар'ян видає компоненти від стоків до джерел - маски наступників уже пораховані
+        for number, component in enumerate(self.strongly_connected_components()):
+            mask = 0
+            for node_id in component:
+                component_of[node_id] = number
+                mask |= target_bits.get(node_id, 0)
+            for node_id in component:
+                for next_id, _socket in self.successors(node_id):
+                    next_component = component_of[next_id]
+                    if next_component != number:
+                        mask |= masks[next_component]
+            masks.append(mask)
+        result = {}
+        for source_id in source_ids:
+            mask = masks[component_of[source_id]] if source_id in component_of else 0
+            result[source_id] = frozenset(target_id for target_id in targets if mask & target_bits[target_id])
+        return result
+
+
+def macro_io_reachability(macro_data, macros=None):
+    """
+    Матриця досяжності входів макросу до виходів: {ID MacroInputNode: [ID MacroOutputNode]}.
+    Вкладені MacroNode розглядаються як один вузол (кожен їхній вхід веде до кожного виходу).
+    """
+    graph = ScenarioGraph.from_data(macro_data, macros)
+    input_ids = [node_id for node_id, data in graph.nodes.items() if data.get('node_type') == 'MacroInputNode']
+    output_ids = [node_id for node_id, data in graph.nodes.items() if data.get('node_type') == 'MacroOutputNode']
+    reachable = graph.reachable_subsets(input_ids, output_ids)
+    return {input_id: [output_id for output_id in output_ids if output_id in reachable[input_id]]
+            for input_id in input_ids}
+
+
+# {відбиток макросу (core.validation_cache.macro_digests): матриця macro_io_reachability}.
+# Відбиток включає вміст вкладених макросів, тому зміна будь-якого з них дає новий ключ
+_io_reachability_cache = LRUCache(MACRO_IO_CACHE_SIZE)
+
+
+def macro_socket_reachability(macro_data, macros=None, digest=None):
+    """
+    Зведення макросу як "чорної скриньки" для аналізу сценарію:
+    {ім'я вхідного сокета MacroNode: frozenset(імена вихідних сокетів, досяжних з нього)}.
+    Матриця обчислюється при першому запиті і кешується за відбитком вмісту макросу digest
+    (без digest - обчислюється щоразу).
+    """
+    if not macro_data:
+        return {}
+    matrix = _io_reachability_cache.get(digest) if digest is not None else None
+    if matrix is None:
+        matrix = macro_io_reachability(macro_data, macros)
+        if digest is not None:
+            _io_reachability_cache.put(digest, matrix)
+    output_names = {io.get('macro_output_node_id'): io.get('name') for io in macro_data.get('outputs', [])}
+    return {io.get('name'): frozenset(output_names[output_id] for output_id in matrix.get(io.get('macro_input_node_id'), ())
+                                      if output_id in output_names)
+            for io in macro_data.get('inputs', [])}
+
+
+def macro_socket_summaries(graph, macros, node_info=data_node_info):
+    """
+    Зведення MacroNode графа сценарію для reachable_from: {ID MacroNode: macro_socket_reachability}.
+    MacroNode без визначення у macros не зводяться (вважаються звичайними вузлами);
+    зведення одного макросу обчислюється один раз, а його матриця береться з кешу за відбитком.
+    """
+    macro_nodes = {}
+    for node_id, payload in graph.nodes.items():
+        node_type, _properties, macro_id = node_info(payload)
+        if node_type == 'MacroNode' and (macros or {}).get(macro_id):
+            macro_nodes[node_id] = macro_id
+    if not macro_nodes:
+        return {}
+    digests = macro_digests(macros, macro_ids=set(macro_nodes.values()))
+    by_macro = {macro_id: macro_socket_reachability(macros[macro_id], macros, digests.get(macro_id))
+                for macro_id in set(macro_nodes.values())}
+    return {node_id: by_macro[macro_id] for node_id, macro_id in macro_nodes.items()}
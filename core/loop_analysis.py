@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Статичний аналіз циклів та нескінченного виконання сценарію.
+
+Граф сценарію розгортається разом із вмістом макросів (expand_macros): кожен
+MacroNode замінюється копією графа свого макросу, а з'єднання з його сокетами -
+з'єднаннями з відповідними вузлами входів/виходів. Далі на розгорнутому графі
+без ребер 'out_loop' вузлів "Повтор" (це обмежені цикли) шукаються компоненти
+сильної зв'язності (Тар'ян) і перевіряється, з яких вузлів виконання може завершитись:
+
+    infinite_cycle   - цикл, з якого немає шляху до завершення (помилка);
+    never_terminates - усі шляхи з вузла ведуть у такий цикл (помилка);
+    unbounded_repeat - нескінченний "Повтор" (count = -1) без жодної дії в тілі (помилка);
+    macro_recursion  - макрос прямо чи опосередковано містить сам себе (помилка);
+    busy_cycle       - цикл з виходом, але без затримки: крутиться без паузи (попередження).
+
+Знахідки у вузлах макросу приписуються MacroNode сценарію, що його містить.
+"""
+import logging
+from collections import deque
+
+from core.graph import ScenarioGraph, data_node_info
+from core.node_schema import TERMINAL_NODE_TYPES
+from core.diagnostics import Diagnostic, ERROR, WARNING
+
+log = logging.getLogger(__name__)
+
+# Сокет "Повтор", ребра якого утворюють обмежений цикл
+REPEAT_LOOP_SOCKET = 'out_loop'
+
+MSG_MACRO_RECURSION = "Макрос містить сам себе (рекурсивне вкладення)."
+MSG_INFINITE_CYCLE = "Нескінченний цикл: з нього немає виходу."
+MSG_NEVER_TERMINATES = "Виконання з цього вузла ніколи не завершиться: усі шляхи ведуть у нескінченний цикл."
+MSG_UNBOUNDED_REPEAT = "Нескінченний повтор без жодної дії в тілі циклу."
+MSG_BUSY_CYCLE = "Цикл без затримки: повторюється без паузи."
+MACRO_PREFIX = "У макросі: "
+
+# Правила цього аналізу (для відбору його діагностик із загального результату валідації)
+LOOP_RULES = frozenset({'macro_recursion', 'infinite_cycle', 'never_terminates', 'unbounded_repeat', 'busy_cycle'})
+# Пріоритет правил, якщо кілька знахідок належать одному вузлу сценарію
+_RULE_ORDER = ('infinite_cycle', 'never_terminates', 'unbounded_repeat', 'busy_cycle')
+
+
+def _repeat_count(properties):
+    try:
+        return int(dict(properties or []).get('count', 0))
+    except (ValueError, TypeError):
+        return None
+
+
+class _Expansion:
+    """
+    Розгорнутий граф: ID вузлів - кортежі шляху (ID MacroNode, ..., ID вузла).
+    Тіла макросів (граф визначення та ID вузлів входів/виходів за іменем) розбираються
+    один раз на macro_id, скільки б MacroNode їх не використовували.
+    """
+    __slots__ = ('graph', 'macros', 'recursive_owners', '_bodies')
+
+    def __init__(self, macros):
+        self.graph = ScenarioGraph()
+        self.macros = macros or {}
+        self.recursive_owners = set()
+        self._bodies = {}  # {macro_id: (граф визначення, {ім'я входу: [ID]}, {ім'я виходу: [ID]})}
+
+    def body(self, macro_id, macro_data):
+        body = self._bodies.get(macro_id)
+        if body is None:
+            inner = ScenarioGraph.from_data(macro_data, self.macros)
+            inputs, outputs = {}, {}
+            for inner_id, inner_data in inner.nodes.items():
+                if inner_data.get('node_type') == 'MacroInputNode':
+                    inputs.setdefault(inner_data.get('name'), []).append(inner_id)
+                elif inner_data.get('node_type') == 'MacroOutputNode':
+                    outputs.setdefault(inner_data.get('name'), []).append(inner_id)
+            body = self._bodies[macro_id] = (inner, inputs, outputs)
+        return body
+
+    def add(self, graph, prefix, node_info, stack):
+        """
+        Додає вузли та ребра graph з префіксом шляху prefix. MacroNode рекурсивно замінюються
+        вмістом макросу (stack - макроси, що вже розгортаються), а ребра до/від їхніх сокетів
+        ведуть до вузлів входів/виходів макросу з тим самим ім'ям.
+        """
+        inputs, outputs = {}, {}  # {node_id: {socket: [вершина]}} для розгорнутих MacroNode
+        for node_id, payload in graph.nodes.items():
+            node_type, properties, macro_id = node_info(payload)
+            path = prefix + (node_id,)
+            macro_data = self.macros.get(macro_id) if node_type == 'MacroNode' else None
+            if macro_data and macro_id in stack:
+                self.recursive_owners.add(path[0])
+                macro_data = None
+            if not macro_data:
+                self.graph.add_node(path, {'node_type': node_type, 'properties': properties})
+                continue
+            inner, inner_inputs, inner_outputs = self.body(macro_id, macro_data)
+            self.add(inner, path, data_node_info, stack | {macro_id})
+            inputs[node_id] = {name: [path + (inner_id,) for inner_id in ids] for name, ids in inner_inputs.items()}
+            outputs[node_id] = {name: [path + (inner_id,) for inner_id in ids] for name, ids in inner_outputs.items()}
+
+        for from_id, from_socket, to_id, to_socket in graph.edges():
+            sources = (outputs[from_id].get(from_socket, ()) if from_id in outputs else (prefix + (from_id,),))
+            targets = (inputs[to_id].get(to_socket, ()) if to_id in inputs else (prefix + (to_id,),))
+            for source in sources:
+                for target in targets:
+                    self.graph.add_edge(source, from_socket, target, to_socket)
+
+
+def expand_macros(graph, macros=None, node_info=data_node_info):
+    """
+    Розгортає MacroNode графа сценарію у вміст їхніх макросів.
+    Повертає (розгорнутий ScenarioGraph з ID-кортежами шляху, множина ID MacroNode з рекурсією).
+    """
+    expansion = _Expansion(macros)
+    expansion.add(graph, (), node_info, frozenset())
+    return expansion.graph, expansion.recursive_owners
+
+
+def analyze_loops(graph, macros=None, node_info=data_node_info):
+    """
+    Аналізує цикли графа сценарію (разом із розгорнутими макросами).
+    node_info(payload) -> (тип, властивості, macro_id) - доступ до вузлів графа
+    (за замовчуванням - словники даних). Повертає {node_id: Diagnostic}, не більше
+    однієї діагностики на вузол сценарію (за пріоритетом правил).
+    """
+    macros = macros or {}
+    if any(info[0] == 'MacroNode' and info[2] in macros for info in map(node_info, graph.nodes.values())):
+        flow, recursive_owners = expand_macros(graph, macros, node_info)
+        info_of = lambda payload: (payload['node_type'], payload['properties'])
+        owner_of = lambda path: (path[0], len(path) > 1)
+    else: # Макросів для розгортання немає - аналізуємо граф як є
+        flow, recursive_owners = graph, set()
+        info_of = node_info
+        owner_of = lambda node_id: (node_id, False)
+    node_types, repeat_counts = {}, {}
+    for node_id, payload in flow.nodes.items():
+        node_type, properties = info_of(payload)[:2]
+        node_types[node_id] = node_type
+        if node_type == 'RepeatNode':
+            repeat_counts[node_id] = _repeat_count(properties)
+
+    # Ребра 'out_loop' "Повтору" - обмежені цикли, вони не враховуються
+    def skip_loop(node_id, socket_name):
+        return socket_name == REPEAT_LOOP_SOCKET and node_id in repeat_counts
+
+    findings = {}  # {ID вершини: (rule, message, severity)}
+    component_of, terminates = {}, []
+    # Компоненти йдуть від стоків до джерел: для наступників результат уже відомий
+    for number, component in enumerate(flow.strongly_connected_components(skip_loop)):
+        for node_id in component:
+            component_of[node_id] = number
+        successors = [next_id for node_id in component for next_id in flow.flow_successors(node_id, skip_loop)]
+        cyclic = len(component) > 1 or component[0] in successors
+        can_terminate = not successors or any(terminates[component_of[next_id]] for next_id in successors
+                                              if component_of[next_id] != number)
+        terminates.append(can_terminate)
+        if cyclic and not can_terminate:
+            for node_id in component:
+                findings[node_id] = ('infinite_cycle', MSG_INFINITE_CYCLE, ERROR)
+        elif cyclic and not any(node_types[node_id] == 'DelayNode' for node_id in component):
+            for node_id in component:
+                findings[node_id] = ('busy_cycle', MSG_BUSY_CYCLE, WARNING)
+        elif not can_terminate:
+            findings[component[0]] = ('never_terminates', MSG_NEVER_TERMINATES, ERROR)
+
+    for node_id, count in repeat_counts.items():
+        if count == -1 and not _body_has_action(flow, node_id, node_types):
+            findings.setdefault(node_id, ('unbounded_repeat', MSG_UNBOUNDED_REPEAT, ERROR))
+
+    if flow is not graph:
+        # Вузли макросу, до яких не можна потрапити з вузлів сценарію (непідключені входи), не звітуються
+        used = _reachable_from_scenario(flow)
+        findings = {node_id: finding for node_id, finding in findings.items() if node_id in used}
+    return _summarize(graph, findings, recursive_owners, owner_of)
+
+
+def _reachable_from_scenario(expanded):
+    queue = deque(node_id for node_id in expanded.nodes if len(node_id) == 1)
+    seen = set()
+    while queue:
+        node_id = queue.popleft()
+        if node_id in seen:
+            continue
+        seen.add(node_id)
+        queue.extend(next_id for next_id, _socket in expanded.successors(node_id) if next_id not in seen)
+    return seen
+
+
+def _body_has_action(flow, repeat_id, node_types):
+    """Чи є в тілі "Повтору" (усе досяжне з 'out_loop', крім самого вузла) хоча б одна дія."""
+    queue = deque(next_id for next_id, _socket in flow.successors(repeat_id, REPEAT_LOOP_SOCKET))
+    seen = {repeat_id}
+    while queue:
+        node_id = queue.popleft()
+        if node_id in seen:
+            continue
+        seen.add(node_id)
+        if node_types[node_id] in TERMINAL_NODE_TYPES:
+            return True
+        queue.extend(next_id for next_id, _socket in flow.successors(node_id))
+    return False
+
+
+def _summarize(graph, findings, recursive_owners, owner_of):
+    result = {}
+    for node_id in graph.nodes:
+        if node_id in recursive_owners:
+            result[node_id] = Diagnostic(node_id, 'macro_recursion', MSG_MACRO_RECURSION)
+    by_owner = {}
+    for vertex, finding in findings.items():
+        owner, inside_macro = owner_of(vertex)
+        current = by_owner.get(owner)
+        if current is None or _RULE_ORDER.index(finding[0]) < _RULE_ORDER.index(current[1][0]):
+            by_owner[owner] = (inside_macro, finding)
+    # Порядок вузлів сценарію зберігається, щоб результат не залежав від порядку обходу
+    for node_id in graph.nodes:
+        if node_id in result or node_id not in by_owner:
+            continue
+        inside_macro, (rule, message, severity) = by_owner[node_id]
+        result[node_id] = Diagnostic(node_id, rule, MACRO_PREFIX + message if inside_macro else message, severity)
+    return result
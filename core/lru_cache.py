@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Потокобезпечний LRU-кеш {ключ: значення} зі статистикою звернень (hits/misses).
+
+Основа для ValidationCache (core.validation_cache) та ProgramCache (core.compiler):
+кешами користуються GUI-потік та фонові задачі. Значення None не кешується -
+get() повертає None при промаху.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """LRU-кеш на maxsize записів; найдавніше використаний запис витісняється першим."""
+    __slots__ = ('maxsize', 'hits', 'misses', '_entries', '_lock')
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Повертає збережене значення або None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Зберігає значення (витісняючи найдавніші записи понад maxsize) і повертає його."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
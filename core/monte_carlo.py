@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Статистика виконання сценарію методом Монте-Карло.
+
+Кожен прогін вибирає зону тригера (за вагами zone_weights, за замовчуванням
+рівномірно; вона у стані ALARM_STATE, як у simulate_all_zones) та стан кожної
+іншої зони умов (за ймовірностями zone_probabilities або state_probabilities) і
+виконує сценарій двигуном core.simulation з віртуальним часом. Результати зводяться у MonteCarloStats: статуси прогонів, як часто
+спрацьовує кожен вихід, та гістограма часу до першого SMS.
+
+Прогони діляться на пакети фіксованого розміру з власним зерном (seed/номер
+пакета), тому результат не залежить від кількості воркерів і відтворюється.
+Пакети виконуються у пулі процесів. Прогін визначається лише зоною тригера та
+станами зон умов, тож у межах пакета результати однакових комбінацій беруться
+з кешу, а не симулюються повторно.
+"""
+import os
+import bisect
+import random
+import logging
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
+
+from core.simulation import SimulationEngine, TriggerZoneState, ZoneState, ZONE_STATES, DEFAULT_MAX_STEPS
+
+log = logging.getLogger(__name__)
+
+# Кількість прогонів у пакеті (одиниця відтворюваності та розподілу між воркерами)
+CHUNK_SIZE = 10000
+# Ширина кошика гістограми часу до першого SMS, секунди
+DEFAULT_BIN_SECONDS = 10
+
+
+class MonteCarloStats:
+    """
+    Зведені результати прогонів: runs - кількість; statuses - {статус: прогонів};
+    trigger_zones - {зона тригера: прогонів}; outputs - {output_id: прогонів, у яких вихід активовано};
+    sms_runs - прогонів з хоча б одним SMS; first_sms - гістограма {початок кошика, с: прогонів}.
+    """
+    __slots__ = ('bin_seconds', 'runs', 'statuses', 'trigger_zones', 'outputs', 'sms_runs', 'first_sms')
+
+    def __init__(self, bin_seconds=DEFAULT_BIN_SECONDS):
+        self.bin_seconds = bin_seconds
+        self.runs = 0
+        self.statuses = {}
+        self.trigger_zones = {}
+        self.outputs = {}
+        self.sms_runs = 0
+        self.first_sms = {}
+
+    def add(self, zone_id, outcome, count=1):
+        """Додає count прогонів з результатом outcome (див. _run_outcome)."""
+        status, output_ids, first_sms = outcome
+        self.runs += count
+        self.statuses[status] = self.statuses.get(status, 0) + count
+        self.trigger_zones[zone_id] = self.trigger_zones.get(zone_id, 0) + count
+        for output_id in output_ids:
+            self.outputs[output_id] = self.outputs.get(output_id, 0) + count
+        if first_sms is not None:
+            self.sms_runs += count
+            bin_start = int(first_sms // self.bin_seconds) * self.bin_seconds
+            self.first_sms[bin_start] = self.first_sms.get(bin_start, 0) + count
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.sms_runs += other.sms_runs
+        for mine, theirs in ((self.statuses, other.statuses), (self.trigger_zones, other.trigger_zones),
+                             (self.outputs, other.outputs), (self.first_sms, other.first_sms)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        return self
+
+    def output_rates(self):
+        """{output_id: частка прогонів, у яких вихід активовано}."""
+        return {output_id: count / self.runs for output_id, count in self.outputs.items()} if self.runs else {}
+
+    def to_dict(self):
+        return {'runs': self.runs, 'statuses': self.statuses, 'trigger_zones': self.trigger_zones,
+                'outputs': self.outputs, 'output_rates': self.output_rates(), 'sms_runs': self.sms_runs,
+                'first_sms_bin_seconds': self.bin_seconds,
+                'first_sms': dict(sorted(self.first_sms.items()))}
+
+
+class _Sampler:
+    """Вибір з дискретного розподілу {значення: вага} за накопиченими вагами."""
+    __slots__ = ('values', 'cumulative')
+
+    def __init__(self, weights):
+        items = [(value, weight) for value, weight in weights.items() if weight > 0]
+        if not items:
+            raise ValueError("Distribution has no positive weights.")
+        self.values = [value for value, _weight in items]
+        self.cumulative = list(accumulate(weight for _value, weight in items))
+
+    def sample(self, rng):
+        return self.values[bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def _run_outcome(engine, zone_id, states):
+    """(статус, відсортовані ID активованих виходів, час першого SMS або None) одного прогону."""
+    engine.zone_state = TriggerZoneState(zone_id, ZoneState(states)) # Зона тригера - у тривозі
+    trace = engine.run(zone_id)
+    output_ids, first_sms = set(), None
+    program = engine.program
+    for time, node_id in trace.timeline():
+        node_type, target = program.operands[program.index[node_id]]
+        if node_type == 'ActivateOutputNode':
+            output_ids.add(target)
+        elif node_type == 'SendSMSNode' and first_sms is None:
+            first_sms = time
+    return trace.status, tuple(sorted(output_ids, key=str)), first_sms
+
+
+def _run_chunk(task):
+    """Виконує пакет прогонів (у процесі-воркері). Повертає MonteCarloStats пакета."""
+    scenario_data, macros, runs, seed, zone_weights, zone_probabilities, state_probabilities, options = task
+    max_steps, bin_seconds = options
+    engine = SimulationEngine.from_data(scenario_data, macros, max_steps=max_steps, timed=True)
+    rng = random.Random(seed)
+    trigger_sampler = _Sampler(zone_weights)
+    zones = sorted(engine.condition_zones(), key=str) # Сталий порядок - відтворюваний вибір
+    default_sampler = _Sampler(state_probabilities)
+    samplers = [_Sampler(zone_probabilities[zone]) if zone in zone_probabilities else default_sampler
+                for zone in zones]
+
+    counts = {}  # {(зона тригера, стани зон умов): прогонів}
+    for _ in range(runs):
+        zone_id = trigger_sampler.sample(rng)
+        # Стан зони тригера не вибирається (вона у тривозі) - однакові прогони мають один ключ
+        key = (zone_id, tuple(None if zone == zone_id else sampler.sample(rng) for zone, sampler in zip(zones, samplers)))
+        counts[key] = counts.get(key, 0) + 1
+
+    stats = MonteCarloStats(bin_seconds)
+    for (zone_id, states), count in counts.items():
+        stats.add(zone_id, _run_outcome(engine, zone_id, dict(zip(zones, states))), count)
+    return stats
+
+
+def run_monte_carlo(scenario_data, runs, seed=0, zone_weights=None, zone_probabilities=None,
+                    state_probabilities=None, macros=None, workers=None, max_steps=DEFAULT_MAX_STEPS,
+                    bin_seconds=DEFAULT_BIN_SECONDS):
+    """
+    Виконує runs прогонів сценарію (словник даних) і повертає MonteCarloStats.
+    zone_weights - {зона тригера: вага} (за замовчуванням - усі зони тригера порівну);
+    zone_probabilities - {zone_id: {стан: ймовірність}} для окремих зон умов;
+    state_probabilities - {стан: ймовірність} для решти зон (за замовчуванням - рівномірно).
+    """
+    if zone_weights is None:
+        zone_weights = {zone_id: 1 for zone_id in SimulationEngine.from_data(scenario_data, macros).trigger_zones()}
+    if not zone_weights:
+        raise ValueError("Scenario has no trigger zones to simulate.")
+    state_probabilities = state_probabilities or {state: 1 for state in ZONE_STATES}
+    zone_probabilities = zone_probabilities or {}
+
+    options = (max_steps, bin_seconds)
+    tasks = [(scenario_data, macros, min(CHUNK_SIZE, runs - start), f"{seed}/{number}", zone_weights,
+              zone_probabilities, state_probabilities, options)
+             for number, start in enumerate(range(0, runs, CHUNK_SIZE))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    log.debug(f"Monte-Carlo: {runs} runs in {len(tasks)} chunks on {workers} workers.")
+    stats = MonteCarloStats(bin_seconds)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_stats in executor.map(_run_chunk, tasks):
+                stats.merge(chunk_stats)
+    else:
+        for task in tasks:
+            stats.merge(_run_chunk(task))
+    return stats
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Опис типів вузлів на рівні даних: які сокети має кожен тип вузла.
+Відповідає сокетам, які створюють класи вузлів у nodes.py.
+"""
+
+# Типи вузлів, якими може завершуватись ланцюжок логіки
+TERMINAL_NODE_TYPES = frozenset({'ActivateOutputNode', 'DeactivateOutputNode', 'SendSMSNode'})
+
+# {node_type: (вхідні сокети, вихідні сокети)}
+NODE_SOCKETS = {
+    'TriggerNode': ((), ("out",)),
+    'ActivateOutputNode': (("in",), ()),
+    'DeactivateOutputNode': (("in",), ()),
+    'SendSMSNode': (("in",), ()),
+    'DelayNode': (("in",), ("out",)),
+    'SequenceNode': (("in",), ("out",)),
+    'ConditionNodeZoneState': (("in",), ("out_true", "out_false")),
+    'RepeatNode': (("in",), ("out_loop", "out_end")),
+    'MacroInputNode': ((), ("out",)),
+    'MacroOutputNode': (("in",), ()),
+}
+_DEFAULT_SOCKETS = (("in",), ("out",))
+
+
+def node_sockets(node_data, macros=None):
+    """
+    Повертає (вхідні, вихідні) імена сокетів вузла.
+    Сокети MacroNode визначаються входами/виходами його макросу.
+    """
+    node_type = node_data.get('node_type')
+    if node_type == 'MacroNode':
+        macro_data = (macros or {}).get(node_data.get('macro_id'))
+        if not macro_data:
+            return (), ()
+        return (tuple(io.get('name') for io in macro_data.get('inputs', [])),
+                tuple(io.get('name') for io in macro_data.get('outputs', [])))
+    return NODE_SOCKETS.get(node_type, _DEFAULT_SOCKETS)
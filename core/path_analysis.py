@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Перебір усіх шляхів виконання сценарію за станами зон.
+
+Сценарій виконується двигуном core.simulation, а вузли "Умова" отримують стан
+зони з обмежень поточної гілки: спочатку стан зони невідомий (можливі всі
+ZONE_STATES), і коли результат умови від нього залежить, виконання
+розгалужується на "стан = очікуваний" та "стан - будь-який інший". Тому
+кількість гілок визначається кількістю різних рішень, а не 3^кількість_зон.
+
+Спільні ділянки шляхів рахуються один раз: результат продовження з точки
+розгалуження запам'ятовується за (активні вузли, лічильники "Повторів",
+обмеження лише тих зон, умови яких ще досяжні). Якщо обидві гілки дають
+однаковий результат, зона з умов шляху вилучається (дублікати не звітуються).
+"""
+import logging
+from collections import namedtuple
+
+from core.graph import data_node_info
+from core.compiler import compile_graph
+from core.simulation import SimulationEngine, TriggerZoneState, ZONE_STATES, RUNNING, DEFAULT_MAX_STEPS
+
+log = logging.getLogger(__name__)
+
+_ALL_STATES = frozenset(ZONE_STATES)
+
+# zone_id - зона тригера; conditions - кортеж (zone_id, кортеж можливих станів) - стани зон,
+# за яких виконується шлях (зони, від яких шлях не залежить, не вказуються);
+# actions - ID виконаних вузлів дій у порядку першого виконання; status - статус прогону (core.simulation)
+PathOutcome = namedtuple('PathOutcome', 'zone_id conditions actions status')
+
+
+class _Branch(Exception):
+    """Результат умови залежить від ще не визначеного стану зони - потрібне розгалуження."""
+
+    def __init__(self, zone_id, expected):
+        super().__init__(zone_id, expected)
+        self.zone_id = zone_id
+        self.expected = expected
+
+
+class _ConstraintZoneState:
+    """Оракул станів зон за обмеженнями гілки {zone_id: frozenset можливих станів}."""
+    __slots__ = ('enumerator', 'constraints')
+
+    def __init__(self, enumerator):
+        self.enumerator = enumerator
+        self.constraints = {}
+
+    def state(self, zone_id, node_id=None):
+        possible = self.constraints.get(zone_id, _ALL_STATES)
+        expected = self.enumerator.expected_state(node_id)
+        if expected in possible:
+            if len(possible) > 1:
+                raise _Branch(zone_id, expected)
+            return expected
+        return next(state for state in ZONE_STATES if state in possible)
+
+
+def _ordered_states(states):
+    return tuple(state for state in ZONE_STATES if state in states)
+
+
+class _Task:
+    """Продовження виконання на робочому стеку PathEnumerator: стан, ключ пам'яті та розгалуження."""
+    __slots__ = ('current', 'loop_counters', 'constraints', 'key', 'branch', 'options', 'prefix', 'outcomes')
+
+    def __init__(self, current, loop_counters, constraints, key):
+        self.current = current
+        self.loop_counters = loop_counters
+        self.constraints = constraints
+        self.key = key
+        self.branch = None  # _Branch, коли продовження розгалузилось
+        self.options = ()
+        self.prefix = ()
+        self.outcomes = []
+
+
+class PathEnumerator:
+    """
+    Перебирає шляхи виконання скомпільованого сценарію (core.compiler.Program).
+    Запам'ятовані продовження спільні для всіх зон тригера, тому перебір кількох
+    зон майже не дорожчий за одну. Розгалуження обробляються явним робочим стеком,
+    тож глибина ланцюжка умов не обмежена глибиною рекурсії Python.
+    """
+    __slots__ = ('program', 'engine', '_oracle', '_memo', '_trigger_zone')
+
+    def __init__(self, program, max_steps=DEFAULT_MAX_STEPS):
+        self.program = program
+        self._oracle = _ConstraintZoneState(self)
+        self.engine = SimulationEngine(program, self._oracle, max_steps)
+        self._memo = {}
+        self._trigger_zone = None
+
+    def expected_state(self, node_id):
+        return self.program.operands[self.program.index[node_id]][1]
+
+    def enumerate(self, zone_id):
+        """
+        Повертає список PathOutcome - по одному на кожну різну комбінацію рішень умов.
+        Зона тригера у стані ALARM_STATE (як у simulate_all_zones), тож її умови не розгалужуються.
+        """
+        self._trigger_zone = zone_id
+        self.engine.zone_state = TriggerZoneState(zone_id, self._oracle)
+        status = self.engine.start(zone_id)
+        if status != RUNNING:
+            return [PathOutcome(zone_id, (), (), status)]
+        results = self._explore(self.engine.current, {}, {})
+        return [PathOutcome(zone_id, _conditions(delta), actions, status) for delta, actions, status in results]
+
+    def _task(self, current, loop_counters, constraints):
+        """
+        Продовження зі стану (current, loop_counters) за обмежень constraints. Ключ пам'яті
+        містить лише обмеження зон, умови яких ще досяжні (і зону тригера, якщо вона серед них).
+        """
+        zones_from = self.program.condition_zones_from()
+        relevant = set()
+        for number in (*current, *loop_counters):
+            relevant |= zones_from[number]
+        key = (current, frozenset(loop_counters.items()),
+               frozenset((zone_id, states) for zone_id, states in constraints.items() if zone_id in relevant),
+               self._trigger_zone if self._trigger_zone in relevant else None)
+        return _Task(current, loop_counters, constraints, key)
+
+    def _explore(self, current, loop_counters, constraints):
+        """
+        Продовження виконання зі стану (current, loop_counters) за обмежень constraints.
+        Повертає кортеж (уточнення обмежень, дії, статус); уточнення - кортеж (zone_id, стани).
+        """
+        stack = [self._task(current, loop_counters, constraints)]
+        result = None
+        while stack:
+            task = stack[-1]
+            if task.branch is None:
+                result = self._memo.get(task.key)
+                if result is None:
+                    result = self._run(task)
+                if result is None: # Розгалуження - спершу гілка "стан = очікуваний"
+                    stack.append(self._child(task, 0))
+                    continue
+            elif len(task.outcomes) < len(task.options):
+                stack.append(self._child(task, len(task.outcomes)))
+                continue
+            else:
+                result = self._merge(task)
+            self._memo[task.key] = result
+            stack.pop()
+            if stack:
+                stack[-1].outcomes.append(result)
+        return result
+
+    def _run(self, task):
+        """Виконує продовження до кінця (повертає результат) або до розгалуження (заповнює task, повертає None)."""
+        engine = self.engine
+        engine.resume(task.current, task.loop_counters)
+        self._oracle.constraints = task.constraints
+        while True:
+            snapshot = (engine.current, dict(engine.loop_counters))
+            try:
+                if engine.step() is None:
+                    break
+            except _Branch as branch:
+                possible = task.constraints.get(branch.zone_id, _ALL_STATES)
+                task.branch = branch
+                task.options = (frozenset({branch.expected}), possible - {branch.expected})
+                task.prefix = engine.trace().action_ids()
+                task.current, task.loop_counters = snapshot
+                return None
+        return (((), tuple(dict.fromkeys(engine.trace().action_ids())), engine.status),)
+
+    def _child(self, task, number):
+        zone_id = task.branch.zone_id
+        return self._task(task.current, task.loop_counters, {**task.constraints, zone_id: task.options[number]})
+
+    def _merge(self, task):
+        zone_id, prefix, outcomes = task.branch.zone_id, task.prefix, task.outcomes
+        if outcomes[0] == outcomes[1]: # Результат не залежить від стану зони
+            return tuple((delta, _join(prefix, actions), status) for delta, actions, status in outcomes[0])
+        return tuple((((zone_id, states),) + delta, _join(prefix, actions), status)
+                     for states, outcome in zip(task.options, outcomes) for delta, actions, status in outcome)
+
+
+def _join(prefix, actions):
+    return tuple(dict.fromkeys(prefix + actions))
+
+
+def _conditions(delta):
+    """Уточнення гілки -> кортеж (zone_id, стани); для зони береться останнє (найточніше) уточнення."""
+    conditions = {}
+    for zone_id, states in delta:
+        conditions[zone_id] = _ordered_states(states)
+    return tuple(conditions.items())
+
+
+def enumerate_paths(graph, zone_ids=None, node_info=data_node_info, max_steps=DEFAULT_MAX_STEPS, macros=None):
+    """
+    Перебирає шляхи графа сценарію для зон тригера zone_ids (за замовчуванням - усіх зон тригера).
+    Граф компілюється (core.compiler.compile_graph, MacroNode з macros розгортаються).
+    Повертає список PathOutcome.
+    """
+    return enumerate_program_paths(compile_graph(graph, macros, node_info), zone_ids, max_steps)
+
+
+def enumerate_program_paths(program, zone_ids=None, max_steps=DEFAULT_MAX_STEPS):
+    """Те саме, що enumerate_paths, для вже скомпільованої програми (core.compiler.Program)."""
+    enumerator = PathEnumerator(program, max_steps)
+    outcomes = []
+    for zone_id in (program.trigger_zones() if zone_ids is None else zone_ids):
+        outcomes.extend(enumerator.enumerate(zone_id))
+    log.debug(f"Path enumeration: {len(outcomes)} paths, {len(enumerator._memo)} memoized states.")
+    return outcomes
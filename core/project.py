@@ -0,0 +1,640 @@
+# -*- coding: utf-8 -*-
+"""
+Операції над даними проекту (сценарії, макроси, конфігурація) без залежності від Qt.
+
+ProjectModel містить усю логіку роботи зі словником project_data.
+Сповіщення про зміни виконуються через _notify_changed() (список ProjectChange), який у GUI
+перевизначає Qt-адаптер project_manager.ProjectManager.
+"""
+import uuid
+import logging
+
+from core.xml_codec import (LazyScenarioData, # Сирі сценарії лінивого імпорту
+                            serialize_scenario_fragment, serialize_macro_fragment)
+from core.config_index import ConfigIndex
+from core.events import (ProjectChange, device_changes, CONFIG_ITEM_KINDS,
+                         PROJECT, SCENARIO, MACRO, USER, ADDED, REMOVED, RENAMED, CHANGED, RESET)
+
+log = logging.getLogger(__name__)
+
+# Визначення конфігурацій пристроїв (перенесено сюди з main_window)
+DEVICE_SPECS = {
+    "MOUT8R": {"type": "Модуль релейних виходів", "outputs": 8, "zones": 0},
+    "PUIZ 2": {"type": "Пристрій індикації", "outputs": 0, "zones": 2},
+    "ППКП Tiras-8L": {"type": "Базовий прилад", "outputs": 2, "zones": 8}
+}
+
+class ProjectSnapshot(dict):
+    """
+    Знімок даних проекту на момент певної версії.
+
+    Верхній рівень ('scenarios', 'macros', 'config') - власні неглибокі копії,
+    а вкладені структури спільні з ProjectModel: модель ніколи не змінює
+    збережені словники сценаріїв, макросів і конфігурації на місці, а замінює
+    їх новими (copy-on-write). Тому знімок лишається узгодженим після будь-яких
+    подальших змін і не потребує глибокого копіювання. Змінювати знімок не можна.
+    """
+    __slots__ = ('version',)
+
+    def __init__(self, project_data, version):
+        super().__init__(scenarios=dict(project_data.get('scenarios', {})),
+                         macros=dict(project_data.get('macros', {})),
+                         config=project_data.get('config', {}))
+        self.version = version
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("ProjectSnapshot is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+class ProjectModel:
+    """
+    Клас для управління даними проекту: сценаріями, макросами та конфігурацією.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.project_data = {}
+        # Кеш серіалізованих фрагментів для інкрементного експорту:
+        # {('scenario'|'macro', id): bytes}. Відсутність запису = елемент "брудний".
+        self._fragment_cache = {}
+        # Версія конфігурації збільшується при кожній зміні; індекс перебудовується ліниво
+        self._config_version = 0
+        self._config_index = None
+        # Версія даних проекту (будь-яка зміна) та закешований знімок для неї
+        self._data_version = 0
+        self._snapshot = None
+        log.info(f"{type(self).__name__} initialized.")
+        # self.new_project() # Не викликаємо тут, щоб уникнути подвійної ініціалізації
+
+    def _notify_changed(self, changes):
+        """
+        Сповіщає про зміни проекту: changes - список core.events.ProjectChange.
+        Без GUI нічого не робить.
+        """
+        pass
+
+    def new_project(self):
+        """Створює структуру даних для нового порожнього проекту."""
+        log.info("Creating new project structure.")
+        self._fragment_cache.clear()
+        self._invalidate_config_index()
+        self._touch()
+        self.project_data = {
+            'scenarios': {},
+            'macros': {},
+            'config': {
+                'devices': [],
+                'users': [{'id': str(uuid.uuid4()), 'name': 'Адміністратор', 'phone': '+380000000000'}]
+            }
+        }
+        # Додаємо базовий прилад за замовчуванням
+        self.add_device("ППКП Tiras-8L", emit_signal=False) # Не сповіщаємо про оновлення тут
+        # Додаємо перший сценарій
+        self.add_scenario("Сценарій 1", emit_signal=False) # Не сповіщаємо про оновлення тут
+        self._notify_changed([ProjectChange(PROJECT, RESET)]) # Сповіщаємо один раз в кінці
+
+    def load_project(self, data):
+        """Завантажує дані існуючого проекту."""
+        log.info("Loading project data into project model.")
+        if isinstance(data, dict):
+            # TODO: Додати валідацію структури даних 'data'
+            self.project_data = data
+            self._fragment_cache.clear()
+            self._invalidate_config_index()
+            self._touch()
+            # Переконатись, що основні ключі існують
+            self.project_data.setdefault('scenarios', {})
+            self.project_data.setdefault('macros', {})
+            self.project_data.setdefault('config', {'devices': [], 'users': []})
+            self.project_data['config'].setdefault('devices', [])
+            self.project_data['config'].setdefault('users', [])
+            log.debug(f"Project data loaded. Scenarios: {len(self.project_data['scenarios'])}, Macros: {len(self.project_data['macros'])}")
+            self._notify_changed([ProjectChange(PROJECT, RESET)]) # Сповістити про оновлення
+            return True
+        else:
+            log.error("Failed to load project data: Invalid data format.")
+            return False
+
+    def _touch(self):
+        """Збільшує версію даних проекту: наступний get_project_data() створить новий знімок."""
+        self._data_version += 1
+        self._snapshot = None
+
+    def get_project_data(self):
+        """
+        Повертає ProjectSnapshot поточних даних проекту.
+        Повторні виклики без змін повертають той самий знімок; після змін
+        копіюються лише словники верхнього рівня, решта структури спільна.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._data_version:
+            snapshot = ProjectSnapshot(self.project_data, self._data_version)
+            self._snapshot = snapshot
+        return snapshot
+
+    # --- Scenario Management ---
+
+    def get_scenario_ids(self):
+        """Повертає відсортований список ID (імен) сценаріїв."""
+        return sorted(self.project_data.get('scenarios', {}).keys())
+
+    def get_first_scenario_id(self):
+        """Повертає ID першого сценарію зі списку або None."""
+        ids = self.get_scenario_ids()
+        return ids[0] if ids else None
+
+    def get_scenario_data(self, scenario_id):
+        """
+        Повертає дані конкретного сценарію або None.
+        Сценарій, завантажений ліниво, декодується при першому зверненні і кешується.
+        """
+        scenario_data = self.project_data.get('scenarios', {}).get(scenario_id)
+        if isinstance(scenario_data, LazyScenarioData):
+            scenario_data = self._materialize_scenario(scenario_id, scenario_data)
+        return scenario_data
+
+    def _materialize_scenario(self, scenario_id, lazy_data):
+        """Декодує сирий фрагмент сценарію і замінює його в project_data."""
+        log.debug(f"Decoding lazily loaded scenario: {scenario_id} ({len(lazy_data.raw)} bytes)")
+        try:
+            scenario_data = lazy_data.decode()
+        except Exception as e:
+            log.error(f"Failed to decode scenario '{scenario_id}': {e}", exc_info=True)
+            return None
+        self.project_data['scenarios'][scenario_id] = scenario_data
+        return scenario_data
+
+    def add_scenario(self, name=None, emit_signal=True):
+        """
+        Додає новий порожній сценарій. Генерує унікальне ім'я, якщо не надано.
+        Повертає ім'я створеного сценарію або None у разі помилки.
+        """
+        scenarios = self.project_data.setdefault('scenarios', {})
+        if name is None:
+            i = 1
+            base_name = "Новий сценарій"
+            name = base_name
+            while name in scenarios:
+                name = f"{base_name} {i}"
+                i += 1
+        elif name in scenarios:
+            log.warning(f"Scenario '{name}' already exists. Cannot add.")
+            return None # Ім'я вже зайняте
+
+        log.info(f"Adding new scenario: {name}")
+        scenarios[name] = {'nodes': [], 'connections': [], 'comments': [], 'frames': []}
+        self._mark_dirty('scenario', name)
+        if emit_signal:
+            self._notify_changed([ProjectChange(SCENARIO, ADDED, name)])
+        return name
+
+    def remove_scenario(self, scenario_id, emit_signal=True):
+        """Видаляє сценарій за ID (іменем). Повертає True при успіху."""
+        scenarios = self.project_data.get('scenarios', {})
+        if scenario_id in scenarios:
+            log.info(f"Removing scenario: {scenario_id}")
+            del scenarios[scenario_id]
+            self._mark_dirty('scenario', scenario_id)
+            if emit_signal:
+                self._notify_changed([ProjectChange(SCENARIO, REMOVED, scenario_id)])
+            return True
+        else:
+            log.warning(f"Scenario '{scenario_id}' not found. Cannot remove.")
+            return False
+
+    def rename_scenario(self, old_id, new_id, emit_signal=True):
+        """Перейменовує сценарій. Повертає True при успіху."""
+        scenarios = self.project_data.get('scenarios', {})
+        if old_id not in scenarios:
+            log.warning(f"Scenario '{old_id}' not found. Cannot rename.")
+            return False
+        if new_id == old_id:
+            return True # Ім'я не змінилось
+        if new_id in scenarios:
+            log.warning(f"Scenario name '{new_id}' already exists. Cannot rename.")
+            return False
+
+        log.info(f"Renaming scenario '{old_id}' to '{new_id}'")
+        scenarios[new_id] = scenarios.pop(old_id)
+        self._mark_dirty('scenario', old_id)
+        self._mark_dirty('scenario', new_id)
+        if emit_signal:
+            self._notify_changed([ProjectChange(SCENARIO, RENAMED, new_id, old_id=old_id)])
+        return True
+
+    def update_scenario_data(self, scenario_id, scene_data, emit_signal=False):
+        """Оновлює дані сценарію даними зі сцени."""
+        if scenario_id in self.project_data.get('scenarios', {}):
+            log.debug(f"Updating data for scenario: {scenario_id}")
+            # TODO: Додати перевірку валідності scene_data?
+            if self.project_data['scenarios'][scenario_id] != scene_data:
+                self._mark_dirty('scenario', scenario_id) # Перемикання без змін не робить сценарій брудним
+            self.project_data['scenarios'][scenario_id] = scene_data
+            if emit_signal: # Зазвичай не потрібно сповіщати UI при кожному збереженні стану
+                self._notify_changed([ProjectChange(SCENARIO, CHANGED, scenario_id)])
+            return True
+        else:
+            log.warning(f"Scenario '{scenario_id}' not found. Cannot update data.")
+            return False
+
+    # --- Macro Management ---
+
+    def get_macros_data(self):
+        """Повертає словник з усіма визначеннями макросів."""
+        return self.project_data.get('macros', {})
+
+    def get_macro_data(self, macro_id):
+        """Повертає дані конкретного макросу або None."""
+        return self.project_data.get('macros', {}).get(macro_id)
+
+    def add_or_update_macro(self, macro_id, macro_data, emit_signal=True):
+        """Додає новий макрос або оновлює існуючий."""
+        if not macro_id or not isinstance(macro_data, dict):
+             log.error("Cannot add/update macro: Invalid ID or data.")
+             return False
+        log.info(f"Adding/Updating macro definition: {macro_id} (Name: {macro_data.get('name', '?')})")
+        macros = self.project_data.setdefault('macros', {})
+        is_new = macro_id not in macros
+        macros[macro_id] = macro_data
+        self._mark_dirty('macro', macro_id)
+        if emit_signal:
+             self._notify_changed([ProjectChange(MACRO, ADDED if is_new else CHANGED, macro_id)])
+        return True
+
+    def remove_macro(self, macro_id, emit_signal=True):
+        """Видаляє визначення макросу. Повертає True при успіху."""
+        macros = self.project_data.get('macros', {})
+        if macro_id in macros:
+            log.info(f"Removing macro definition: {macro_id}")
+            del macros[macro_id]
+            self._mark_dirty('macro', macro_id)
+            if emit_signal:
+                self._notify_changed([ProjectChange(MACRO, REMOVED, macro_id)])
+            return True
+        else:
+            log.warning(f"Macro definition '{macro_id}' not found. Cannot remove.")
+            return False
+
+    def rename_macro(self, macro_id, new_name, emit_signal=True):
+        """Перейменовує макрос. Повертає True при успіху."""
+        macros = self.project_data.get('macros', {})
+        if macro_id not in macros:
+            log.warning(f"Macro definition '{macro_id}' not found. Cannot rename.")
+            return False
+        if macros[macro_id].get('name') == new_name:
+            return True # Ім'я не змінилось
+
+        # Перевірка на унікальність нового імені
+        if self.is_macro_name_taken(new_name, exclude_id=macro_id):
+             log.warning(f"Macro name '{new_name}' already exists. Cannot rename.")
+             return False
+
+        log.info(f"Renaming macro '{macro_id}' to '{new_name}'")
+        macros[macro_id] = {**macros[macro_id], 'name': new_name} # Заміна замість зміни на місці (copy-on-write)
+        self._mark_dirty('macro', macro_id)
+        if emit_signal:
+            self._notify_changed([ProjectChange(MACRO, RENAMED, macro_id)])
+        return True
+
+    # --- ДОДАНО МЕТОД ---
+    def is_macro_name_taken(self, name, exclude_id=None):
+        """Перевіряє, чи існує макрос з таким ім'ям (окрім зазначеного ID)."""
+        if not name: return False # Порожнє ім'я вважається не зайнятим
+        macros = self.project_data.get('macros', {})
+        for mid, mdata in macros.items():
+            if mid == exclude_id:
+                continue # Пропускаємо макрос, який перейменовуємо
+            if mdata.get('name') == name:
+                log.debug(f"Macro name '{name}' is already taken by macro {mid}.") # Діагностичне повідомлення
+                return True
+        log.debug(f"Macro name '{name}' is available.") # Діагностичне повідомлення
+        return False
+    # --- КІНЕЦЬ ДОДАНОГО МЕТОДУ ---
+
+    def update_macro_data(self, macro_id, scene_data, emit_signal=False):
+        """
+        Оновлює вузли та з'єднання макросу даними зі сцени,
+        а також оновлює списки 'inputs'/'outputs' у визначенні макросу.
+        Повертає оновлені дані макросу, якщо списки IO змінилися, інакше None.
+        """
+        macros = self.project_data.get('macros', {})
+        if macro_id in macros:
+            log.debug(f"Updating data for macro: {macro_id}")
+            # Нове визначення замість зміни старого на місці (copy-on-write):
+            # знімки проекту, що посилаються на старе визначення, лишаються незмінними
+            old_macro_data = macros[macro_id]
+            old_inputs = old_macro_data.get('inputs', [])
+            old_outputs = old_macro_data.get('outputs', [])
+
+            # Оновлюємо базові дані зі сцени
+            macro_data = {**old_macro_data,
+                          'nodes': scene_data.get('nodes', []),
+                          'connections': scene_data.get('connections', []),
+                          'comments': scene_data.get('comments', []), # Додаємо збереження
+                          'frames': scene_data.get('frames', [])}     # Додаємо збереження
+
+            # Оновлюємо списки inputs/outputs на основі вузлів на сцені
+            new_inputs = []
+            new_outputs = []
+            for node_data in macro_data['nodes']:
+                node_type = node_data.get('node_type')
+                node_id = node_data.get('id')
+                node_name = node_data.get('name')
+                if node_type == 'MacroInputNode':
+                    new_inputs.append({'name': node_name, 'macro_input_node_id': node_id})
+                elif node_type == 'MacroOutputNode':
+                    new_outputs.append({'name': node_name, 'macro_output_node_id': node_id})
+
+            # Сортуємо для консистентності (не обов'язково, але корисно)
+            new_inputs.sort(key=lambda x: x.get('name', ''))
+            new_outputs.sort(key=lambda x: x.get('name', ''))
+
+            # Перевіряємо, чи змінились входи/виходи
+            io_changed = (old_inputs != new_inputs or old_outputs != new_outputs)
+            log.debug(f"  Macro IO changed: {io_changed}")
+
+            macro_data['inputs'] = new_inputs
+            macro_data['outputs'] = new_outputs
+            macros[macro_id] = macro_data
+            self._mark_dirty('macro', macro_id)
+
+            if emit_signal:
+                self._notify_changed([ProjectChange(MACRO, CHANGED, macro_id)])
+
+            # Повертаємо оновлені дані, якщо IO змінилися, щоб MainWindow міг оновити MacroNode
+            return macro_data if io_changed else None
+        else:
+            log.warning(f"Macro definition '{macro_id}' not found. Cannot update data.")
+            return None
+
+    def update_macro_io_name(self, macro_id, io_node_id, io_type, new_name, emit_signal=True):
+        """Оновлює ім'я входу або виходу у визначенні макросу."""
+        macro_data = self.get_macro_data(macro_id)
+        if not macro_data:
+            log.warning(f"Cannot update IO name: Macro {macro_id} not found.")
+            return False
+
+        io_list_key = 'inputs' if io_type == 'input' else 'outputs'
+        node_id_key = 'macro_input_node_id' if io_type == 'input' else 'macro_output_node_id'
+
+        io_list = macro_data.get(io_list_key, [])
+        found = False
+        io_changed = False
+        for i, io_def in enumerate(io_list):
+            if io_def.get(node_id_key) == io_node_id:
+                if io_def.get('name') != new_name:
+                    log.debug(f"Updating macro {macro_id} {io_type} node {io_node_id} name to '{new_name}'")
+                    new_io_list = list(io_list)
+                    new_io_list[i] = {**io_def, 'name': new_name}
+                    self.project_data['macros'][macro_id] = {**macro_data, io_list_key: new_io_list}
+                    io_changed = True
+                    self._mark_dirty('macro', macro_id)
+                found = True
+                break
+
+        if not found:
+             log.warning(f"Could not find {io_type} definition for node {io_node_id} in macro {macro_id}")
+             return False
+
+        if io_changed and emit_signal:
+             self._notify_changed([ProjectChange(MACRO, CHANGED, macro_id, key=io_list_key)])
+
+        return io_changed # Повертаємо True, якщо ім'я дійсно змінилось
+
+    def check_macro_usage(self, macro_id):
+        """Перевіряє, чи використовується макрос у сценаріях."""
+        usage_count = 0
+        usage_scenarios = []
+        for scenario_id in list(self.project_data.get('scenarios', {})):
+            scenario_data = self.project_data['scenarios'][scenario_id]
+            if isinstance(scenario_data, LazyScenarioData):
+                if not scenario_data.mentions(macro_id):
+                    continue # ID макросу не зустрічається у фрагменті - декодувати не потрібно
+                scenario_data = self._materialize_scenario(scenario_id, scenario_data) or {}
+            for node_data in scenario_data.get('nodes', []):
+                # Перевіряємо за ім'ям класу та ID макросу
+                if node_data.get('node_type') == 'MacroNode' and node_data.get('macro_id') == macro_id:
+                    usage_count += 1
+                    if scenario_id not in usage_scenarios:
+                        usage_scenarios.append(scenario_id)
+        log.debug(f"Macro {macro_id} usage check: Count={usage_count}, Scenarios={usage_scenarios}")
+        return usage_count, usage_scenarios
+
+    # --- Incremental Export ---
+
+    def _mark_dirty(self, kind, item_id):
+        """Позначає сценарій/макрос як змінений: його фрагмент буде серіалізовано заново."""
+        self._fragment_cache.pop((kind, item_id), None)
+        self._touch()
+
+    def get_dirty_ids(self, kind):
+        """Повертає множину ID сценаріїв ('scenario') або макросів ('macro'), змінених з останнього експорту."""
+        section = self.project_data.get('scenarios' if kind == 'scenario' else 'macros', {})
+        return {item_id for item_id in section if (kind, item_id) not in self._fragment_cache}
+
+    def get_scenario_fragment(self, scenario_id):
+        """Повертає серіалізований фрагмент <scenario> з кешу або створює його заново."""
+        key = ('scenario', scenario_id)
+        fragment = self._fragment_cache.get(key)
+        if fragment is None:
+            scenario_data = self.project_data['scenarios'][scenario_id]
+            fragment = serialize_scenario_fragment(scenario_id, scenario_data)
+            self._fragment_cache[key] = fragment
+        return fragment
+
+    def get_macro_fragment(self, macro_id):
+        """Повертає серіалізований фрагмент <macro> з кешу або створює його заново."""
+        key = ('macro', macro_id)
+        fragment = self._fragment_cache.get(key)
+        if fragment is None:
+            fragment = serialize_macro_fragment(macro_id, self.project_data['macros'][macro_id])
+            self._fragment_cache[key] = fragment
+        return fragment
+
+    def iter_export_fragments(self):
+        """
+        Повертає (config, фрагменти сценаріїв, фрагменти макросів) для
+        serialization.export_project_fragments. Заново серіалізуються лише брудні елементи.
+        """
+        dirty_scenarios = len(self.get_dirty_ids('scenario'))
+        dirty_macros = len(self.get_dirty_ids('macro'))
+        log.debug(f"Incremental export: {dirty_scenarios} dirty scenarios, {dirty_macros} dirty macros.")
+        scenario_fragments = (self.get_scenario_fragment(sid) for sid in list(self.project_data.get('scenarios', {})))
+        macro_fragments = (self.get_macro_fragment(mid) for mid in list(self.project_data.get('macros', {})))
+        return self.get_config_data(), scenario_fragments, macro_fragments
+
+    # --- Configuration Management ---
+
+    def get_config_data(self):
+        """Повертає словник з конфігурацією системи."""
+        return self.project_data.get('config', {})
+
+    def _replace_config(self, **changes):
+        """
+        Замінює конфігурацію новим словником зі зміненими розділами (copy-on-write).
+        Попередня конфігурація лишається незмінною у вже створених знімках.
+        """
+        self.project_data['config'] = {**self.project_data.get('config', {}), **changes}
+        self._invalidate_config_index()
+
+    def _invalidate_config_index(self):
+        """Позначає конфігурацію зміненою: індекс буде перебудовано при наступному запиті."""
+        self._config_version += 1
+        self._config_index = None
+        self._touch()
+
+    def get_config_version(self):
+        """Повертає номер версії конфігурації (змінюється при кожній зміні)."""
+        return self._config_version
+
+    def get_config_index(self):
+        """
+        Повертає ConfigIndex поточної конфігурації (пошук зон/виходів/користувачів за ID).
+        Індекс кешується до наступної зміни конфігурації. Його можна передавати
+        замість словника config у validate()/update_display_properties() вузлів.
+        """
+        index = self._config_index
+        if index is None or index.version != self._config_version:
+            index = ConfigIndex(self.get_config_data(), self._config_version)
+            self._config_index = index
+        return index
+
+    def get_all_zones_and_outputs(self):
+        """
+        Повертає списки всіх зон та виходів з усіх пристроїв
+        (з інформацією про батьківський пристрій, взяті з індексу конфігурації).
+        """
+        index = self.get_config_index()
+        return list(index.zones.values()), list(index.outputs.values())
+
+    def add_device(self, device_type, emit_signal=True):
+        """Додає новий пристрій до конфігурації."""
+        if device_type not in DEVICE_SPECS:
+            log.warning(f"Cannot add device: Unknown type '{device_type}'")
+            return None
+        spec = DEVICE_SPECS[device_type]
+        devices = self.get_config_data().get('devices', [])
+
+        device_count = sum(1 for d in devices if d.get('type') == device_type)
+        new_device_id = str(uuid.uuid4())
+        new_device_name = f"{device_type} #{device_count + 1}"
+        new_device = {'id': new_device_id, 'name': new_device_name, 'type': device_type,
+                      'zones': [], 'outputs': []}
+
+        for i in range(spec['zones']):
+            new_device['zones'].append({'id': str(uuid.uuid4()), 'name': f"Зона {i + 1}"})
+        for i in range(spec['outputs']):
+            new_device['outputs'].append({'id': str(uuid.uuid4()), 'name': f"Вихід {i + 1}"})
+
+        log.info(f"Adding device: {new_device_name} (ID: {new_device_id})")
+        self._replace_config(devices=devices + [new_device])
+        if emit_signal:
+            self._notify_changed(device_changes(new_device, ADDED))
+        return new_device_id
+
+    def remove_device(self, device_id, emit_signal=True):
+        """Видаляє пристрій з конфігурації. Повертає True при успіху."""
+        devices = self.get_config_data().get('devices', [])
+        new_devices = [d for d in devices if d.get('id') != device_id] # Видалення зі списку
+        removed_devices = [d for d in devices if d.get('id') == device_id]
+        removed = len(new_devices) < len(devices)
+
+        if removed:
+            log.info(f"Removed device: {device_id}")
+            self._replace_config(devices=new_devices)
+            if emit_signal:
+                self._notify_changed([change for device in removed_devices
+                                      for change in device_changes(device, REMOVED)])
+            return True
+        else:
+            log.warning(f"Device '{device_id}' not found. Cannot remove.")
+            return False
+
+    def add_user(self, name=None, phone='', emit_signal=True):
+        """Додає нового користувача."""
+        users = self.get_config_data().get('users', [])
+        if name is None:
+             name = f"Новий користувач {len(users) + 1}"
+        new_user_id = str(uuid.uuid4())
+        new_user = {'id': new_user_id, 'name': name, 'phone': phone}
+        log.info(f"Adding user: {name} (ID: {new_user_id})")
+        self._replace_config(users=users + [new_user])
+        if emit_signal:
+            self._notify_changed([ProjectChange(USER, ADDED, new_user_id)])
+        return new_user_id
+
+    def remove_user(self, user_id, emit_signal=True):
+        """Видаляє користувача. Повертає True при успіху."""
+        users = self.get_config_data().get('users', [])
+        new_users = [u for u in users if u.get('id') != user_id]
+        removed = len(new_users) < len(users)
+        if removed:
+            log.info(f"Removed user: {user_id}")
+            self._replace_config(users=new_users)
+            if emit_signal:
+                self._notify_changed([ProjectChange(USER, REMOVED, user_id)])
+            return True
+        else:
+            log.warning(f"User '{user_id}' not found. Cannot remove.")
+            return False
+
+    def update_config_item(self, item_type, item_id, data_key, new_value, emit_signal=False):
+        """
+        Оновлює поле (data_key) для елемента конфігурації (item_type) з вказаним ID.
+        item_type може бути 'devices', 'zones', 'outputs', 'users'.
+        Змінений елемент та його батьківські списки замінюються копіями (copy-on-write).
+        Повертає True, якщо оновлення відбулося.
+        """
+        log.debug(f"Updating config: Type={item_type}, ID={item_id}, Key={data_key}, Value={new_value}")
+        config = self.get_config_data()
+        updated = False
+
+        if item_type == 'devices':
+            devices = list(config.get('devices', []))
+            for i, device in enumerate(devices):
+                if device.get('id') == item_id:
+                    if device.get(data_key) != new_value:
+                        devices[i] = {**device, data_key: new_value}
+                        log.info(f"Device {item_id} updated: {data_key} = {new_value}")
+                        updated = True
+                        # Якщо змінили ім'я пристрою, оновити parent_name у його зонах/виходах не потрібно,
+                        # оскільки індекс конфігурації (get_all_zones_and_outputs) бере його з пристрою.
+                    break
+            if updated:
+                self._replace_config(devices=devices)
+        elif item_type in ('zones', 'outputs'):
+            devices = list(config.get('devices', []))
+            label = "Zone" if item_type == 'zones' else "Output"
+            for i, device in enumerate(devices):
+                items = device.get(item_type, [])
+                for j, item in enumerate(items):
+                    if item.get('id') == item_id:
+                        if item.get(data_key) != new_value:
+                            new_items = list(items)
+                            new_items[j] = {**item, data_key: new_value}
+                            devices[i] = {**device, item_type: new_items}
+                            log.info(f"{label} {item_id} (in {device.get('id')}) updated: {data_key} = {new_value}")
+                            updated = True
+                        break # Знайшли елемент, виходимо з внутрішнього циклу
+                if updated: break # Виходимо із зовнішнього циклу, якщо вже оновили
+            if updated:
+                self._replace_config(devices=devices)
+        elif item_type == 'users':
+            users = list(config.get('users', []))
+            for i, user in enumerate(users):
+                if user.get('id') == item_id:
+                    if user.get(data_key) != new_value:
+                        users[i] = {**user, data_key: new_value}
+                        log.info(f"User {item_id} updated: {data_key} = {new_value}")
+                        updated = True
+                    break
+            if updated:
+                self._replace_config(users=users)
+
+        if updated and emit_signal: # Зазвичай оновлення відбувається з UI, тому сигнал не потрібен тут
+            self._notify_changed([ProjectChange(CONFIG_ITEM_KINDS[item_type], CHANGED, item_id, key=data_key)])
+
+        return updated
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Читання/запис файлів проекту без Qt. Формат визначається за розширенням:
+*.tsb - бінарний контейнер (core.binary_format), інакше XML (core.xml_codec).
+Помилки піднімаються як винятки.
+"""
+import logging
+
+from core.xml_codec import read_project_xml, write_project_xml, materialize_scenarios
+from core.binary_format import is_binary_path, read_project as read_binary_project, \
+    write_project as write_binary_project
+
+log = logging.getLogger(__name__)
+
+
+def read_project_file(path, streaming=False, lazy=False, workers=None):
+    """Читає файл проекту і повертає словник project_data."""
+    if is_binary_path(path):
+        return read_binary_project(path)
+    return read_project_xml(path, streaming=streaming, lazy=lazy, workers=workers)
+
+
+def write_project_file(path, project_data):
+    """Записує project_data у файл проекту."""
+    if is_binary_path(path):
+        write_binary_project(path, materialize_scenarios(project_data))
+    else:
+        write_project_xml(path, project_data)
+
+
+def convert_project_file(source_path, target_path):
+    """Конвертує файл проекту між форматами, визначеними за розширеннями шляхів."""
+    log.info(f"Converting project file {source_path} -> {target_path}")
+    write_project_file(target_path, read_project_file(source_path, streaming=True))
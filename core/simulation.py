@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Безголова (без Qt) симуляція виконання сценарію.
+
+SimulationEngine виконує скомпільований сценарій (core.compiler.Program)
+покроково, як ScenarioSimulator у GUI: на кожному кроці обробляються всі активні вузли, і наступний крок складається
+з вузлів, до яких перейшло виконання. Стан зон для вузлів "Умова" повертає
+оракул (ZoneState або будь-який об'єкт з методом state(zone_id, node_id)),
+тому прогін не потребує діалогів і може повторюватись тисячі разів (тести, CI).
+
+Виконання подієве: переходи до наступних вузлів ставляться у чергу (heapq) з
+віртуальним часом, а крок - це всі активації з найменшим часом. У режимі
+timed=True вузол "Затримка" відкладає перехід на 'seconds' віртуальних секунд,
+тому паралельні гілки виконуються одночасно, а весь сценарій з хвилинами
+затримок прокручується миттєво; без timed усі переходи відбуваються в момент 0
+і кроки збігаються з покроковим виконанням у GUI.
+
+Результат прогону - SimulationTrace: послідовність кроків SimulationStep з
+активними вузлами, пройденими ребрами, рішеннями вузлів та часом. GUI лише
+відображає кроки двигуна на сцені.
+"""
+import itertools
+import logging
+from heapq import heappush, heappop
+from collections import namedtuple
+
+from core.compiler import compile_scenario, OP_ACTION, OP_CONDITION, OP_DELAY, OP_REPEAT
+
+log = logging.getLogger(__name__)
+
+# Можливі стани зони (значення властивості 'state' вузла "Умова")
+ZONE_STATES = ("Під охороною", "Знята з охорони", "Тривога")
+# Стан зони, що спрацювала (зони тригера під час прогону всіх зон)
+ALARM_STATE = ZONE_STATES[2]
+
+# Обмеження кількості кроків прогону (захист від нескінченних циклів)
+DEFAULT_MAX_STEPS = 100000
+
+# Статуси прогону
+FINISHED = 'finished'
+RUNNING = 'running'
+STEP_LIMIT = 'step_limit'
+NO_TRIGGER = 'no_trigger'
+ZONE_NOT_IN_TRIGGER = 'zone_not_in_trigger'
+
+# Рішення вузла, після якого виконання повертається до активного "Повтору" (ребра немає)
+LOOP_RETURN = 'loop_return'
+
+# index - номер кроку; node_ids - активні вузли; edges - ребра, якими виконання прийшло у ці вузли;
+# outcomes - рішення вузлів попереднього кроку: (node_id, вихідний сокет, LOOP_RETURN або None);
+# time - віртуальний час кроку в секундах
+SimulationStep = namedtuple('SimulationStep', 'index node_ids edges outcomes time', defaults=(0.0,))
+
+
+class SimulationTrace(namedtuple('SimulationTrace', 'zone_id status steps actions')):
+    """
+    Результат прогону: zone_id - зона тригера, status - FINISHED/STEP_LIMIT/NO_TRIGGER/ZONE_NOT_IN_TRIGGER,
+    steps - кортеж SimulationStep, actions - кортеж (номер кроку, ID вузла) виконаних дій.
+    """
+    __slots__ = ()
+
+    @property
+    def finished(self):
+        return self.status == FINISHED
+
+    def visited(self):
+        """ID відвіданих вузлів у порядку першого відвідування."""
+        return tuple(dict.fromkeys(node_id for step in self.steps for node_id in step.node_ids))
+
+    def action_ids(self):
+        """ID виконаних вузлів дій у порядку виконання."""
+        return tuple(node_id for _step, node_id in self.actions)
+
+    def timeline(self):
+        """Кортеж (віртуальний час, ID вузла) виконаних дій (виходи, SMS)."""
+        return tuple((self.steps[index].time, node_id) for index, node_id in self.actions)
+
+    @property
+    def duration(self):
+        """Віртуальний час останнього кроку."""
+        return self.steps[-1].time if self.steps else 0.0
+
+
+class ZoneState:
+    """
+    Оракул станів зон: states - {zone_id: стан}; для інших зон повертається default.
+    Значення може бути послідовністю станів - вона видається по черзі при кожному
+    зверненні до зони (останній стан повторюється).
+    """
+    __slots__ = ('states', 'default', '_positions')
+
+    def __init__(self, states=None, default=ZONE_STATES[0]):
+        self.states = dict(states or {})
+        self.default = default
+        self._positions = {}
+
+    def state(self, zone_id, node_id=None):
+        value = self.states.get(zone_id, self.default)
+        if isinstance(value, (list, tuple)):
+            if not value:
+                return self.default
+            position = self._positions.get(zone_id, 0)
+            self._positions[zone_id] = position + 1
+            return value[min(position, len(value) - 1)]
+        return value
+
+    def reset(self):
+        self._positions.clear()
+
+
+class TriggerZoneState:
+    """Оракул прогону від зони тригера zone_id: вона у стані ALARM_STATE, решта зон - з оракула base."""
+    __slots__ = ('zone_id', 'base')
+
+    def __init__(self, zone_id, base):
+        self.zone_id = zone_id
+        self.base = base
+
+    def state(self, zone_id, node_id=None):
+        return ALARM_STATE if zone_id == self.zone_id else self.base.state(zone_id, node_id)
+
+
+# zone_id - зона тригера; group - номер групи зон з однаковим результатом (з 1); trace - SimulationTrace
+ZoneRun = namedtuple('ZoneRun', 'zone_id group trace')
+
+
+def format_clock(seconds):
+    """Віртуальний час у вигляді 'ГГ:ХХ:СС' (або 'ХХ:СС' до години)."""
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class SimulationEngine:
+    """
+    Покрокове виконання скомпільованого сценарію (core.compiler.Program).
+    Вузли в чергі, current та loop_counters - номери вузлів програми; у кроках траси - їхні ID.
+    timed - враховувати затримки вузлів "Затримка" (віртуальний час, now).
+    """
+    __slots__ = ('program', 'zone_state', 'max_steps', 'timed', 'zone_id', 'status',
+                 'current', 'loop_counters', 'steps', 'actions', 'now', '_queue', '_order')
+
+    def __init__(self, program, zone_state=None, max_steps=DEFAULT_MAX_STEPS, timed=False):
+        self.program = program
+        self.zone_state = zone_state if zone_state is not None else ZoneState()
+        self.max_steps = max_steps
+        self.timed = timed
+        self.reset()
+
+    @classmethod
+    def from_data(cls, scenario_data, macros=None, **kwargs):
+        """Двигун для даних сценарію; скомпільована програма береться з кешу core.compiler."""
+        return cls(compile_scenario(scenario_data, macros), **kwargs)
+
+    @property
+    def is_running(self):
+        return self.status == RUNNING
+
+    def reset(self):
+        self.zone_id = None
+        self.status = None
+        self.current = ()
+        self.loop_counters = {}  # {номер вузла: залишок ітерацій} для активних "Повторів"
+        self.steps = []
+        self.actions = []
+        self._reset_clock()
+
+    def _reset_clock(self):
+        self.now = 0.0
+        self._queue = []  # heapq: (час, порядковий номер, номер вузла, ребро або None)
+        self._order = itertools.count()
+
+    def resume(self, current, loop_counters):
+        """Продовжує виконання з довільного стану (активні вузли, лічильники "Повторів"); трасу починає заново."""
+        self.status = RUNNING
+        self.current = tuple(current)
+        self.loop_counters = dict(loop_counters)
+        self.steps = [SimulationStep(0, self._ids(self.current), (), ())]
+        self.actions = []
+        self._reset_clock()
+
+    def _ids(self, numbers):
+        ids = self.program.ids
+        return tuple(ids[number] for number in numbers)
+
+    def find_trigger(self):
+        """ID першого вузла-тригера або None."""
+        return self.program.ids[self.program.trigger] if self.program.trigger >= 0 else None
+
+    def trigger_zones(self):
+        """Зони першого тригера сценарію."""
+        return self.program.trigger_zones()
+
+    def condition_zones(self):
+        """Множина зон, стан яких перевіряють вузли "Умова"."""
+        return self.program.condition_zones()
+
+    def start(self, zone_id):
+        """
+        Починає прогін від тригера для зони zone_id. Повертає статус:
+        RUNNING, NO_TRIGGER або ZONE_NOT_IN_TRIGGER.
+        """
+        self.reset()
+        self.zone_id = zone_id
+        trigger = self.program.trigger
+        if trigger < 0:
+            self.status = NO_TRIGGER
+        elif zone_id not in self.program.operands[trigger]:
+            self.status = ZONE_NOT_IN_TRIGGER
+        else:
+            self.status = RUNNING
+            self.current = (trigger,)
+            self.steps.append(SimulationStep(0, self._ids(self.current), (), ()))
+        log.debug(f"Simulation start for zone {zone_id}: {self.status}.")
+        return self.status
+
+    def step(self):
+        """
+        Обробляє активні вузли, ставить переходи в чергу і переходить до найближчих за часом
+        активацій. Повертає новий SimulationStep або None, якщо виконання завершилось
+        (черга порожня) чи досягнуто max_steps.
+        """
+        if self.status != RUNNING:
+            return None
+        program = self.program
+        ids, opcodes, operands = program.ids, program.opcodes, program.operands
+        queue, counters, order = self._queue, self.loop_counters, self._order
+        index = len(self.steps)
+        now = self.now
+        outcomes = []
+        for number in self.current:
+            # Декодування інструкції: вибраний вихід (переходи) та рішення вузла
+            opcode = opcodes[number]
+            outputs = program.outputs[number]
+            if opcode == OP_REPEAT:
+                if number not in counters: # Перший вхід - ініціалізація лічильника
+                    counters[number] = operands[number]
+                if counters[number] > 0:
+                    counters[number] -= 1
+                    transitions, socket_name = outputs[0][:1], 'out_loop'
+                else:
+                    del counters[number]
+                    transitions, socket_name = outputs[1][:1], 'out_end'
+            elif opcode == OP_CONDITION:
+                zone_id, expected = operands[number]
+                if self.zone_state.state(zone_id, ids[number]) == expected:
+                    transitions, socket_name = outputs[0][:1], 'out_true'
+                else:
+                    transitions, socket_name = outputs[1][:1], 'out_false'
+            elif outputs[0]:
+                transitions = outputs[0]
+                socket_name = transitions[0][1][1]
+            elif not program.has_outputs[number]: # Кінець гілки - повернення до активного "Повтору"
+                loop_parent = self._find_loop_parent(number)
+                if loop_parent >= 0:
+                    heappush(queue, (now, next(order), loop_parent, None))
+                    outcomes.append((ids[number], LOOP_RETURN))
+                else:
+                    outcomes.append((ids[number], None))
+                continue
+            else:
+                log.warning(f"  -> Node {ids[number]} ({program.node_types[number]}) has no logic path for simulation.")
+                outcomes.append((ids[number], None))
+                continue
+
+            if not transitions:
+                log.debug(f"  -> Node {ids[number]}: socket '{socket_name}' is not connected.")
+                outcomes.append((ids[number], None))
+                continue
+            at = now + operands[number] if self.timed and opcode == OP_DELAY else now
+            for target, edge in transitions:
+                heappush(queue, (at, next(order), target, edge))
+            outcomes.append((ids[number], socket_name))
+
+        if not queue:
+            self.current = ()
+            self.status = FINISHED
+            log.debug(f"Simulation finished after {index} steps at t={now}.")
+            return None
+        self.now = now = queue[0][0]
+        batch, edges = {}, []
+        while queue and queue[0][0] == now:
+            _time, _order, number, edge = heappop(queue)
+            batch[number] = None
+            if edge is not None:
+                edges.append(edge)
+        self.current = current = tuple(batch)
+        step = SimulationStep(index, tuple(ids[number] for number in current), tuple(edges), tuple(outcomes), now)
+        self.steps.append(step)
+        for number in current:
+            if opcodes[number] == OP_ACTION:
+                self.actions.append((index, ids[number]))
+        if index >= self.max_steps:
+            self.status = STEP_LIMIT
+            log.warning(f"Simulation stopped: step limit {self.max_steps} reached.")
+        return step
+
+    def _find_loop_parent(self, number):
+        """Піднімається шляхом виконання (у вузла один вхід) до активного "Повтору". Повертає номер або -1."""
+        parents, opcodes = self.program.parents, self.program.opcodes
+        current, visited = number, {number}
+        while True:
+            current = parents[current]
+            if current < 0:
+                return -1
+            if opcodes[current] == OP_REPEAT and current in self.loop_counters:
+                return current
+            if current in visited:
+                log.warning("  -> Cycle detected while looking for a loop parent.")
+                return -1
+            visited.add(current)
+
+    def trace(self):
+        return SimulationTrace(self.zone_id, self.status, tuple(self.steps), tuple(self.actions))
+
+    def run(self, zone_id):
+        """Виконує прогін повністю і повертає SimulationTrace."""
+        if self.start(zone_id) == RUNNING:
+            while self.step() is not None:
+                pass
+        return self.trace()
+
+
+def simulate(scenario_data, zone_id, zone_state=None, macros=None, max_steps=DEFAULT_MAX_STEPS, timed=False):
+    """
+    Прогін сценарію (словник даних) для зони тригера zone_id. Повертає SimulationTrace;
+    з timed=True затримки враховуються і trace.timeline() дає час кожної дії.
+    """
+    engine = SimulationEngine.from_data(scenario_data, macros, zone_state=zone_state, max_steps=max_steps,
+                                        timed=timed)
+    return engine.run(zone_id)
+
+
+def simulate_all_zones(engine, zone_ids=None, zone_state=None):
+    """
+    Прогін сценарію двигуном engine (граф будується один раз) від кожної зони тригера
+    (за замовчуванням - усіх зон першого тригера). Зона тригера у стані ALARM_STATE,
+    інші зони - з оракула zone_state. Зони, які не перевіряє жоден вузол "Умова", не впливають
+    на виконання, тому для них симуляція виконується один раз. Повертає список ZoneRun.
+    """
+    base = zone_state if zone_state is not None else ZoneState()
+    zone_ids = engine.trigger_zones() if zone_ids is None else zone_ids
+    queried = engine.condition_zones()
+    original_state, shared, groups, runs = engine.zone_state, None, {}, []
+    try:
+        for zone_id in zone_ids:
+            if zone_id not in queried and shared is not None:
+                trace = shared._replace(zone_id=zone_id)
+            else:
+                if hasattr(base, 'reset'):
+                    base.reset()
+                engine.zone_state = TriggerZoneState(zone_id, base)
+                trace = engine.run(zone_id)
+                if zone_id not in queried:
+                    shared = trace
+            group = groups.setdefault((trace.status, trace.steps), len(groups) + 1)
+            runs.append(ZoneRun(zone_id, group, trace))
+    finally:
+        engine.zone_state = original_state
+    log.debug(f"Simulated {len(runs)} trigger zones: {len(groups)} distinct results.")
+    return runs
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Кеш результатів валідації сценаріїв за хешем вмісту.
+
+Ключ - стабільний хеш (blake2b від marshal-подання) усього, від чого залежить результат валідації:
+вузли сценарію (ID, тип, властивості, macro_id) у їхньому порядку, з'єднання,
+набори ID конфігурації (ConfigIndex.id_fingerprint) та відбитки макросів
+(входи/виходи та вміст, див. macro_digests), на які посилається сценарій. Позиції, імена та описи вузлів у ключ не входять,
+тому переміщення вузлів не скидає кеш. Лінивий фрагмент (LazyScenarioData)
+хешується за сирими байтами без розбору.
+
+ValidationCache - LRU-кеш (core.lru_cache) ScenarioReport з незмінними полями; потокобезпечний,
+бо ним користуються GUI-потік та фонова перевірка проекту. shared_cache -
+спільний екземпляр процесу (GUI, CLI, перевірка проекту).
+"""
+import hashlib
+import logging
+import marshal
+
+from core.config_index import as_config_index
+from core.lru_cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 2048
+
+_NO_CONFIG = b'no-config'
+
+
+# Версія 0 формату marshal не записує посилань та ознак інтернування рядків:
+# однаковий вміст завжди дає однакові байти (і в інших процесах)
+_MARSHAL_VERSION = 0
+
+
+def _digest(value):
+    try:
+        data = marshal.dumps(value, _MARSHAL_VERSION)
+    except ValueError: # Нестандартні значення властивостей - хешуємо текстове подання
+        data = repr(value).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _config_fingerprint(config):
+    return as_config_index(config).id_fingerprint() if config else _NO_CONFIG
+
+
+# Імена вузлів входів/виходів макросу визначають сокети MacroNode, тому входять у вміст
+_IO_NODE_TYPES = ('MacroInputNode', 'MacroOutputNode')
+
+
+def _graph_content(graph_data, ordered=False):
+    """
+    Частина даних графа, що впливає на валідацію: (вузли, відсортовані з'єднання, ID макросів).
+    Порядок з'єднань на результат валідації не впливає - їх сортування робить ключ незалежним від нього.
+    ordered=True зберігає порядок з'єднань (від нього залежить скомпільована програма, core.compiler).
+    """
+    nodes, macro_ids = [], set()
+    for node_data in (graph_data or {}).get('nodes', []):
+        node_type = node_data.get('node_type')
+        macro_id = node_data.get('macro_id')
+        name = node_data.get('name') if node_type in _IO_NODE_TYPES else None
+        nodes.append((node_data.get('id'), node_type, node_data.get('properties'), macro_id, name))
+        if node_type == 'MacroNode':
+            macro_ids.add(macro_id)
+    connections = [(conn.get('from_node'), conn.get('from_socket', 'out'), conn.get('to_node'), conn.get('to_socket', 'in'))
+                   for conn in (graph_data or {}).get('connections', [])]
+    if not ordered:
+        try:
+            connections.sort()
+        except TypeError: # Змішані типи ID (наприклад, None) - порівнюємо текстові подання
+            connections.sort(key=repr)
+    return nodes, connections, sorted(macro_ids, key=str)
+
+
+def macro_digests(macros, ordered=False, macro_ids=None):
+    """
+    Відбитки визначень макросів {macro_id: digest}: входи/виходи, вміст та (рекурсивно)
+    відбитки вкладених макросів - від них залежить перевірка сценаріїв з розгорнутими макросами.
+    ordered - див. _graph_content; macro_ids - обчислити лише для цих макросів (та вкладених у них).
+    """
+    macros = macros or {}
+    digests = {}
+
+    def digest_of(macro_id, stack):
+        if macro_id in digests:
+            return digests[macro_id]
+        macro_data = macros.get(macro_id)
+        if not macro_data:
+            return None
+        if macro_id in stack: # Рекурсивне вкладення - позначається, а не розгортається
+            return b'recursive'
+        nodes, connections, nested_ids = _graph_content(macro_data, ordered)
+        nested = [(nested_id, digest_of(nested_id, stack | {macro_id})) for nested_id in nested_ids]
+        digests[macro_id] = _digest((tuple(io.get('name') for io in macro_data.get('inputs', [])),
+                                     tuple(io.get('name') for io in macro_data.get('outputs', [])),
+                                     nodes, connections, nested))
+        return digests[macro_id]
+
+    for macro_id in (macros if macro_ids is None else macro_ids):
+        digest_of(macro_id, frozenset())
+    return digests
+
+
+def macros_fingerprint(macros, digests=None, ordered=False):
+    """Відбиток усіх макросів проекту (для ключів лінивих фрагментів, вміст яких не розбирається)."""
+    digests = macro_digests(macros, ordered) if digests is None else digests
+    return _digest(sorted(digests.items(), key=lambda item: str(item[0])))
+
+
+def scenario_cache_key(scenario_data, config, macros=None, digests=None, ordered=False):
+    """
+    Повертає ключ кешу для даних сценарію (словник або LazyScenarioData).
+    digests - попередньо обчислені macro_digests(macros, ordered) для пакетної обробки.
+    ordered=True - ключ залежить і від порядку з'єднань (див. _graph_content).
+    """
+    config_digest = _config_fingerprint(config)
+    raw = getattr(scenario_data, 'raw', None)
+    if raw is not None:
+        content = hashlib.blake2b(raw, digest_size=16).digest()
+        return (content, config_digest, macros_fingerprint(macros, digests, ordered))
+
+    nodes, connections, macro_ids = _graph_content(scenario_data, ordered)
+    if macro_ids:
+        digests = macro_digests(macros, ordered) if digests is None else digests
+    macro_part = [(macro_id, digests.get(macro_id)) for macro_id in macro_ids]
+    return (_digest((nodes, connections, macro_part)), config_digest)
+
+
+class ValidationCache(LRUCache):
+    """LRU-кеш {ключ: ScenarioReport}; статистика звернень - hits/misses."""
+    __slots__ = ()
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        super().__init__(maxsize)
+
+    def put(self, key, report):
+        """
+        Зберігає ScenarioReport; поля фіксуються як незмінні (tuple/frozenset),
+        тому споживачі, що змінюють результат, мають робити копію.
+        Повертає збережений звіт.
+        """
+        report = report._replace(diagnostics=tuple(report.diagnostics),
+                                 reachable=frozenset(report.reachable) if report.reachable is not None else None)
+        return super().put(key, report)
+
+
+shared_cache = ValidationCache()
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Валідація сценаріїв та макросів на рівні даних (без Qt).
+
+Правила ті самі, що й у валідації на сцені (validation.py та методи
+validate() вузлів), але працюють зі словниками project_data, тому
+можуть виконуватись у консольних утилітах, воркерах та тестах.
+Результат - список Diagnostic(node_id, rule, message).
+Функції не змінюють вхідні дані, тому їх можна викликати з фонових потоків
+на знімку проекту.
+"""
+import os
+import pickle
+import logging
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.node_schema import TERMINAL_NODE_TYPES
+from core.graph import ScenarioGraph, macro_socket_summaries
+from core.loop_analysis import analyze_loops
+from core.config_index import as_config_index
+from core.diagnostics import Diagnostic # Diagnostic(node_id, rule, message, severity=ERROR)
+from core.validation_cache import scenario_cache_key, macro_digests
+
+log = logging.getLogger(__name__)
+
+
+# Результат валідації графа сценарію: trigger_id/reachable - None, якщо досяжність не перевірялась
+# (немає тригера або він невалідний)
+ScenarioReport = namedtuple('ScenarioReport', 'diagnostics trigger_id reachable')
+
+
+class ValidationCancelled(Exception):
+    """Валідацію перервано, бо її результат уже не потрібен (is_cancelled() повернув True)."""
+
+
+def _check_cancelled(is_cancelled):
+    if is_cancelled is not None and is_cancelled():
+        raise ValidationCancelled()
+
+# Вихідні сокети, які повинні бути підключені
+REQUIRED_OUTPUTS = {
+    'ConditionNodeZoneState': (("out_true", "Вихід 'Так' повинен бути підключений."),
+                               ("out_false", "Вихід 'Ні' повинен бути підключений.")),
+    'RepeatNode': (("out_loop", "Вихід 'Виконати' (▶️) повинен бути підключений."),
+                   ("out_end", "Вихід 'Завершити' (⏹️) повинен бути підключений.")),
+}
+
+# Менше сценаріїв перевіряється в поточному процесі - запуск пулу процесів коштує дорожче
+PARALLEL_MIN_SCENARIOS = 64
+
+# Повідомлення логічних перевірок графа
+MSG_NO_TRIGGER = "В сценарії відсутній тригер."
+MSG_MULTIPLE_TRIGGERS = "У сценарії може бути лише один тригер."
+MSG_UNREACHABLE = "Вузол недосяжний від тригера."
+MSG_UNTERMINATED = "Ланцюжок логіки не завершено дією."
+MSG_INPUT_WITHOUT_OUTPUT = "Вхід '{name}' не веде до жодного виходу макросу."
+
+
+def config_id_sets(config):
+    """
+    Повертає таблиці ID (зон, виходів, користувачів) з конфігурації.
+    config може бути словником або вже побудованим ConfigIndex (тоді нічого не перебудовується).
+    """
+    index = as_config_index(config)
+    return index.zones, index.outputs, index.users
+
+
+def check_node_properties(node_type, properties, config, id_sets=None):
+    """
+    Перевіряє властивості вузла та посилання на конфігурацію.
+    Повертає (rule, message) першої знайденої помилки або None.
+    config - словник конфігурації або ConfigIndex.
+    id_sets - попередньо обчислені config_id_sets(config), щоб не будувати їх для кожного вузла.
+    """
+    props = dict(properties or [])
+    if config and id_sets is None:
+        id_sets = config_id_sets(config)
+    zone_ids, output_ids, user_ids = id_sets if config else (None, None, None)
+
+    if node_type == 'TriggerNode':
+        zones = props.get('zones', [])
+        if not zones:
+            return 'trigger_zones', "Не вибрано жодної зони для тригера."
+        if config:
+            missing_zones = [zid for zid in zones if zid not in zone_ids]
+            if missing_zones:
+                return 'missing_zone', f"Зони не знайдено: {', '.join(missing_zones)}"
+
+    elif node_type in ('ActivateOutputNode', 'DeactivateOutputNode'):
+        output_id = props.get('output_id')
+        if not output_id:
+            action = "активації" if node_type == 'ActivateOutputNode' else "деактивації"
+            return 'output_required', f"Не вибрано вихід для {action}."
+        if config and output_id not in output_ids:
+            return 'missing_output', f"Вихід з ID '{output_id}' не знайдено."
+
+    elif node_type == 'SendSMSNode':
+        user_id = props.get('user_id')
+        if not user_id:
+            return 'user_required', "Не вибрано користувача для відправки SMS."
+        if not props.get('message', ''):
+            return 'sms_message', "Текст повідомлення не може бути порожнім."
+        if config and user_id not in user_ids:
+            return 'missing_user', f"Користувача з ID '{user_id}' не знайдено."
+
+    elif node_type == 'ConditionNodeZoneState':
+        zone_id = props.get('zone_id')
+        if not zone_id:
+            return 'zone_required', "Не вибрано зону для перевірки стану."
+        if config and zone_id not in zone_ids:
+            return 'missing_zone', f"Зону з ID '{zone_id}' не знайдено."
+
+    elif node_type == 'RepeatNode':
+        try:
+            if int(props.get('count', 0)) < -1:
+                return 'repeat_count', "Кількість повторів не може бути меншою за -1."
+        except (ValueError, TypeError):
+            return 'repeat_count', "Кількість повторів має бути числом."
+
+    return None
+
+
+def check_required_outputs(node_type, connected_outputs):
+    """Перевіряє, що обов'язкові вихідні сокети вузла підключені. Повертає (rule, message) або None."""
+    for socket_name, message in REQUIRED_OUTPUTS.get(node_type, ()):
+        if socket_name not in connected_outputs:
+            return 'output_unconnected', message
+    return None
+
+
+def check_macro_reference(node_data, macros):
+    """Перевіряє прив'язку MacroNode до визначення макросу. Повертає (rule, message) або None."""
+    macro_id = node_data.get('macro_id')
+    if not macro_id:
+        return 'macro_missing_id', "Макровузол не прив'язаний до визначення макросу (відсутній macro_id)."
+    macro_data = (macros or {}).get(macro_id)
+    if not macro_data:
+        return 'macro_not_found', f"Визначення макросу з ID '{macro_id}' не знайдено в проекті."
+    return None
+
+
+def _check_nodes(graph, config, macros):
+    """Крок 1: індивідуальна перевірка кожного вузла. Повертає {node_id: (rule, message)}."""
+    id_sets = config_id_sets(config) if config else None
+    errors = {}
+    for node_id, node_data in graph.nodes.items():
+        node_type = node_data.get('node_type')
+        if node_type == 'MacroNode':
+            error = check_macro_reference(node_data, macros)
+        else:
+            error = (check_node_properties(node_type, node_data.get('properties'), config, id_sets)
+                     or check_required_outputs(node_type, graph.connected_outputs(node_id)))
+        if error:
+            errors[node_id] = error
+    return errors
+
+
+def _as_diagnostics(nodes, errors):
+    return [Diagnostic(node_id, *errors[node_id]) for node_id in nodes if node_id in errors]
+
+
+def validate_scenario_data(scenario_data, config, macros=None, cache=None):
+    """
+    Валідує дані сценарію. Порядок та пріоритет помилок відповідає
+    validation._perform_scenario_validation. Повертає список Diagnostic.
+    cache - необов'язковий core.validation_cache.ValidationCache.
+    """
+    return list(validate_scenario_cached(scenario_data, config, macros, cache).diagnostics)
+
+
+def validate_scenario_cached(scenario_data, config, macros=None, cache=None, key=None):
+    """
+    Повертає ScenarioReport для даних сценарію (словник або LazyScenarioData), беручи
+    результат з cache за хешем вмісту, якщо він там є. Без cache - звичайна валідація.
+    key - попередньо обчислений scenario_cache_key.
+    """
+    if cache is not None:
+        key = key or scenario_cache_key(scenario_data, config, macros)
+        report = cache.get(key)
+        if report is not None:
+            return report
+    if hasattr(scenario_data, 'decode'):
+        scenario_data = scenario_data.decode()
+    report = validate_scenario_graph(ScenarioGraph.from_data(scenario_data, macros), config, macros)
+    return cache.put(key, report) if cache is not None else report
+
+
+def validate_scenario_graph(graph, config, macros=None, is_cancelled=None):
+    """
+    Валідує граф сценарію, побудований з даних (ScenarioGraph.from_data). Повертає ScenarioReport.
+    is_cancelled - необов'язкова функція без аргументів; якщо вона повертає True між етапами,
+    валідація переривається з ValidationCancelled.
+    """
+    nodes = graph.nodes
+    _check_cancelled(is_cancelled)
+    errors = _check_nodes(graph, config, macros)
+    _check_cancelled(is_cancelled)
+
+    trigger_ids = [node_id for node_id, data in nodes.items() if data.get('node_type') == 'TriggerNode']
+    for extra_trigger in trigger_ids[1:]:
+        errors[extra_trigger] = ('multiple_triggers', MSG_MULTIPLE_TRIGGERS)
+
+    if not trigger_ids:
+        for node_id in nodes:
+            errors.setdefault(node_id, ('no_trigger', MSG_NO_TRIGGER))
+        return ScenarioReport(_as_diagnostics(nodes, errors), None, None)
+
+    trigger_id = trigger_ids[0]
+    if trigger_id in errors:
+        # Невалідний тригер - досяжність не перевіряємо
+        return ScenarioReport(_as_diagnostics(nodes, errors), None, None)
+
+    # Досяжність від тригера (BFS); MacroNode - "чорні скриньки" за матрицями досяжності макросів
+    reachable = graph.reachable_from(trigger_id, macro_socket_summaries(graph, macros))
+    _check_cancelled(is_cancelled)
+
+    for node_id, node_data in nodes.items():
+        node_type = node_data.get('node_type')
+        if node_id not in reachable:
+            if node_id != trigger_id:
+                errors[node_id] = ('unreachable', MSG_UNREACHABLE)
+        elif (node_type not in TERMINAL_NODE_TYPES and not graph.connected_outputs(node_id)
+              and not _is_terminal_macro(node_data, macros)):
+            errors.setdefault(node_id, ('unterminated', MSG_UNTERMINATED))
+    _check_cancelled(is_cancelled)
+
+    # Цикли та нескінченне виконання (з розгорнутими макросами) - лише для вузлів без інших помилок
+    for node_id, diagnostic in analyze_loops(graph, macros).items():
+        errors.setdefault(node_id, diagnostic[1:])
+    return ScenarioReport(_as_diagnostics(nodes, errors), trigger_id, reachable)
+
+
+def _is_terminal_macro(node_data, macros):
+    """MacroNode без виходів вважається термінальним."""
+    if node_data.get('node_type') != 'MacroNode':
+        return False
+    macro_data = (macros or {}).get(node_data.get('macro_id'))
+    return bool(macro_data) and not macro_data.get('outputs')
+
+
+def validate_macro_data(macro_data, config, macros=None):
+    """
+    Валідує визначення макросу. Порядок та пріоритет помилок відповідає
+    validation._perform_macro_validation. Повертає список Diagnostic.
+    """
+    graph = ScenarioGraph.from_data(macro_data, macros)
+    nodes = graph.nodes
+    errors = _check_nodes(graph, config, macros)
+
+    input_ids = [nid for nid, data in nodes.items() if data.get('node_type') == 'MacroInputNode']
+    output_ids = [nid for nid, data in nodes.items() if data.get('node_type') == 'MacroOutputNode']
+
+    # Унікальність імен входів/виходів
+    for io_ids, label in ((input_ids, "входу"), (output_ids, "виходу")):
+        names = [nodes[nid].get('name') for nid in io_ids]
+        for nid in io_ids:
+            name = nodes[nid].get('name')
+            if names.count(name) > 1:
+                errors[nid] = ('duplicate_io_name', f"Ім'я {label} '{name}' не є унікальним.")
+
+    # Підключення входів/виходів
+    for nid in input_ids:
+        if not graph.connected_outputs(nid):
+            errors.setdefault(nid, ('io_unconnected', f"Вхід '{nodes[nid].get('name')}' нікуди не підключено."))
+    for nid in output_ids:
+        if not graph.connected_inputs(nid):
+            errors.setdefault(nid, ('io_unconnected', f"До виходу '{nodes[nid].get('name')}' нічого не підключено."))
+
+    # Досяжність виходів від входів (один прохід по конденсації графа)
+    if output_ids:
+        reachable = graph.reachable_subsets(input_ids, output_ids)
+        for nid in input_ids:
+            if not reachable[nid]:
+                errors.setdefault(nid, ('io_no_output', MSG_INPUT_WITHOUT_OUTPUT.format(name=nodes[nid].get('name'))))
+    return _as_diagnostics(nodes, errors)
+
+
+def validate_project_data(project_data, cache=None):
+    """
+    Валідує всі сценарії та макроси проекту.
+    Повертає {'scenarios': {id: [Diagnostic]}, 'macros': {id: [Diagnostic]}}.
+    cache - необов'язковий ValidationCache: незмінені сценарії не перевіряються повторно.
+    """
+    config = as_config_index(project_data.get('config', {})) # Індекс будується один раз на проект
+    macros = project_data.get('macros', {})
+    reports = _validate_scenario_batch(project_data.get('scenarios', {}).items(), config, macros, cache)
+    report = {'scenarios': {scenario_id: list(r.diagnostics) for scenario_id, r in reports.items()},
+              'macros': {}}
+    for macro_id, macro_data in macros.items():
+        report['macros'][macro_id] = validate_macro_data(macro_data, config, macros)
+    return report
+
+
+def _validate_scenario_batch(scenarios, config, macros, cache=None, keys=None):
+    """
+    Валідує пари (scenario_id, data); лінивий фрагмент (LazyScenarioData) декодується тут.
+    Повертає {scenario_id: ScenarioReport}. keys - {scenario_id: ключ кешу}, якщо вже обчислені.
+    """
+    config = as_config_index(config)
+    digests = macro_digests(macros) if cache is not None else None
+    result = {}
+    for scenario_id, scenario_data in scenarios:
+        key = keys.get(scenario_id) if keys else None
+        if cache is not None and key is None:
+            key = scenario_cache_key(scenario_data, config, macros, digests)
+        result[scenario_id] = validate_scenario_cached(scenario_data, config, macros, cache, key)
+    return result
+
+
+def validate_project_parallel(project_data, workers=None, cache=None):
+    """
+    Те саме, що validate_project_data, але сценарії діляться на пакети і валідуються
+    у пулі процесів (кожен пакет будує індекс конфігурації один раз, ліниві фрагменти
+    декодуються у воркерах). Макроси перевіряються в поточному процесі паралельно з пулом.
+    Сценарії, знайдені в cache, у пул не передаються, а результати воркерів додаються до cache.
+    Порядок сценаріїв у звіті відповідає проекту. Якщо пул процесів недоступний
+    (помилка запуску, аварія воркера, дані не передаються), сценарії перевіряються в поточному процесі.
+    """
+    scenarios = list(project_data.get('scenarios', {}).items())
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(scenarios) < PARALLEL_MIN_SCENARIOS:
+        return validate_project_data(project_data, cache)
+
+    config = project_data.get('config', {})
+    config = getattr(config, 'config', config) # Воркерам передається сирий словник, а не ConfigIndex
+    config_index = as_config_index(project_data.get('config', {}))
+    macros = dict(project_data.get('macros', {}))
+    reports, keys = {}, {}
+    if cache is not None:
+        digests = macro_digests(macros)
+        for scenario_id, scenario_data in scenarios:
+            keys[scenario_id] = scenario_cache_key(scenario_data, config_index, macros, digests)
+            cached = cache.get(keys[scenario_id])
+            if cached is not None:
+                reports[scenario_id] = cached
+        pending = [(scenario_id, data) for scenario_id, data in scenarios if scenario_id not in reports]
+        log.debug(f"Validation cache: {len(reports)} of {len(scenarios)} scenarios unchanged.")
+    else:
+        pending = scenarios
+
+    report = {'scenarios': {}, 'macros': {}}
+    if len(pending) < PARALLEL_MIN_SCENARIOS:
+        reports.update(_validate_scenario_batch(pending, config_index, macros, cache, keys))
+        for macro_id, macro_data in macros.items():
+            report['macros'][macro_id] = validate_macro_data(macro_data, config_index, macros)
+    else:
+        batch_size = max(1, -(-len(pending) // (workers * 4))) # Кілька пакетів на воркер для рівномірного навантаження
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        log.debug(f"Validating {len(pending)} scenarios in {len(batches)} batches on {workers} workers.")
+        try:
+            # spawn: пул запускається з потоку QThreadPool, а fork багатопотокового процесу небезпечний
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(_validate_scenario_batch, batch, config, macros) for batch in batches]
+                for macro_id, macro_data in macros.items():
+                    report['macros'][macro_id] = validate_macro_data(macro_data, config_index, macros)
+                for future in futures:
+                    for scenario_id, scenario_report in future.result().items():
+                        if cache is not None:
+                            scenario_report = cache.put(keys[scenario_id], scenario_report)
+                        reports[scenario_id] = scenario_report
+        except (BrokenProcessPool, OSError, RuntimeError, pickle.PicklingError) as e:
+            # Напр. заборона створення процесів або непридатні для передачі дані - перевіряємо у цьому процесі
+            log.warning(f"Parallel validation failed ({e}), falling back to in-process validation.")
+            reports.update(_validate_scenario_batch(pending, config_index, macros, cache, keys))
+            for macro_id, macro_data in macros.items():
+                if macro_id not in report['macros']:
+                    report['macros'][macro_id] = validate_macro_data(macro_data, config_index, macros)
+    report['scenarios'] = {scenario_id: list(reports[scenario_id].diagnostics) for scenario_id, _data in scenarios}
+    return report
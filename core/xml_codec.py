@@ -0,0 +1,613 @@
+# -*- coding: utf-8 -*-
+"""
+XML-кодек даних проекту без залежності від Qt.
+
+Перетворює елементи XML-файлу проекту у словники project_data та навпаки.
+Модуль не імпортує PyQt6, тому його можна використовувати у
+процесах-воркерах, консольних утилітах та тестах. Помилки не показуються
+користувачу, а піднімаються як винятки - їх обробляє викликаючий код.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree as ET
+
+from core.atomic_write import atomic_write
+
+log = logging.getLogger(__name__)
+
+# Теги верхнього рівня, які потоковий імпорт обробляє по мірі закриття
+STREAMING_TAGS = ("config", "scenario", "macro")
+
+# Мінімальна кількість фрагментів, за якої паралельне декодування має сенс
+PARALLEL_MIN_FRAGMENTS = 32
+# Кількість пакетів на один процес (дрібніші пакети краще балансують навантаження)
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+
+# --- Кодеки окремих елементів ---
+
+def node_data_from_xml(xml_element):
+    # Читаємо атрибут 'type' як ім'я класу
+    node_class_name = xml_element.get("type")
+    data = {'id': xml_element.get("id"), 'node_type': node_class_name,
+            'name': xml_element.get("name"), 'pos': (float(xml_element.get("x")), float(xml_element.get("y"))),
+            'properties': []}
+    desc_el = xml_element.find("description")
+    # Handle missing or empty description safely
+    data['description'] = desc_el.text if desc_el is not None and desc_el.text is not None else ""
+    props_el = xml_element.find("properties")
+    if props_el is not None:
+        for prop_el in props_el:
+            key, value_str = prop_el.get("key"), prop_el.get("value")
+            value = value_str  # Default to string
+            if key == 'zones':
+                # Ensure list even if empty, handle potential None for value_str
+                value = value_str.split(',') if value_str else []
+            elif key in ('seconds', 'count'):
+                try:
+                    # Handle potential None for value_str
+                    value = int(value_str) if value_str is not None else 0
+                except (ValueError, TypeError):
+                    log.warning(
+                        f"Could not convert property '{key}' value '{value_str}' to int for node {data.get('id')}. Using default 0.")
+                    value = 0  # Default to 0 on error
+            # Handle None key or value gracefully
+            if key is not None:
+                data['properties'].append((key, value))
+            else:
+                log.warning(f"Found property with None key for node {data.get('id')}. Skipping.")
+
+    # Add macro specific data if needed
+    if node_class_name == 'MacroNode':  # Перевіряємо за ім'ям класу
+        data['macro_id'] = xml_element.get('macro_id')
+    return data
+
+
+def node_data_to_xml(parent_element, node_data):
+    # Ensure all attribute values are strings and handle potential None
+    attrs = {
+        'id': str(node_data.get('id', '')),
+        'type': str(node_data.get('node_type', '')),  # Now saving class name
+        'name': str(node_data.get('name', '')),
+        'x': str(node_data.get('pos', [0, 0])[0]),
+        'y': str(node_data.get('pos', [0, 0])[1])
+    }
+    # Add macro specific attributes, ensuring it's a string
+    if node_data.get('node_type') == 'MacroNode':  # Check against class name
+        attrs['macro_id'] = str(node_data.get('macro_id', ''))
+
+    node_el = ET.SubElement(parent_element, "node", **attrs)
+
+    desc_el = ET.SubElement(node_el, "description")
+    # Ensure description is a string
+    desc_el.text = str(node_data.get('description', ''))
+
+    # Ensure 'properties' exists and is a list before iterating
+    properties = node_data.get('properties')
+    if properties and isinstance(properties, (list, tuple)):  # Allow tuples too
+        props_el = ET.SubElement(node_el, "properties")
+        for prop_item in properties:
+            # Check if prop_item is a tuple/list of size 2
+            if isinstance(prop_item, (list, tuple)) and len(prop_item) == 2:
+                key, value = prop_item
+                # Ensure key and value are not None before converting to string
+                prop_attrs = {
+                    "key": str(key) if key is not None else "",
+                    # Convert value to string, handle lists specifically
+                    "value": ",".join(map(str, value)) if isinstance(value, list) else str(
+                        value if value is not None else "")
+                }
+                ET.SubElement(props_el, "property", **prop_attrs)
+            else:
+                log.warning(f"Skipping invalid property item: {prop_item} for node {attrs.get('id')}")
+
+    return node_el
+
+
+def connection_data_from_xml(xml_element):
+    return {
+        'from_node': xml_element.get("from_node"),
+        'from_socket': xml_element.get("from_socket", "out"),  # Fallback for old format
+        'to_node': xml_element.get("to_node"),
+        'to_socket': xml_element.get("to_socket", "in")  # Додано читання цільового сокета
+    }
+
+
+def connection_data_to_xml(parent_element, conn_data):
+    # Ensure all values are strings, provide defaults
+    attrs = {
+        "from_node": str(conn_data.get('from_node', '')),
+        "from_socket": str(conn_data.get('from_socket', 'out')),
+        "to_node": str(conn_data.get('to_node', '')),
+        "to_socket": str(conn_data.get('to_socket', 'in'))  # Додано збереження цільового сокета
+    }
+    ET.SubElement(parent_element, "connection", **attrs)
+
+
+def _box_data_from_xml(xml_element):
+    """Спільний формат коментарів та фреймів: текст + позиція + розмір."""
+    return {'id': xml_element.get("id"),
+            'text': xml_element.text or "",  # Get text content
+            'pos': (float(xml_element.get("x")), float(xml_element.get("y"))),
+            'size': (float(xml_element.get("width")), float(xml_element.get("height")))}
+
+
+def _box_data_to_xml(parent_element, tag, box_data):
+    attrs = {
+        'id': str(box_data.get('id', '')),
+        'x': str(box_data.get('pos', [0, 0])[0]),
+        'y': str(box_data.get('pos', [0, 0])[1]),
+        'width': str(box_data.get('size', [0, 0])[0]),
+        'height': str(box_data.get('size', [0, 0])[1])
+    }
+    box_el = ET.SubElement(parent_element, tag, **attrs)
+    # Ensure text is a string
+    box_el.text = str(box_data.get('text', ''))
+    return box_el
+
+
+def comment_data_from_xml(xml_element):
+    return _box_data_from_xml(xml_element)
+
+
+def comment_data_to_xml(parent_element, comment_data):
+    _box_data_to_xml(parent_element, "comment", comment_data)
+
+
+def frame_data_from_xml(xml_element):
+    return _box_data_from_xml(xml_element)
+
+
+def frame_data_to_xml(parent_element, frame_data):
+    _box_data_to_xml(parent_element, "frame", frame_data)
+
+
+# --- Сирі фрагменти сценаріїв ---
+
+# Парсер для сирих фрагментів: відкидає пробільні вузли, щоб pretty_print
+# при експорті форматував їх так само, як і щойно створені елементи
+_FRAGMENT_PARSER = ET.XMLParser(remove_blank_text=True)
+
+
+class LazyScenarioData:
+    """
+    Сирий (ще не розібраний) фрагмент <scenario>, збережений під час лінивого імпорту.
+    Декодується у звичайний словник сценарію лише при першому зверненні
+    (див. ProjectManager.get_scenario_data).
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw # bytes: серіалізований елемент <scenario>
+
+    def decode(self):
+        """Розбирає фрагмент і повертає словник даних сценарію."""
+        return parse_scenario_element(self.to_element())
+
+    def to_element(self):
+        """Повертає фрагмент як новий елемент lxml (для вставки при експорті)."""
+        return ET.fromstring(self.raw, _FRAGMENT_PARSER)
+
+    def mentions(self, text):
+        """Швидка перевірка, чи зустрічається текст у сирому фрагменті (без розбору)."""
+        return str(text).encode('utf-8') in self.raw
+
+    def __repr__(self):
+        return f"<LazyScenarioData {len(self.raw)} bytes>"
+
+
+
+# --- Імпорт ---
+
+def _new_project_data():
+    return {
+        'scenarios': {},
+        'macros': {},
+        'config': {'devices': [], 'users': []}
+    }
+
+
+def parse_config_element(config_xml):
+    """Перетворює елемент <config> у словник конфігурації."""
+    config_data = {'devices': [], 'users': []}
+    log.debug("Parsing <config> section...")
+    devices_xml = config_xml.find("devices")
+    if devices_xml is not None:
+        log.debug("Parsing <devices>...")
+        for device_el in devices_xml:
+            device_id = device_el.get('id')
+            log.debug(f"Parsing device ID: {device_id}")
+            device_data = {'id': device_id, 'name': device_el.get('name'),
+                           'type': device_el.get('type'), 'zones': [], 'outputs': []}
+            zones_xml = device_el.find('zones')
+            if zones_xml is not None:
+                for zone_el in zones_xml:
+                    log.debug(f"  - Parsing zone ID: {zone_el.get('id')}")
+                    device_data['zones'].append(
+                        {'id': zone_el.get('id'), 'name': zone_el.get('name'),
+                         'parent_name': device_data['name']}) # Додаємо parent_name одразу
+            outputs_xml = device_el.find('outputs')
+            if outputs_xml is not None:
+                for output_el in outputs_xml:
+                    log.debug(f"  - Parsing output ID: {output_el.get('id')}")
+                    device_data['outputs'].append(
+                        {'id': output_el.get('id'), 'name': output_el.get('name'),
+                         'parent_name': device_data['name']}) # Додаємо parent_name одразу
+            config_data['devices'].append(device_data)
+
+    users_xml = config_xml.find("users")
+    if users_xml is not None:
+        log.debug("Parsing <users>...")
+        for user_el in users_xml:
+            log.debug(f"Parsing user ID: {user_el.get('id')}")
+            config_data['users'].append(
+                {'id': user_el.get("id"), 'name': user_el.get("name"), 'phone': user_el.get("phone")})
+    return config_data
+
+
+def parse_scenario_element(scenario_el):
+    """Перетворює елемент <scenario> у словник даних сценарію."""
+    nodes_data, connections_data, comments_data, frames_data = [], [], [], []
+
+    nodes_xml = scenario_el.find("nodes")
+    if nodes_xml is not None:
+        for node_el in nodes_xml:
+            log.debug(f"  - Parsing node ID: {node_el.get('id')}")
+            nodes_data.append(node_data_from_xml(node_el))
+
+    connections_xml = scenario_el.find("connections")
+    if connections_xml is not None:
+        for conn_el in connections_xml:
+            log.debug(
+                f"  - Parsing connection from: {conn_el.get('from_node')} to: {conn_el.get('to_node')}")
+            connections_data.append(connection_data_from_xml(conn_el))
+
+    comments_xml = scenario_el.find("comments")
+    if comments_xml is not None:
+        for comment_el in comments_xml:
+            log.debug(f"  - Parsing comment ID: {comment_el.get('id')}")
+            comments_data.append(comment_data_from_xml(comment_el))
+
+    frames_xml = scenario_el.find("frames")
+    if frames_xml is not None:
+        for frame_el in frames_xml:
+            log.debug(f"  - Parsing frame ID: {frame_el.get('id')}")
+            frames_data.append(frame_data_from_xml(frame_el))
+
+    return {'nodes': nodes_data, 'connections': connections_data,
+            'comments': comments_data, 'frames': frames_data}
+
+
+def parse_macro_element(macro_el):
+    """Перетворює елемент <macro> у словник визначення макросу."""
+    macro_id = macro_el.get("id")
+    macro_data = {
+        'id': macro_id,
+        'name': macro_el.get('name'),
+        'nodes': [], 'connections': [], 'inputs': [], 'outputs': [],
+        # Додаємо підтримку коментарів та фреймів у макросах при імпорті
+        'comments': [], 'frames': []
+    }
+    nodes_xml = macro_el.find("nodes")
+    if nodes_xml is not None:
+        for node_el in nodes_xml: macro_data['nodes'].append(node_data_from_xml(node_el))
+    connections_xml = macro_el.find("connections")
+    if connections_xml is not None:
+        for conn_el in connections_xml: macro_data['connections'].append(
+            connection_data_from_xml(conn_el))
+    comments_xml = macro_el.find("comments")
+    if comments_xml is not None:
+        for comment_el in comments_xml: macro_data['comments'].append(comment_data_from_xml(comment_el))
+    frames_xml = macro_el.find("frames")
+    if frames_xml is not None:
+        for frame_el in frames_xml: macro_data['frames'].append(frame_data_from_xml(frame_el))
+
+    # Parse inputs/outputs definitions
+    inputs_xml = macro_el.find("inputs")
+    if inputs_xml is not None:
+        for input_el in inputs_xml:
+            macro_data['inputs'].append({
+                'name': input_el.get('name'),
+                'macro_input_node_id': input_el.get('node_id')
+            })
+    outputs_xml = macro_el.find("outputs")
+    if outputs_xml is not None:
+        for output_el in outputs_xml:
+            macro_data['outputs'].append({
+                'name': output_el.get('name'),
+                'macro_output_node_id': output_el.get('node_id')
+            })
+    return macro_data
+
+
+def _release_element(element):
+    """
+    Звільняє пам'ять, зайняту вже обробленим елементом iterparse:
+    очищує сам елемент та видаляє попередні (вже оброблені) сусідні елементи.
+    """
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _parse_tree(root_xml):
+    """Повний (не потоковий) розбір вже завантаженого дерева XML."""
+    new_project_data = _new_project_data()
+
+    config_xml = root_xml.find("config")
+    if config_xml is not None:
+        new_project_data['config'] = parse_config_element(config_xml)
+
+    scenarios_xml = root_xml.find("scenarios")
+    if scenarios_xml is not None:
+        log.debug("Parsing <scenarios> section...")
+        for scenario_el in scenarios_xml:
+            scenario_id = scenario_el.get("id")
+            log.debug(f"Parsing scenario ID: {scenario_id}")
+            if not scenario_id: continue
+            new_project_data['scenarios'][scenario_id] = parse_scenario_element(scenario_el)
+
+    macros_xml = root_xml.find("macros")
+    if macros_xml is not None:
+        log.debug("Parsing <macros> section...")
+        for macro_el in macros_xml:
+            macro_id = macro_el.get("id")
+            log.debug(f"Parsing macro ID: {macro_id}")
+            if not macro_id: continue
+            new_project_data['macros'][macro_id] = parse_macro_element(macro_el)
+    return new_project_data
+
+
+def _parse_streaming(path, lazy=False):
+    """
+    Потоковий розбір файлу через iterparse: кожен <config>/<scenario>/<macro>
+    перетворюється у словник одразу після закриття тегу, після чого елемент
+    звільняється. Пікове споживання пам'яті не залежить від кількості сценаріїв.
+    Якщо lazy=True, сценарії не декодуються, а зберігаються як LazyScenarioData.
+    """
+    new_project_data = _new_project_data()
+    for _event, element in ET.iterparse(path, events=("end",), tag=STREAMING_TAGS):
+        if element.tag == "config":
+            new_project_data['config'] = parse_config_element(element)
+        elif element.tag == "scenario":
+            scenario_id = element.get("id")
+            log.debug(f"Parsing scenario ID: {scenario_id}")
+            if scenario_id:
+                if lazy:
+                    new_project_data['scenarios'][scenario_id] = LazyScenarioData(
+                        ET.tostring(element, encoding="utf-8", with_tail=False))
+                else:
+                    new_project_data['scenarios'][scenario_id] = parse_scenario_element(element)
+        elif element.tag == "macro":
+            macro_id = element.get("id")
+            log.debug(f"Parsing macro ID: {macro_id}")
+            if macro_id:
+                new_project_data['macros'][macro_id] = parse_macro_element(element)
+        _release_element(element)
+    return new_project_data
+
+
+def _decode_chunk(kind, fragments):
+    """
+    Декодує пакет сирих фрагментів (виконується у процесі-воркері).
+    fragments - список (id, bytes); повертає список (id, словник даних).
+    """
+    parse = parse_scenario_element if kind == "scenario" else parse_macro_element
+    return [(item_id, parse(ET.fromstring(raw))) for item_id, raw in fragments]
+
+
+def _split_chunks(fragments, chunk_count):
+    """Ділить фрагменти на пакети приблизно рівного сумарного розміру в байтах."""
+    total = sum(len(raw) for _, raw in fragments)
+    target = max(1, total // max(1, chunk_count))
+    chunks, current, current_size = [], [], 0
+    for item in fragments:
+        current.append(item)
+        current_size += len(item[1])
+        if current_size >= target:
+            chunks.append(current)
+            current, current_size = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_parallel(path, workers):
+    """
+    Паралельний імпорт: основний процес потоково збирає сирі фрагменти
+    <scenario>/<macro>, а їх декодування у словники розподіляється пакетами
+    між процесами ProcessPoolExecutor. Порядок сценаріїв/макросів зберігається.
+    """
+    new_project_data = _new_project_data()
+    raw = {"scenario": [], "macro": []}
+    for _event, element in ET.iterparse(path, events=("end",), tag=STREAMING_TAGS):
+        if element.tag == "config":
+            new_project_data['config'] = parse_config_element(element)
+        else:
+            item_id = element.get("id")
+            if item_id:
+                raw[element.tag].append((item_id, ET.tostring(element, encoding="utf-8", with_tail=False)))
+        _release_element(element)
+
+    fragment_count = len(raw["scenario"]) + len(raw["macro"])
+    decoded = {"scenario": {}, "macro": {}}
+    if workers > 1 and fragment_count >= PARALLEL_MIN_FRAGMENTS:
+        log.info(f"Decoding {fragment_count} fragments in {workers} worker processes.")
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                for kind in ("scenario", "macro"):
+                    for chunk in _split_chunks(raw[kind], workers * PARALLEL_CHUNKS_PER_WORKER):
+                        futures.append((kind, executor.submit(_decode_chunk, kind, chunk)))
+                for kind, future in futures:
+                    decoded[kind].update(future.result())
+        except (OSError, RuntimeError) as e:
+            # Напр. BrokenProcessPool або заборона створення процесів - декодуємо послідовно
+            log.warning(f"Parallel decoding failed ({e}), falling back to sequential decoding.")
+            decoded = {"scenario": {}, "macro": {}}
+
+    for kind, section in (("scenario", 'scenarios'), ("macro", 'macros')):
+        if not decoded[kind] and raw[kind]:
+            decoded[kind] = dict(_decode_chunk(kind, raw[kind]))
+        for item_id, _raw in raw[kind]:
+            new_project_data[section][item_id] = decoded[kind][item_id]
+    return new_project_data
+
+
+def read_project_xml(path, streaming=False, lazy=False, workers=None):
+    """
+    Читає XML-файл проекту і повертає словник project_data.
+    streaming - потоковий розбір (iterparse) без побудови повного дерева;
+    lazy - сценарії залишаються сирими фрагментами LazyScenarioData;
+    workers - кількість процесів для паралельного декодування (>1 вмикає режим).
+    Помилки (XMLSyntaxError, FileNotFoundError, ...) піднімаються викликаючому коду.
+    """
+    if workers and workers > 1 and not lazy:
+        return _parse_parallel(path, workers)
+    if streaming or lazy:
+        return _parse_streaming(path, lazy=lazy)
+    return _parse_tree(ET.parse(path).getroot())
+
+
+# --- Експорт ---
+
+# Рівень вкладеності фрагментів <scenario>/<macro> у документі (project > scenarios > scenario)
+_FRAGMENT_LEVEL = 2
+_INDENT = "  "
+
+
+def _config_to_element(config_data):
+    """Будує елемент <config> з даних конфігурації."""
+    config_xml = ET.Element("config")
+    devices_xml = ET.SubElement(config_xml, "devices")
+    for device in config_data.get('devices', []):
+        device_el = ET.SubElement(devices_xml, "device", id=str(device.get('id','')),
+                                  name=str(device.get('name','')), type=str(device.get('type','')))
+        zones_xml = ET.SubElement(device_el, 'zones')
+        outputs_xml = ET.SubElement(device_el, 'outputs')
+        for zone in device.get('zones', []):
+            ET.SubElement(zones_xml, 'zone', id=str(zone.get('id','')), name=str(zone.get('name','')))
+        for output in device.get('outputs', []):
+            ET.SubElement(outputs_xml, 'output', id=str(output.get('id','')), name=str(output.get('name','')))
+    users_xml = ET.SubElement(config_xml, "users")
+    for user in config_data.get('users', []):
+        ET.SubElement(users_xml, "user", id=str(user.get('id','')), name=str(user.get('name','')),
+                      phone=str(user.get('phone', '')))
+    return config_xml
+
+
+def _scenario_to_element(scenario_id, scenario_data):
+    """Будує елемент <scenario> з даних сценарію (у т.ч. з лінивого фрагмента)."""
+    if isinstance(scenario_data, LazyScenarioData):
+        # Сценарій не відкривався після лінивого імпорту - переносимо фрагмент як є
+        scenario_el = scenario_data.to_element()
+        scenario_el.set('id', str(scenario_id)) # Сценарій міг бути перейменований
+        return scenario_el
+    scenario_el = ET.Element("scenario", id=str(scenario_id))
+    nodes_el = ET.SubElement(scenario_el, "nodes")
+    conns_el = ET.SubElement(scenario_el, "connections")
+    comms_el = ET.SubElement(scenario_el, "comments")
+    frames_el = ET.SubElement(scenario_el, "frames")
+    for node_data in scenario_data.get('nodes', []): node_data_to_xml(nodes_el, node_data)
+    for conn_data in scenario_data.get('connections', []): connection_data_to_xml(conns_el, conn_data)
+    for comm_data in scenario_data.get('comments', []): comment_data_to_xml(comms_el, comm_data)
+    for frame_data in scenario_data.get('frames', []): frame_data_to_xml(frames_el, frame_data)
+    return scenario_el
+
+
+def _macro_to_element(macro_id, macro_data):
+    """Будує елемент <macro> з визначення макросу."""
+    macro_el = ET.Element("macro", id=str(macro_id), name=str(macro_data.get('name', '')))
+    nodes_el = ET.SubElement(macro_el, "nodes")
+    conns_el = ET.SubElement(macro_el, "connections")
+    inputs_el = ET.SubElement(macro_el, "inputs")
+    outputs_el = ET.SubElement(macro_el, "outputs")
+    # Додаємо збереження коментарів та фреймів у макросах
+    comms_el = ET.SubElement(macro_el, "comments")
+    frames_el = ET.SubElement(macro_el, "frames")
+
+    for node_data in macro_data.get('nodes', []): node_data_to_xml(nodes_el, node_data)
+    for conn_data in macro_data.get('connections', []): connection_data_to_xml(conns_el, conn_data)
+    for comm_data in macro_data.get('comments', []): comment_data_to_xml(comms_el, comm_data)
+    for frame_data in macro_data.get('frames', []): frame_data_to_xml(frames_el, frame_data)
+
+    for input_data in macro_data.get('inputs', []):
+        ET.SubElement(inputs_el, "input", name=str(input_data.get('name', '')),
+                      node_id=str(input_data.get('macro_input_node_id', '')))
+    for output_data in macro_data.get('outputs', []):
+        ET.SubElement(outputs_el, "output", name=str(output_data.get('name', '')),
+                      node_id=str(output_data.get('macro_output_node_id', '')))
+    return macro_el
+
+
+def _element_to_fragment(element, level):
+    """
+    Серіалізує елемент у байти з відступами, які він мав би всередині
+    документа на вказаному рівні вкладеності (як при pretty_print усього дерева).
+    """
+    ET.indent(element, space=_INDENT, level=level)
+    return _INDENT.encode() * level + ET.tostring(element, encoding="utf-8") + b"\n"
+
+
+def serialize_scenario_fragment(scenario_id, scenario_data):
+    """Повертає готовий до вставки у файл фрагмент <scenario> (bytes)."""
+    return _element_to_fragment(_scenario_to_element(scenario_id, scenario_data), _FRAGMENT_LEVEL)
+
+
+def serialize_macro_fragment(macro_id, macro_data):
+    """Повертає готовий до вставки у файл фрагмент <macro> (bytes)."""
+    return _element_to_fragment(_macro_to_element(macro_id, macro_data), _FRAGMENT_LEVEL)
+
+
+def _write_section(f, tag, fragments):
+    opened = False
+    for fragment in fragments:
+        if not opened:
+            f.write(f"{_INDENT}<{tag}>\n".encode())
+            opened = True
+        f.write(fragment)
+    if opened:
+        f.write(f"{_INDENT}</{tag}>\n".encode())
+    else:
+        f.write(f"{_INDENT}<{tag}/>\n".encode())
+
+
+def materialize_scenarios(project_data):
+    """Повертає project_data, у якому всі ліниві сценарії декодовано (без зміни оригіналу)."""
+    scenarios = project_data.get('scenarios', {})
+    if not any(isinstance(data, LazyScenarioData) for data in scenarios.values()):
+        return project_data
+    result = dict(project_data)
+    result['scenarios'] = {scenario_id: (data.decode() if isinstance(data, LazyScenarioData) else data)
+                           for scenario_id, data in scenarios.items()}
+    return result
+
+
+
+
+def write_project_fragments(path, config_data, scenario_fragments, macro_fragments):
+    """
+    Записує XML-файл проекту з уже серіалізованих фрагментів <scenario>/<macro>.
+    Заново будується лише <config>. Помилки піднімаються викликаючому коду.
+    Усі фрагменти серіалізуються до запису, а файл пишеться у тимчасовий поруч і
+    атомарно замінює ціль: помилка на будь-якому етапі не пошкоджує наявний проект.
+    """
+    config_fragment = _element_to_fragment(_config_to_element(config_data or {}), 1)
+    scenario_fragments = list(scenario_fragments) # Ліниві генератори серіалізують тут
+    macro_fragments = list(macro_fragments)
+    with atomic_write(path) as f:
+        f.write(b"<?xml version='1.0' encoding='UTF-8'?>\n<project>\n")
+        f.write(config_fragment)
+        _write_section(f, "scenarios", scenario_fragments)
+        _write_section(f, "macros", macro_fragments)
+        f.write(b"</project>\n")
+
+
+def write_project_xml(path, project_data):
+    """Записує повний project_data у XML-файл."""
+    write_project_fragments(
+        path, project_data.get('config', {}),
+        (serialize_scenario_fragment(sid, sdata) for sid, sdata in project_data.get('scenarios', {}).items()),
+        (serialize_macro_fragment(mid, mdata) for mid, mdata in project_data.get('macros', {}).items()))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Панель діагностик поточної сцени: показує вміст core.diagnostics.DiagnosticsStore
+та оновлюється лише для змінених вузлів (сигнал EditorScene.diagnostics_changed).
+Подвійний клік (або Enter) по рядку переходить до вузла.
+"""
+import logging
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from core.diagnostics import ERROR
+
+log = logging.getLogger(__name__)
+
+# Роль даних рядка: ID вузла
+NODE_ID_ROLE = Qt.ItemDataRole.UserRole
+
+# Якщо змінилось більше вузлів, таблиця перебудовується повністю
+FULL_REBUILD_THRESHOLD = 200
+
+SEVERITY_LABELS = {ERROR: "Помилка"}
+
+
+class DiagnosticsPanel(QWidget):
+    node_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.name_lookup = None
+        self._rows = {}  # {node_id: [QTreeWidgetItem, ...]}
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(4)
+        self.tree.setHeaderLabels(["Рівень", "Вузол", "Правило", "Повідомлення"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setSortingEnabled(False)
+        self.tree.itemActivated.connect(self._on_item_activated)
+        layout.addWidget(self.tree)
+        self._update_summary()
+
+    def set_store(self, store, name_lookup=None):
+        """
+        store - DiagnosticsStore сцени; name_lookup(node_id) -> підпис вузла
+        (за замовчуванням показується ID).
+        """
+        self.store = store
+        self.name_lookup = name_lookup
+        self.refresh(None)
+
+    def refresh(self, changed_ids=None):
+        """Оновлює рядки вузлів changed_ids; None - перебудовує всю таблицю."""
+        if self.store is None:
+            return
+        if changed_ids is None or len(changed_ids) > FULL_REBUILD_THRESHOLD:
+            self._rebuild()
+        else:
+            for node_id in changed_ids:
+                self._refresh_node(node_id)
+        self._update_summary()
+
+    def _rebuild(self):
+        self.tree.clear()
+        self._rows.clear()
+        items = []
+        for node_id in list(self.store.node_ids()):
+            rows = [self._make_item(diagnostic) for diagnostic in self.store.node_diagnostics(node_id)]
+            self._rows[node_id] = rows
+            items.extend(rows)
+        self.tree.addTopLevelItems(items)
+        log.debug(f"Diagnostics panel rebuilt: {len(items)} rows.")
+
+    def _refresh_node(self, node_id):
+        for item in self._rows.pop(node_id, ()):
+            index = self.tree.indexOfTopLevelItem(item)
+            if index >= 0:
+                self.tree.takeTopLevelItem(index)
+        rows = [self._make_item(diagnostic) for diagnostic in self.store.node_diagnostics(node_id)]
+        if rows:
+            self._rows[node_id] = rows
+            self.tree.addTopLevelItems(rows)
+
+    def _make_item(self, diagnostic):
+        label = self.name_lookup(diagnostic.node_id) if self.name_lookup else None
+        item = QTreeWidgetItem([SEVERITY_LABELS.get(diagnostic.severity, diagnostic.severity),
+                                label or str(diagnostic.node_id), diagnostic.rule, diagnostic.message])
+        item.setData(0, NODE_ID_ROLE, diagnostic.node_id)
+        item.setToolTip(3, diagnostic.message)
+        return item
+
+    def _update_summary(self):
+        count = self.store.error_count() if self.store is not None else 0
+        if count:
+            self.summary_label.setText(f"Помилок: {count}. Подвійний клік по рядку - перехід до вузла.")
+        else:
+            self.summary_label.setText("Помилок не знайдено.")
+
+    def _on_item_activated(self, item, column):
+        node_id = item.data(0, NODE_ID_ROLE)
+        if node_id:
+            self.node_activated.emit(node_id)
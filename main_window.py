@@ -16,10 +16,16 @@ from PyQt6.QtCore import Qt, QTimer, QPointF # Додано QPointF
 
 # --- НОВІ ІМПОРТИ ---
 from project_manager import ProjectManager, DEVICE_SPECS # Імпортуємо менеджер та константи пристроїв
-from serialization import import_project_data, export_project_data # Функції імпорту/експорту
-from validation import validate_scenario_on_scene, validate_macro_on_scene # Функції валідації
+from serialization import import_project_data, export_project_data, export_project_fragments # Функції імпорту/експорту
+from core.binary_format import is_binary_path
+from core.events import PROJECT, SCENARIO, MACRO, DEVICE, ZONE, OUTPUT, USER, ADDED, REMOVED, CHANGED
+from validation import (validate_scenario_on_scene, validate_scenario_now, validate_macro_on_scene,
+                        BackgroundProjectValidator) # Функції валідації
+from validation_dialog import ProjectValidationDialog
+from simulation_dialog import ZoneComparisonDialog
+from diagnostics_panel import DiagnosticsPanel
 from clipboard import copy_selection_to_clipboard, paste_selection_from_clipboard # Функції буферу обміну
-from scene_utils import populate_scene_from_data, extract_data_from_scene # Функції для роботи зі сценою
+from scene_utils import EditorScene, populate_scene_from_data, extract_data_from_scene, scene_node_info # Функції для роботи зі сценою
 # --- КІНЕЦЬ НОВИХ ІМПОРТІВ ---
 
 from nodes import (BaseNode, Connection, CommentItem, FrameItem, NODE_REGISTRY, TriggerNode,
@@ -29,10 +35,16 @@ from nodes import (BaseNode, Connection, CommentItem, FrameItem, NODE_REGISTRY,
 # Команди імпортуються там, де вони потрібні
 from editor_view import EditorView
 from simulator import ScenarioSimulator
+from core.simulation import ZONE_STATES, SimulationEngine, simulate_all_zones
+from core.compiler import compile_graph
+from core.diagnostics import count_severities
 from constants import EDIT_MODE_SCENARIO, EDIT_MODE_MACRO
 
 log = logging.getLogger(__name__)
 
+# Фільтр діалогів імпорту/експорту: формат визначається розширенням файлу
+PROJECT_FILE_FILTER = "Проекти (*.xml *.tsb);;XML Files (*.xml);;Бінарні проекти (*.tsb)"
+
 # DEVICE_SPECS тепер імпортується з project_manager
 
 class MainWindow(QMainWindow):
@@ -61,11 +73,15 @@ class MainWindow(QMainWindow):
         self.props_apply_timer.setInterval(750)
         self.props_apply_timer.timeout.connect(self.on_apply_button_clicked) # Обробник властивостей тут
 
-        self.scene = QGraphicsScene()
+        self.scene = EditorScene() # Сцена з синхронізованою моделлю графа
         self.scene.setBackgroundBrush(QColor("#333"))
         self.view = EditorView(self.scene, self.undo_stack, self)
         self.simulator = ScenarioSimulator(self.scene, self) # Симулятор залишається тут
         self.setCentralWidget(self.view)
+        self.project_validator = BackgroundProjectValidator(self) # Перевірка всього проекту у фоні
+        self.project_validator.finished.connect(self._on_project_validation_finished)
+        self.project_validation_dialog = None # Створюється при першому звіті
+        self.zone_comparison_dialog = None # Створюється при першій симуляції всіх зон
 
         # --- ЗМІНА: Додано прапорці для контролю оновлень під час завантаження ---
         self._loading_project = False
@@ -87,8 +103,8 @@ class MainWindow(QMainWindow):
         # self.undo_stack.indexChanged.connect(self._update_simulation_trigger_zones) # Симуляція залишається тут # ВИДАЛЕНО - дублюючий виклик
 
         # --- ДОДАНО: Підключення сигналу від ProjectManager до оновлення UI ---
-        self.project_manager.project_updated.connect(self._handle_project_update) # Перейменовано обробник
-        log.debug("Connected project_manager.project_updated signal.")
+        self.project_manager.project_changed.connect(self._handle_project_changed) # Типізовані зміни
+        log.debug("Connected project_manager.project_changed signal.")
         # --- КІНЕЦЬ ДОДАНОГО ---
 
         self.new_project() # Викликаємо метод ініціалізації
@@ -98,13 +114,26 @@ class MainWindow(QMainWindow):
         log.debug("MainWindow initialized.")
 
     # --- ЗМІНА: Нові обробники сигналів для контролю оновлень ---
-    def _handle_project_update(self):
-        """Обробник сигналу project_updated від ProjectManager."""
-        log.debug("Received project_updated signal.")
+    def _handle_project_changed(self, changes):
+        """
+        Обробник сигналу project_changed від ProjectManager.
+        Кожна панель оновлюється лише для змін свого типу; повне оновлення - тільки при заміні проекту.
+        """
+        log.debug(f"Received project_changed signal: {len(changes)} change(s).")
         if self._loading_project or self._initializing:
             log.debug("  Skipping UI update due to loading/initializing flag.")
             return
-        self.update_ui_from_project()
+        if any(change.kind == PROJECT for change in changes):
+            self.update_ui_from_project()
+            return
+        # Зміна вмісту сценарію/макросу не впливає на списки - лише додавання, видалення, перейменування
+        if any(c.kind == SCENARIO and c.action != CHANGED for c in changes):
+            self.update_scenarios_list()
+        if any(c.kind == MACRO and c.action != CHANGED for c in changes):
+            self.update_macros_list()
+        config_changes = [c for c in changes if c.kind in (DEVICE, ZONE, OUTPUT, USER)]
+        if config_changes:
+            self._apply_config_changes(config_changes)
 
     def _handle_undo_redo(self):
         """Обробник сигналу indexChanged від QUndoStack."""
@@ -159,6 +188,9 @@ class MainWindow(QMainWindow):
         self.add_comment_action.triggered.connect(self.add_comment) # Викликає метод MainWindow
         self.back_to_scenario_action = QAction("Повернутись до сценарію", self)
         self.back_to_scenario_action.triggered.connect(self.return_to_scenario) # Метод MainWindow
+        self.validate_project_action = QAction("Перевірити весь &проект", self)
+        self.validate_project_action.setShortcut("F7")
+        self.validate_project_action.triggered.connect(self.validate_whole_project)
 
     def _create_menu_bar(self):
         # Без змін
@@ -177,6 +209,8 @@ class MainWindow(QMainWindow):
         edit_menu.addAction(self.add_comment_action)
         edit_menu.addSeparator()
         edit_menu.addAction(self.back_to_scenario_action)
+        validation_menu = menu_bar.addMenu("П&еревірка")
+        validation_menu.addAction(self.validate_project_action)
 
     def _create_toolbars(self): # Перейменовано
         log.debug("Creating toolbars...") # Діагностика
@@ -278,6 +312,10 @@ class MainWindow(QMainWindow):
         self.stop_sim_action = QAction(QIcon.fromTheme("media-playback-stop"), "Стоп", self)
         self.stop_sim_action.triggered.connect(self.stop_simulation)
         self.sim_toolbar.addAction(self.stop_sim_action)
+        self.all_zones_sim_action = QAction(QIcon.fromTheme("view-list-details"), "Усі зони", self)
+        self.all_zones_sim_action.setToolTip("Симулювати сценарій від кожної зони тригера та порівняти результати")
+        self.all_zones_sim_action.triggered.connect(self.simulate_all_zones)
+        self.sim_toolbar.addAction(self.all_zones_sim_action)
         self.sim_toolbar.addSeparator()
         self.sim_trigger_zone_combo = QComboBox(self)
         self.sim_trigger_zone_combo.setToolTip("Виберіть зону для запуску симуляції")
@@ -416,6 +454,14 @@ class MainWindow(QMainWindow):
         self.props_widget.setEnabled(False) # Початково вимкнена
         log.debug("Properties panel created.") # Діагностика
 
+        # --- Панель Діагностики ---
+        diagnostics_dock = QDockWidget("Діагностика", self)
+        self.diagnostics_panel = DiagnosticsPanel()
+        self.diagnostics_panel.set_store(self.scene.diagnostics, self._diagnostic_node_label)
+        diagnostics_dock.setWidget(self.diagnostics_panel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, diagnostics_dock)
+        log.debug("Diagnostics panel created.") # Діагностика
+
         # --- Підключення сигналів ---
         log.debug("Connecting panel signals...") # Діагностика
         # Проект
@@ -440,6 +486,10 @@ class MainWindow(QMainWindow):
         self.zones_table.itemChanged.connect(self.on_config_table_changed)
         self.outputs_table.itemChanged.connect(self.on_config_table_changed)
         self.users_table.itemChanged.connect(self.on_config_table_changed)
+        # Діагностика
+        self.scene.diagnostics_changed.connect(self.diagnostics_panel.refresh)
+        self.diagnostics_panel.node_activated.connect(self._focus_node)
+        self.scene.diagnostics_changed.connect(lambda _changed: self.update_simulation_controls())
         # Властивості (сигнали від полів вводу підключаються в setup_properties_panel)
         log.debug("Panel signals connected.") # Діагностика
 
@@ -596,7 +646,7 @@ class MainWindow(QMainWindow):
         condition_layout = QFormLayout(self.condition_props_widget)
         self.condition_zone_combo = QComboBox()
         self.condition_state_combo = QComboBox()
-        self.condition_state_combo.addItems(["Під охороною", "Знята з охорони", "Тривога"])
+        self.condition_state_combo.addItems(ZONE_STATES)
         condition_layout.addRow("Зона:", self.condition_zone_combo)
         condition_layout.addRow("Перевірити стан:", self.condition_state_combo)
         # --- ЗМІНА: Додаємо віджет до QStackedWidget ---
@@ -933,41 +983,13 @@ class MainWindow(QMainWindow):
         self.outputs_table.blockSignals(True); self.users_table.blockSignals(True)
         log.debug("  Config tables signals blocked.") # Діагностика
 
-        # Заповнення таблиці пристроїв
-        self.devices_table.setRowCount(0)
-        for device in config.get('devices', []):
-            row = self.devices_table.rowCount()
-            self.devices_table.insertRow(row)
-            self.devices_table.setItem(row, 0, QTableWidgetItem(device['id']))
-            self.devices_table.setItem(row, 1, QTableWidgetItem(device['name']))
-            self.devices_table.setItem(row, 2, QTableWidgetItem(device['type']))
-
-        # Заповнення таблиці зон (використовуємо згенерований список)
-        self.zones_table.setRowCount(0)
-        for zone in all_zones:
-            row = self.zones_table.rowCount()
-            self.zones_table.insertRow(row)
-            self.zones_table.setItem(row, 0, QTableWidgetItem(zone['id']))
-            self.zones_table.setItem(row, 1, QTableWidgetItem(zone.get('parent_name', ''))) # Використовуємо parent_name
-            self.zones_table.setItem(row, 2, QTableWidgetItem(zone['name']))
-
-        # Заповнення таблиці виходів (використовуємо згенерований список)
-        self.outputs_table.setRowCount(0)
-        for output in all_outputs:
-            row = self.outputs_table.rowCount()
-            self.outputs_table.insertRow(row)
-            self.outputs_table.setItem(row, 0, QTableWidgetItem(output['id']))
-            self.outputs_table.setItem(row, 1, QTableWidgetItem(output.get('parent_name', ''))) # Використовуємо parent_name
-            self.outputs_table.setItem(row, 2, QTableWidgetItem(output['name']))
-
-        # Заповнення таблиці користувачів
-        self.users_table.setRowCount(0)
-        for item in config.get('users', []):
-            row = self.users_table.rowCount()
-            self.users_table.insertRow(row)
-            self.users_table.setItem(row, 0, QTableWidgetItem(item['id']))
-            self.users_table.setItem(row, 1, QTableWidgetItem(item['name']))
-            self.users_table.setItem(row, 2, QTableWidgetItem(item.get('phone', '')))
+        # Заповнення таблиць (зони та виходи - зі згенерованих списків з parent_name)
+        for kind, items in ((DEVICE, config.get('devices', [])), (ZONE, all_zones),
+                            (OUTPUT, all_outputs), (USER, config.get('users', []))):
+            table = self._config_table_for(kind)
+            table.setRowCount(0)
+            for item in items:
+                self._append_config_row(table, kind, item)
         log.debug("  Config tables populated.") # Діагностика
 
         # Розблоковуємо сигнали
@@ -984,6 +1006,89 @@ class MainWindow(QMainWindow):
         log.debug("Configuration UI panels update finished.") # Діагностика
 
 
+    def _config_table_for(self, kind):
+        """Повертає таблицю конфігурації для типу події (DEVICE/ZONE/OUTPUT/USER)."""
+        return {DEVICE: self.devices_table, ZONE: self.zones_table,
+                OUTPUT: self.outputs_table, USER: self.users_table}[kind]
+
+    @staticmethod
+    def _config_row_values(kind, item):
+        """Значення колонок рядка таблиці конфігурації: (ID, друга колонка, третя колонка)."""
+        if kind == DEVICE:
+            return item['id'], item['name'], item['type']
+        if kind == USER:
+            return item['id'], item['name'], item.get('phone', '')
+        return item['id'], item.get('parent_name', ''), item['name'] # Зона або вихід
+
+    def _append_config_row(self, table, kind, item):
+        row = table.rowCount()
+        table.insertRow(row)
+        for col, value in enumerate(self._config_row_values(kind, item)):
+            table.setItem(row, col, QTableWidgetItem(value))
+
+    @staticmethod
+    def _config_rows_by_id(table):
+        """Повертає {ID: номер рядка} для таблиці конфігурації."""
+        rows = {}
+        for row in range(table.rowCount()):
+            id_item = table.item(row, 0)
+            if id_item:
+                rows[id_item.text()] = row
+        return rows
+
+    def _apply_config_changes(self, changes):
+        """
+        Застосовує зміни конфігурації до таблиць порядково (без повної перебудови),
+        потім оновлює залежні від конфігурації вузли, панель властивостей та зони симуляції.
+        """
+        log.debug(f"Applying {len(changes)} config change(s) to config tables...") # Діагностика
+        index = self.project_manager.get_config_index()
+        lookup = {DEVICE: index.devices, ZONE: index.zones, OUTPUT: index.outputs, USER: index.users}
+        tables = [self.devices_table, self.zones_table, self.outputs_table, self.users_table]
+        for table in tables: table.blockSignals(True)
+
+        for kind in (DEVICE, ZONE, OUTPUT, USER):
+            kind_changes = [c for c in changes if c.kind == kind]
+            if not kind_changes:
+                continue
+            table = self._config_table_for(kind)
+            # Видалення - від останнього рядка до першого, щоб номери рядків не зсувались
+            removed_ids = {c.item_id for c in kind_changes if c.action == REMOVED}
+            if removed_ids:
+                for row in sorted((r for i, r in self._config_rows_by_id(table).items() if i in removed_ids), reverse=True):
+                    table.removeRow(row)
+            for change in kind_changes:
+                if change.action == ADDED and change.item_id in lookup[kind]:
+                    self._append_config_row(table, kind, lookup[kind][change.item_id])
+            changed_ids = {c.item_id for c in kind_changes if c.action == CHANGED}
+            if changed_ids:
+                for item_id, row in self._config_rows_by_id(table).items():
+                    if item_id in changed_ids and item_id in lookup[kind]:
+                        for col, value in enumerate(self._config_row_values(kind, lookup[kind][item_id])):
+                            if col and table.item(row, col).text() != value:
+                                table.item(row, col).setText(value)
+
+        # Перейменування пристрою змінює колонку пристрою у рядках його зон та виходів
+        renamed_devices = {c.item_id for c in changes if c.kind == DEVICE and c.action == CHANGED}
+        if renamed_devices:
+            for kind in (ZONE, OUTPUT):
+                table = self._config_table_for(kind)
+                for item_id, row in self._config_rows_by_id(table).items():
+                    info = lookup[kind].get(item_id)
+                    if info and info['device_id'] in renamed_devices:
+                        table.item(row, 1).setText(info['parent_name'])
+
+        for table in tables: table.blockSignals(False)
+
+        # Телефон користувача не відображається на вузлах - оновлення вузлів не потрібне
+        if any(not (c.kind == USER and c.key == 'phone') for c in changes):
+            self._update_all_items_properties() # Також запускає валідацію
+            if self.current_selected_node:
+                self.on_selection_changed() # Оновлюємо списки вибору у панелі властивостей
+        if any(c.kind in (DEVICE, ZONE) for c in changes):
+            self._update_simulation_trigger_zones()
+        log.debug("Config changes applied.") # Діагностика
+
     def add_device(self):
         """Обробник кнопки додавання пристрою."""
         device_type = self.device_type_combo.currentText()
@@ -991,7 +1096,7 @@ class MainWindow(QMainWindow):
         # --- ВИКОРИСТАННЯ project_manager ---
         new_id = self.project_manager.add_device(device_type)
         # --- КІНЕЦЬ ---
-        # Оновлення UI відбудеться через сигнал project_updated
+        # Таблиці оновляться порядково через сигнал project_changed
 
     def remove_device(self):
         """Обробник кнопки видалення пристрою."""
@@ -1027,7 +1132,7 @@ class MainWindow(QMainWindow):
                     removed_count += 1
                 # --- КІНЕЦЬ ---
             log.info(f"Removed {removed_count} devices.") # Діагностика
-            # Оновлення UI відбудеться через сигнал project_updated
+            # Таблиці оновляться порядково через сигнал project_changed
         else:
             log.debug("User cancelled device removal.") # Діагностика
 
@@ -1039,7 +1144,7 @@ class MainWindow(QMainWindow):
         # --- ВИКОРИСТАННЯ project_manager ---
         new_id = self.project_manager.add_user()
         # --- КІНЕЦЬ ---
-        # Оновлення UI відбудеться через сигнал project_updated
+        # Таблиці оновляться порядково через сигнал project_changed
 
     def remove_config_item(self, config_key):
         """Обробник кнопки видалення користувача."""
@@ -1054,7 +1159,7 @@ class MainWindow(QMainWindow):
                 # --- ВИКОРИСТАННЯ project_manager ---
                 self.project_manager.remove_user(user_id)
                 # --- КІНЕЦЬ ---
-                # Оновлення UI відбудеться через сигнал project_updated
+                # Таблиці оновляться порядково через сигнал project_changed
             else:
                 log.warning("Remove user: Could not get ID from selected row.") # Діагностика
         else:
@@ -1090,17 +1195,11 @@ class MainWindow(QMainWindow):
         if item_type and data_key:
             log.debug(f"  Updating config: Type={item_type}, ID={item_id}, Key={data_key}, Value='{new_value}'") # Діагностика
             # --- ВИКОРИСТАННЯ project_manager ---
-            # Передаємо emit_signal=False, оскільки оновлення UI зробить сигнал project_updated
-            updated = self.project_manager.update_config_item(item_type, item_id, data_key, new_value, emit_signal=False)
+            # Сигнал project_changed оновить лише залежні рядки та вузли (_apply_config_changes)
+            updated = self.project_manager.update_config_item(item_type, item_id, data_key, new_value, emit_signal=True)
             # --- КІНЕЦЬ ---
             if updated:
                  log.info(f"  Config item {item_type}/{item_id} updated.") # Діагностика
-                 # Викликаємо оновлення UI ОДРАЗУ, щоб таблиця відобразила зміни
-                 # і уникнути можливих конфліктів при швидкому редагуванні
-                 self.update_config_ui()
-                 # Якщо змінилося ім'я пристрою, зони або виходу, оновити властивості вузлів
-                 if item_type in ['devices', 'zones', 'outputs'] and data_key == 'name':
-                      self._update_all_items_properties()
             else:
                  log.debug("  Config item value did not change.") # Діагностика
 
@@ -1154,7 +1253,7 @@ class MainWindow(QMainWindow):
         self._initializing = True # Встановлюємо прапорець
         try:
             # --- ВИКОРИСТАННЯ project_manager ---
-            self.project_manager.new_project() # Сигнал project_updated буде викликано менеджером, але обробник його проігнорує
+            self.project_manager.new_project() # Сигнал project_changed буде викликано менеджером, але обробник його проігнорує
             # --- КІНЕЦЬ ---
             self.scene.clear()
             self.undo_stack.clear()
@@ -1762,11 +1861,11 @@ class MainWindow(QMainWindow):
     def _update_all_items_properties(self):
         """Оновлює відображення властивостей для всіх вузлів на сцені."""
         log.info("MW: Updating display properties for all nodes on scene.") # Діагностика
-        config_data = self.project_manager.get_config_data()
+        config_index = self.project_manager.get_config_index() # Індекс замість сканування пристроїв у кожному вузлі
         for item in self.scene.items():
             if isinstance(item, BaseNode):
                 try: # Додаємо try-except для надійності
-                     item.update_display_properties(config_data)
+                     item.update_display_properties(config_index)
                 except Exception as e:
                      log.error(f"  Error updating display properties for node {getattr(item, 'id', '?')}: {e}", exc_info=True) # Діагностика
         self._trigger_validation() # Викликаємо валідацію після оновлення
@@ -1778,11 +1877,13 @@ class MainWindow(QMainWindow):
              log.debug("Validation skipped (loading/initializing).")
              return
         log.info(f"MW: Validating current view (Mode: {self.current_edit_mode}).") # Діагностика
-        config_data = self.project_manager.get_config_data() # Отримуємо актуальну конфігурацію
+        config_data = self.project_manager.get_config_index() # Актуальна конфігурація з індексом для O(1) пошуку
         if self.current_edit_mode == EDIT_MODE_SCENARIO:
             log.debug("  Validating as SCENARIO...") # Діагностика
             # --- ВИКОРИСТАННЯ validation.py ---
-            validate_scenario_on_scene(self.scene, config_data)
+            # Повна перевірка йде у фоновому потоці, тому передаємо незмінний знімок макросів
+            macros = self.project_manager.get_project_data().get('macros', {})
+            validate_scenario_on_scene(self.scene, config_data, macros=macros)
             # --- КІНЕЦЬ ---
         elif self.current_edit_mode == EDIT_MODE_MACRO:
             log.debug("  Validating as MACRO...") # Діагностика
@@ -1791,6 +1892,79 @@ class MainWindow(QMainWindow):
             # --- КІНЕЦЬ ---
         log.debug("  Validation finished.") # Діагностика
 
+    def validate_whole_project(self):
+        """Перевіряє всі сценарії та макроси проекту у фоні; результат - у діалозі звіту."""
+        if self.project_validator.is_running():
+            self.show_status_message("Перевірка проекту вже виконується...")
+            return
+        self.save_current_state() # Дані відкритого сценарію/макросу мають потрапити у знімок
+        if self.project_validator.start(self.project_manager.get_project_data()):
+            self.validate_project_action.setEnabled(False)
+            self.show_status_message("Перевірка проекту...", 0)
+
+    def _on_project_validation_finished(self, report):
+        self.validate_project_action.setEnabled(True)
+        if report is None:
+            self.show_status_message("Помилка: не вдалося перевірити проект.", 5000, color="red")
+            return
+        error_count, warning_count = count_severities(
+            d for group in report.values() for diagnostics in group.values() for d in diagnostics)
+        warnings_text = f", попереджень - {warning_count}" if warning_count else ""
+        if error_count:
+            self.show_status_message(f"Перевірку проекту завершено: знайдено помилок - {error_count}{warnings_text}.", 5000, color="orange")
+        else:
+            self.show_status_message(f"Перевірку проекту завершено: помилок не знайдено{warnings_text}.", 5000, color="green")
+        if self.project_validation_dialog is None:
+            self.project_validation_dialog = ProjectValidationDialog(self)
+            self.project_validation_dialog.node_activated.connect(self.jump_to_node)
+        macro_names = {macro_id: macro.get('name', macro_id)
+                       for macro_id, macro in self.project_manager.get_macros_data().items()}
+        self.project_validation_dialog.set_report(report, macro_names)
+        self.project_validation_dialog.show()
+        self.project_validation_dialog.raise_()
+
+    def jump_to_node(self, kind, owner_id, node_id):
+        """Відкриває сценарій (kind=SCENARIO) або макрос (kind=MACRO) та виділяє вузол node_id."""
+        log.debug(f"Jumping to node {node_id} in {kind} '{owner_id}'")
+        if self.simulator.is_running:
+            self.stop_simulation()
+        if kind == MACRO:
+            if not self.project_manager.get_macro_data(owner_id):
+                self.show_status_message(f"Макрос '{owner_id}' більше не існує.", 5000, color="orange")
+                return
+            if self.current_edit_mode == EDIT_MODE_MACRO and self.active_macro_id != owner_id:
+                if not self.return_to_scenario(): return
+            self.edit_macro(owner_id)
+        else:
+            if not self.project_manager.get_scenario_data(owner_id):
+                self.show_status_message(f"Сценарій '{owner_id}' більше не існує.", 5000, color="orange")
+                return
+            if self.current_edit_mode == EDIT_MODE_MACRO:
+                if not self.return_to_scenario(): return
+            if self.active_scenario_id != owner_id:
+                self.project_tabs.setCurrentIndex(0)
+                items = self.scenarios_list.findItems(owner_id, Qt.MatchFlag.MatchExactly)
+                if items:
+                    self.scenarios_list.setCurrentItem(items[0]) # Завантажує сценарій (on_active_scenario_changed)
+
+        if self._focus_node(node_id):
+            self.activateWindow()
+
+    def _focus_node(self, node_id):
+        """Виділяє вузол node_id поточної сцени та центрує на ньому вид. Повертає True, якщо вузол знайдено."""
+        node = self.scene.graph.nodes.get(node_id)
+        if node is None:
+            self.show_status_message(f"Вузол '{node_id}' не знайдено (звіт міг застаріти).", 5000, color="orange")
+            return False
+        self.scene.clearSelection()
+        node.setSelected(True)
+        self.view.centerOn(node)
+        return True
+
+    def _diagnostic_node_label(self, node_id):
+        node = self.scene.graph.nodes.get(node_id)
+        return f"{node.node_name} ({node_id})" if node is not None and getattr(node, 'node_name', None) else None
+
     # --- Simulation ---
     def _update_simulation_trigger_zones(self):
         log.debug("Updating simulation trigger zones combo box...") # Діагностика
@@ -1821,22 +1995,16 @@ class MainWindow(QMainWindow):
                 log.warning("  TriggerNode has no zones assigned.") # Діагностика
                 self.sim_trigger_zone_combo.addItem("Немає зон в тригері", userData=None)
             else:
-                # --- ВИКОРИСТАННЯ project_manager ---
-                all_zones, _ = self.project_manager.get_all_zones_and_outputs()
-                # --- КІНЕЦЬ ---
+                config_index = self.project_manager.get_config_index()
                 found_zones = False
-                log.debug(f"  Populating combo with {len(zone_ids)} trigger zones (from {len(all_zones)} total zones)...") # Діагностика
+                log.debug(f"  Populating combo with {len(zone_ids)} trigger zones (from {len(config_index.zones)} total zones)...") # Діагностика
                 for zid in zone_ids:
-                    zone_found_in_config = False
-                    for z in all_zones:
-                        if z['id'] == zid:
-                            item_text = f"{z.get('parent_name', '?')}: {z['name']}"
-                            log.debug(f"    Adding zone: '{item_text}' (ID: {zid})") # Діагностика
-                            self.sim_trigger_zone_combo.addItem(item_text, userData=zid)
-                            found_zones = True
-                            zone_found_in_config = True
-                            break
-                    if not zone_found_in_config:
+                    item_text = config_index.zone_label(zid, default=None)
+                    if item_text is not None:
+                        log.debug(f"    Adding zone: '{item_text}' (ID: {zid})") # Діагностика
+                        self.sim_trigger_zone_combo.addItem(item_text, userData=zid)
+                        found_zones = True
+                    else:
                          log.warning(f"    Trigger zone ID '{zid}' not found in current config.") # Діагностика
 
                 if not found_zones:
@@ -1861,32 +2029,35 @@ class MainWindow(QMainWindow):
         sim_enabled = self.current_edit_mode == EDIT_MODE_SCENARIO
         is_ready_for_sim = False
         if sim_enabled and self.scene:
-            trigger_node = next((item for item in self.scene.items() if isinstance(item, TriggerNode)), None)
+            trigger_node = next((node for node in self.scene.graph.nodes.values() if isinstance(node, TriggerNode)), None)
             # Перевіряємо, чи тригер існує, чи немає помилок валідації, і чи вибрана валідна зона
-            if trigger_node and not trigger_node.error_icon.isVisible():
+            if trigger_node and not self.scene.diagnostics.has_node_errors(trigger_node.id):
                 if self.sim_trigger_zone_combo.count() > 0 and self.sim_trigger_zone_combo.currentData() is not None:
                      is_ready_for_sim = True
         is_running = self.simulator.is_running
         log.debug(f"  SimEnabled={sim_enabled}, ReadyForSim={is_ready_for_sim}, IsRunning={is_running}") # Діагностика
         self.start_sim_action.setEnabled(sim_enabled and is_ready_for_sim and not is_running)
+        self.all_zones_sim_action.setEnabled(sim_enabled and is_ready_for_sim and not is_running)
         self.step_sim_action.setEnabled(sim_enabled and is_running)
         self.stop_sim_action.setEnabled(sim_enabled and is_running)
         self.sim_trigger_zone_combo.setEnabled(sim_enabled and not is_running)
 
+    def _check_before_simulation(self):
+        """Синхронно перевіряє сценарій (фонова перевірка скасовується). Повертає True, якщо помилок немає."""
+        validate_scenario_now(self.scene, self.project_manager.get_config_index(),
+                              self.project_manager.get_project_data().get('macros', {}))
+        log.debug("  Checking for validation errors before starting simulation...") # Діагностика
+        if self.scene.diagnostics.has_errors():
+            log.error(f"  Validation errors found: {self.scene.diagnostics.error_count()}") # Діагностика
+            self.show_status_message("Помилка: Неможливо почати симуляцію, у сценарії є помилки.", 5000, color="red")
+            return False
+        return True
+
     def start_simulation(self):
         log.info("Start simulation button clicked.") # Діагностика
         # Логіка без змін
         if self.current_edit_mode != EDIT_MODE_SCENARIO: return
-        self.validate_current_view() # Перевіряємо помилки перед запуском
-        QApplication.processEvents() # Обробляємо події, щоб валідація завершилась
-        log.debug("  Checking for validation errors before starting simulation...") # Діагностика
-        has_errors = False
-        for item in self.scene.items():
-            if isinstance(item, BaseNode) and item.error_icon.isVisible():
-                log.error(f"  Validation error found on node {item.id}: {item.error_icon.toolTip()}") # Діагностика
-                has_errors = True
-        if has_errors:
-            self.show_status_message("Помилка: Неможливо почати симуляцію, у сценарії є помилки.", 5000, color="red")
+        if not self._check_before_simulation():
             return
 
         trigger_zone_id = self.sim_trigger_zone_combo.currentData()
@@ -1899,6 +2070,48 @@ class MainWindow(QMainWindow):
             log.error("  Simulator failed to start.") # Діагностика
 
 
+    def simulate_all_zones(self):
+        """Прогін сценарію від кожної зони тригера без діалогів і таблиця порівняння результатів."""
+        log.info("Simulate all zones button clicked.")
+        if self.current_edit_mode != EDIT_MODE_SCENARIO or self.simulator.is_running: return
+        if not self._check_before_simulation():
+            return
+        engine = SimulationEngine(compile_graph(self.scene.graph, self.project_manager.get_macros_data(),
+                                                scene_node_info), timed=True)
+        runs = simulate_all_zones(engine)
+        if not runs:
+            self.show_status_message("Помилка: у тригері немає зон для симуляції.", 5000, color="orange")
+            return
+        config_index = self.project_manager.get_config_index()
+        if self.zone_comparison_dialog is None:
+            self.zone_comparison_dialog = ZoneComparisonDialog(self)
+            self.zone_comparison_dialog.zone_activated.connect(self._simulate_zone_from_comparison)
+        self.zone_comparison_dialog.set_runs(runs, lambda zone_id: config_index.zone_label(zone_id, default=None),
+                                             lambda node_id: self._simulation_action_label(engine.program, node_id))
+        self.zone_comparison_dialog.show()
+        self.zone_comparison_dialog.raise_()
+        groups = len({run.group for run in runs})
+        self.show_status_message(f"Симуляцію {len(runs)} зон завершено: різних результатів - {groups}.", 5000,
+                                 color="lime")
+
+    def _simulation_action_label(self, program, node_id):
+        """Підпис вузла дії для таблиці порівняння: назва вузла (шлях для вузлів макросу) та вихід/користувач."""
+        node_type, target = program.operands[program.index[node_id]]
+        name = self.simulator.node_label(node_id)
+        if target is None:
+            return name
+        config_index = self.project_manager.get_config_index()
+        if node_type == 'SendSMSNode':
+            return f"{name} ({config_index.user_name(target)})"
+        return f"{name} ({config_index.output_label(target)})"
+
+    def _simulate_zone_from_comparison(self, zone_id):
+        index = self.sim_trigger_zone_combo.findData(zone_id)
+        if index < 0 or self.simulator.is_running:
+            return
+        self.sim_trigger_zone_combo.setCurrentIndex(index)
+        self.start_simulation()
+
     def step_simulation(self):
         log.debug("Step simulation button clicked.") # Діагностика
         # Логіка без змін
@@ -1919,24 +2132,14 @@ class MainWindow(QMainWindow):
         self.update_simulation_controls()
         log.debug("  Simulation stopped and view set to interactive.") # Діагностика
 
-    def get_user_choice_for_condition(self, node):
-        log.debug(f"Getting user choice for condition node {node.id} ('{node.node_name}')") # Діагностика
-        # Логіка без змін, але використовує project_manager
-        props = dict(node.properties)
-        zone_id = props.get('zone_id')
-        zone_name = "Невідома зона"
-        # --- ВИКОРИСТАННЯ project_manager ---
-        all_zones, _ = self.project_manager.get_all_zones_and_outputs()
-        # --- КІНЕЦЬ ---
-        for z in all_zones:
-            if z['id'] == zone_id:
-                zone_name = f"'{z.get('parent_name', '?')}: {z['name']}'"
-                break
+    def get_user_choice_for_condition(self, zone_id, node_label=None):
+        log.debug(f"Getting user choice for condition node '{node_label}'") # Діагностика
+        zone_label = self.project_manager.get_config_index().zone_label(zone_id, default=None)
+        zone_name = f"'{zone_label}'" if zone_label is not None else "Невідома зона"
         log.debug(f"  Condition zone: {zone_name} (ID: {zone_id})") # Діагностика
-        items = ["Під охороною", "Знята з охорони", "Тривога"]
-        item, ok = QInputDialog.getItem(self, "Симуляція: Вузол 'Умова'",
+        item, ok = QInputDialog.getItem(self, f"Симуляція: Вузол '{node_label or 'Умова'}'",
                                         f"Який поточний стан зони {zone_name}?",
-                                        items, 0, False)
+                                        list(ZONE_STATES), 0, False)
         result = item if ok and item else None
         log.debug(f"  User choice: {result} (OK={ok})") # Діагностика
         return result
@@ -1971,7 +2174,7 @@ class MainWindow(QMainWindow):
 
     # --- Import / Export ---
     def import_project(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Імпорт проекту", "", "XML Files (*.xml)")
+        path, _ = QFileDialog.getOpenFileName(self, "Імпорт проекту", "", PROJECT_FILE_FILTER)
         if not path:
             log.debug("Import cancelled by user.") # Діагностика
             return
@@ -1979,7 +2182,7 @@ class MainWindow(QMainWindow):
         self._loading_project = True # Встановлюємо прапорець
         try:
             # --- ВИКОРИСТАННЯ serialization.py ---
-            new_project_data = import_project_data(path)
+            new_project_data = import_project_data(path, lazy=True) # Сценарії декодуються при першому відкритті
             # --- КІНЕЦЬ ---
             if new_project_data is None:
                 log.error("Failed to load project data from file.") # Діагностика
@@ -1988,7 +2191,7 @@ class MainWindow(QMainWindow):
 
             log.debug("Project data loaded from file, loading into manager...") # Діагностика
             # --- ВИКОРИСТАННЯ project_manager ---
-            # load_project викличе project_updated, але обробник його проігнорує
+            # load_project викличе project_changed, але обробник його проігнорує
             self.project_manager.load_project(new_project_data)
             # --- КІНЕЦЬ ---
             self.scene.clear()
@@ -2029,16 +2232,20 @@ class MainWindow(QMainWindow):
         log.debug("Export project triggered.") # Діагностика
         log.debug("  Saving current state before export...") # Діагностика
         self.save_current_state() # Зберігаємо поточний стан перед експортом
-        path, _ = QFileDialog.getSaveFileName(self, "Експорт проекту", "", "XML Files (*.xml)")
+        path, _ = QFileDialog.getSaveFileName(self, "Експорт проекту", "", PROJECT_FILE_FILTER)
         if not path:
             log.debug("Export cancelled by user.") # Діагностика
             return
         log.info(f"Starting project export to: {path}") # Діагностика
         try:
             # --- ВИКОРИСТАННЯ serialization.py та project_manager ---
-            project_data_to_save = self.project_manager.get_project_data()
-            log.debug("  Got project data from manager for export.") # Діагностика
-            success = export_project_data(path, project_data_to_save)
+            if is_binary_path(path):
+                project_data_to_save = self.project_manager.get_project_data()
+                log.debug("  Got project data from manager for export.") # Діагностика
+                success = export_project_data(path, project_data_to_save)
+            else:
+                # XML: серіалізуються лише змінені сценарії/макроси, решта береться з кешу
+                success = export_project_fragments(path, *self.project_manager.iter_export_fragments())
             # --- КІНЕЦЬ ---
             if success:
                 self.show_status_message(f"Проект успішно експортовано до {path}", color="green")
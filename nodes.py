@@ -1,8 +1,14 @@
 import uuid
 import logging  # Додано для логування
-from copy import deepcopy  # <-- ДОДАНО ІМПОРТ
 from enum import Enum, auto
 from lxml import etree as ET
+# Кодеки даних винесено у Qt-незалежне ядро
+from core.xml_codec import (node_data_from_xml, node_data_to_xml, connection_data_from_xml,
+                            connection_data_to_xml, comment_data_from_xml, comment_data_to_xml,
+                            frame_data_from_xml, frame_data_to_xml)
+from core.validator import check_node_properties, check_required_outputs
+from core.config_index import as_config_index # O(1) пошук зон/виходів/користувачів за ID
+from core.diagnostics import ERROR
 from PyQt6.QtGui import QColor, QPen, QBrush, QFont, QPainterPath, QTextCursor, QTextOption  # Додано QTextOption
 from PyQt6.QtCore import Qt, QRectF, QPointF
 from PyQt6.QtWidgets import QGraphicsItem, QGraphicsRectItem, QGraphicsTextItem, QGraphicsEllipseItem, \
@@ -18,6 +24,22 @@ def generate_short_id():
     return uuid.uuid4().hex[:12]
 
 
+def scene_graph_of(item):
+    """Повертає ScenarioGraph сцени, до якої належить елемент (EditorScene), або None."""
+    scene = item.scene() if item is not None else None
+    return getattr(scene, 'graph', None)
+
+
+def connection_edge(connection):
+    """Повертає ребро (from_id, from_socket, to_id, to_socket) для з'єднання або None."""
+    start_socket, end_socket = connection.start_socket, connection.end_socket
+    start_node = start_socket.parentItem() if start_socket else None
+    end_node = end_socket.parentItem() if end_socket else None
+    if not isinstance(start_node, BaseNode) or not isinstance(end_node, BaseNode):
+        return None
+    return start_node.id, start_socket.socket_name, end_node.id, end_socket.socket_name
+
+
 class Connection(QGraphicsPathItem):
     def __init__(self, start_socket, end_socket):
         super().__init__()
@@ -142,12 +164,7 @@ class Connection(QGraphicsPathItem):
 
     @staticmethod
     def data_from_xml(xml_element):
-        return {
-            'from_node': xml_element.get("from_node"),
-            'from_socket': xml_element.get("from_socket", "out"),  # Fallback for old format
-            'to_node': xml_element.get("to_node"),
-            'to_socket': xml_element.get("to_socket", "in")  # Додано читання цільового сокета
-        }
+        return connection_data_from_xml(xml_element)
 
     @classmethod
     def from_data(cls, data):
@@ -157,14 +174,7 @@ class Connection(QGraphicsPathItem):
 
     @staticmethod
     def data_to_xml(parent_element, conn_data):
-        # Ensure all values are strings, provide defaults
-        attrs = {
-            "from_node": str(conn_data.get('from_node', '')),
-            "from_socket": str(conn_data.get('from_socket', 'out')),
-            "to_node": str(conn_data.get('to_node', '')),
-            "to_socket": str(conn_data.get('to_socket', 'in'))  # Додано збереження цільового сокета
-        }
-        ET.SubElement(parent_element, "connection", **attrs)
+        connection_data_to_xml(parent_element, conn_data)
 
 
 class Socket(QGraphicsEllipseItem):
@@ -212,10 +222,19 @@ class Socket(QGraphicsEllipseItem):
     def add_connection(self, connection):
         if connection not in self.connections:
             self.connections.append(connection)
+        # Синхронізуємо модель графа сцени (ребро додається, лише коли обидва вузли на сцені)
+        graph = scene_graph_of(self.parent_node)
+        edge = connection_edge(connection) if graph is not None else None
+        if edge:
+            graph.add_edge(*edge)
 
     def remove_connection(self, connection):
         if connection in self.connections:
             self.connections.remove(connection)
+            graph = scene_graph_of(self.parent_node)
+            edge = connection_edge(connection) if graph is not None else None
+            if edge:
+                graph.remove_edge(*edge)
         else:
             # log.warning(f"Attempted to remove non-existent connection from socket {self.socket_name} on node {self.parent_node.id if self.parent_node else '?'}")
             pass  # Не логуємо, це може бути нормальним при komplexних undo/redo
@@ -414,8 +433,9 @@ class BaseNode(QGraphicsItem):
         self.error_icon.setZValue(3)  # Над іншими елементами вузла
         self.error_icon.setVisible(False)
 
-    def set_validation_state(self, is_valid, message=""):
+    def set_validation_state(self, is_valid, message="", severity=ERROR):
         self.error_icon.setVisible(not is_valid)
+        self.error_icon.setPlainText("⚠️" if severity == ERROR else "ℹ️")  # Попередження не блокує симуляцію
         self.error_icon.setToolTip(message if not is_valid else "")  # Повідомлення тільки для помилки
 
     def set_active_state(self, active):
@@ -427,8 +447,20 @@ class BaseNode(QGraphicsItem):
         # Оновлюємо ZValue, щоб активний/вибраний вузол був вище
         self.setZValue(3 if active else 2 if self.isSelected() else 1)
 
+    def validation_error(self, config):
+        """Перевіряє вузол і повертає (rule, message) першої помилки або None (без зміни UI)."""
+        # Правила валідації спільні зі скриптовою перевіркою даних (core.validator)
+        node_type = type(self).__name__
+        connected_outputs = {name for name, socket in self._sockets.items()
+                             if socket.is_output and socket.connections}
+        return (check_node_properties(node_type, self.properties, config)
+                or check_required_outputs(node_type, connected_outputs))
+
     def validate(self, config):
-        # Базова валідація - просто скидаємо помилку
+        error = self.validation_error(config)
+        if error:
+            self.set_validation_state(False, error[1])
+            return False
         self.set_validation_state(True)
         return True
 
@@ -443,6 +475,21 @@ class BaseNode(QGraphicsItem):
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
     def itemChange(self, change, value):
+        # Синхронізація моделі графа сцени при додаванні/видаленні вузла
+        if change == QGraphicsItem.GraphicsItemChange.ItemSceneChange:
+            graph = scene_graph_of(self)
+            if graph is not None and value is not self.scene():
+                graph.remove_node(self.id)
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            graph = getattr(value, 'graph', None)
+            if graph is not None:
+                graph.add_node(self.id, self)
+                for socket in self._sockets.values():
+                    for conn in socket.connections:
+                        edge = connection_edge(conn)
+                        if edge:
+                            graph.add_edge(*edge)
+
         # Оновлення Z-індексу при виборі/скасуванні вибору
         if change == QGraphicsItem.GraphicsItemChange.ItemSelectedChange:
             is_selected = value
@@ -484,7 +531,9 @@ class BaseNode(QGraphicsItem):
         class_name = self.__class__.__name__
         data = {'id': self.id, 'node_type': class_name, 'name': self.node_name,
                 'description': self.description, 'pos': (self.pos().x(), self.pos().y()),
-                'properties': deepcopy(self.properties)}  # Копіюємо властивості
+                # Неглибока копія: властивості - кортежі, а їх значення (напр. список зон)
+                # при редагуванні замінюються, а не змінюються на місці
+                'properties': list(self.properties)}
         # Add macro specific data if needed
         if isinstance(self, MacroNode):
             data['macro_id'] = self.macro_id
@@ -495,81 +544,11 @@ class BaseNode(QGraphicsItem):
 
     @staticmethod
     def data_from_xml(xml_element):
-        # Читаємо атрибут 'type' як ім'я класу
-        node_class_name = xml_element.get("type")
-        data = {'id': xml_element.get("id"), 'node_type': node_class_name,
-                'name': xml_element.get("name"), 'pos': (float(xml_element.get("x")), float(xml_element.get("y"))),
-                'properties': []}
-        desc_el = xml_element.find("description")
-        # Handle missing or empty description safely
-        data['description'] = desc_el.text if desc_el is not None and desc_el.text is not None else ""
-        props_el = xml_element.find("properties")
-        if props_el is not None:
-            for prop_el in props_el:
-                key, value_str = prop_el.get("key"), prop_el.get("value")
-                value = value_str  # Default to string
-                if key == 'zones':
-                    # Ensure list even if empty, handle potential None for value_str
-                    value = value_str.split(',') if value_str else []
-                elif key in ('seconds', 'count'):
-                    try:
-                        # Handle potential None for value_str
-                        value = int(value_str) if value_str is not None else 0
-                    except (ValueError, TypeError):
-                        log.warning(
-                            f"Could not convert property '{key}' value '{value_str}' to int for node {data.get('id')}. Using default 0.")
-                        value = 0  # Default to 0 on error
-                # Handle None key or value gracefully
-                if key is not None:
-                    data['properties'].append((key, value))
-                else:
-                    log.warning(f"Found property with None key for node {data.get('id')}. Skipping.")
-
-        # Add macro specific data if needed
-        if node_class_name == 'MacroNode':  # Перевіряємо за ім'ям класу
-            data['macro_id'] = xml_element.get('macro_id')
-        return data
+        return node_data_from_xml(xml_element)
 
     @staticmethod
     def data_to_xml(parent_element, node_data):
-        # Ensure all attribute values are strings and handle potential None
-        attrs = {
-            'id': str(node_data.get('id', '')),
-            'type': str(node_data.get('node_type', '')),  # Now saving class name
-            'name': str(node_data.get('name', '')),
-            'x': str(node_data.get('pos', [0, 0])[0]),
-            'y': str(node_data.get('pos', [0, 0])[1])
-        }
-        # Add macro specific attributes, ensuring it's a string
-        if node_data.get('node_type') == 'MacroNode':  # Check against class name
-            attrs['macro_id'] = str(node_data.get('macro_id', ''))
-
-        node_el = ET.SubElement(parent_element, "node", **attrs)
-
-        desc_el = ET.SubElement(node_el, "description");
-        # Ensure description is a string
-        desc_el.text = str(node_data.get('description', ''))
-
-        # Ensure 'properties' exists and is a list before iterating
-        properties = node_data.get('properties')
-        if properties and isinstance(properties, (list, tuple)):  # Allow tuples too
-            props_el = ET.SubElement(node_el, "properties")
-            for prop_item in properties:
-                # Check if prop_item is a tuple/list of size 2
-                if isinstance(prop_item, (list, tuple)) and len(prop_item) == 2:
-                    key, value = prop_item
-                    # Ensure key and value are not None before converting to string
-                    prop_attrs = {
-                        "key": str(key) if key is not None else "",
-                        # Convert value to string, handle lists specifically
-                        "value": ",".join(map(str, value)) if isinstance(value, list) else str(
-                            value if value is not None else "")
-                    }
-                    ET.SubElement(props_el, "property", **prop_attrs)
-                else:
-                    log.warning(f"Skipping invalid property item: {prop_item} for node {attrs.get('id')}")
-
-        return node_el
+        return node_data_to_xml(parent_element, node_data)
 
     @classmethod
     def from_data(cls, data):
@@ -661,26 +640,6 @@ class TriggerNode(BaseNode):
             log.warning(f"TriggerNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        props = dict(self.properties)
-        zones_ids_to_check = props.get('zones', [])
-        if not zones_ids_to_check:
-            self.set_validation_state(False, "Не вибрано жодної зони для тригера.")
-            return False
-
-        if config:
-            all_zone_ids = set()  # Use set for faster lookup
-            for device in config.get('devices', []):
-                all_zone_ids.update(z['id'] for z in device.get('zones', []))
-
-            missing_zones = [zid for zid in zones_ids_to_check if zid not in all_zone_ids]
-            if missing_zones:
-                self.set_validation_state(False, f"Зони не знайдено: {', '.join(missing_zones)}")
-                return False
-
-        self.set_validation_state(True)
-        return True
-
 
 class ActivateOutputNode(BaseNode):
     ICON = "🔊"
@@ -699,14 +658,7 @@ class ActivateOutputNode(BaseNode):
         output_id = props.get('output_id')
         output_name = "НЕ ВИБРАНО"
         if config and output_id:
-            all_outputs = {}  # Use dict for faster lookup {id: {'name':..., 'parent_name':...}}
-            for device in config.get('devices', []):
-                for out in device.get('outputs', []):
-                    all_outputs[out['id']] = {'name': out['name'], 'parent_name': out.get('parent_name', '')}
-
-            output_info = all_outputs.get(output_id)
-            if output_info:
-                output_name = f"{output_info.get('parent_name', '')}: {output_info['name']}"
+            output_name = as_config_index(config).output_label(output_id, default=output_name)
 
         # --- [ИСПРАВЛЕНИЕ 1] Добавляем проверку наличия properties_text ---
         if hasattr(self, 'properties_text'):
@@ -715,24 +667,6 @@ class ActivateOutputNode(BaseNode):
             log.warning(f"ActivateOutputNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        props = dict(self.properties)
-        output_id = props.get('output_id')
-        if not output_id:
-            self.set_validation_state(False, "Не вибрано вихід для активації.")
-            return False
-        if config:
-            all_ids = set()
-            for device in config.get('devices', []):
-                all_ids.update(o['id'] for o in device.get('outputs', []))
-
-            if output_id not in all_ids:
-                self.set_validation_state(False, f"Вихід з ID '{output_id}' не знайдено.")
-                return False
-
-        self.set_validation_state(True)
-        return True
-
 
 class DeactivateOutputNode(BaseNode):
     ICON = "🔇"
@@ -752,12 +686,7 @@ class DeactivateOutputNode(BaseNode):
         output_id = props.get('output_id')
         output_name = "НЕ ВИБРАНО"
         if config and output_id:
-            all_outputs = {}
-            for device in config.get('devices', []):
-                for out in device.get('outputs', []):
-                    all_outputs[out['id']] = {'name': out['name'], 'parent_name': out.get('parent_name', '')}
-            output_info = all_outputs.get(output_id)
-            if output_info: output_name = f"{output_info.get('parent_name', '')}: {output_info['name']}"
+            output_name = as_config_index(config).output_label(output_id, default=output_name)
         # --- [ИСПРАВЛЕНИЕ 1] Добавляем проверку наличия properties_text ---
         if hasattr(self, 'properties_text'):
             self.properties_text.setPlainText(output_name)
@@ -765,23 +694,6 @@ class DeactivateOutputNode(BaseNode):
             log.warning(f"DeactivateOutputNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        # Logic is identical to ActivateOutputNode
-        props = dict(self.properties)
-        output_id = props.get('output_id')
-        if not output_id:
-            self.set_validation_state(False, "Не вибрано вихід для деактивації.")
-            return False
-        if config:
-            all_ids = set()
-            for device in config.get('devices', []):
-                all_ids.update(o['id'] for o in device.get('outputs', []))
-            if output_id not in all_ids:
-                self.set_validation_state(False, f"Вихід з ID '{output_id}' не знайдено.")
-                return False
-        self.set_validation_state(True)
-        return True
-
 
 class DelayNode(BaseNode):
     ICON = "⏳"
@@ -822,8 +734,7 @@ class SendSMSNode(BaseNode):
         user_id = props.get('user_id')
         user_name = "НЕ ВИБРАНО"
         if config and user_id:
-            users_map = {user['id']: user['name'] for user in config.get('users', [])}
-            user_name = users_map.get(user_id, "НЕ ЗНАЙДЕНО")
+            user_name = as_config_index(config).user_name(user_id)
         # --- [ИСПРАВЛЕНИЕ 1] Добавляем проверку наличия properties_text ---
         if hasattr(self, 'properties_text'):
             self.properties_text.setPlainText(f"Кому: {user_name}")
@@ -831,25 +742,6 @@ class SendSMSNode(BaseNode):
             log.warning(f"SendSMSNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        props = dict(self.properties)
-        user_id = props.get('user_id')
-        message = props.get('message', '')
-        if not user_id:
-            self.set_validation_state(False, "Не вибрано користувача для відправки SMS.")
-            return False
-        if not message:
-            self.set_validation_state(False, "Текст повідомлення не може бути порожнім.")
-            return False
-        if config:
-            all_ids = {user['id'] for user in config.get('users', [])}
-            if user_id not in all_ids:
-                self.set_validation_state(False, f"Користувача з ID '{user_id}' не знайдено.")
-                return False
-
-        self.set_validation_state(True)
-        return True
-
 
 class ConditionNodeZoneState(BaseNode):
     ICON = "🔎"
@@ -923,15 +815,7 @@ class ConditionNodeZoneState(BaseNode):
         state = props.get('state', 'N/A')
         zone_name = "НЕ ВИБРАНО"
         if config and zone_id:
-            all_zones = {}
-            for device in config.get('devices', []):
-                for zone in device.get('zones', []):
-                    all_zones[zone['id']] = {'name': zone['name'], 'parent_name': zone.get('parent_name', '')}
-            zone_info = all_zones.get(zone_id)
-            if zone_info:
-                zone_name = f"{zone_info.get('parent_name', '')}: {zone_info['name']}"
-            else:
-                zone_name = "НЕ ЗНАЙДЕНО"
+            zone_name = as_config_index(config).zone_label(zone_id)
 
         # --- [ИСПРАВЛЕНИЕ 1] Добавляем проверку наличия properties_text ---
         if hasattr(self, 'properties_text'):
@@ -940,35 +824,6 @@ class ConditionNodeZoneState(BaseNode):
             log.warning(f"ConditionNodeZoneState {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        props = dict(self.properties)
-        zone_id = props.get('zone_id')
-        if not zone_id:
-            self.set_validation_state(False, "Не вибрано зону для перевірки стану.")
-            return False
-        if config:
-            all_ids = set()
-            for device in config.get('devices', []):
-                all_ids.update(z['id'] for z in device.get('zones', []))
-
-            if zone_id not in all_ids:
-                self.set_validation_state(False, f"Зону з ID '{zone_id}' не знайдено.")
-                return False
-
-        out_true_socket = self.get_socket("out_true")
-        out_false_socket = self.get_socket("out_false")
-
-        # Перевіряємо наявність сокетів перед доступом до connections
-        if not out_true_socket or not out_true_socket.connections:
-            self.set_validation_state(False, "Вихід 'Так' повинен бути підключений.")  # Оновлено текст помилки
-            return False
-        if not out_false_socket or not out_false_socket.connections:
-            self.set_validation_state(False, "Вихід 'Ні' повинен бути підключений.")  # Оновлено текст помилки
-            return False
-
-        self.set_validation_state(True)
-        return True
-
 
 class SequenceNode(BaseNode):
     ICON = "→"
@@ -1027,32 +882,6 @@ class RepeatNode(DecoratorNode):
             log.warning(f"RepeatNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
-        props = dict(self.properties)
-        try:
-            count = int(props.get('count', 0))
-            if count < -1:
-                self.set_validation_state(False, "Кількість повторів не може бути меншою за -1.")
-                return False
-        except (ValueError, TypeError):
-            self.set_validation_state(False, "Кількість повторів має бути числом.")
-            return False
-
-        out_loop_socket = self.get_socket("out_loop")
-        out_end_socket = self.get_socket("out_end")
-
-        if not out_loop_socket or not out_loop_socket.connections:
-            self.set_validation_state(False, "Вихід 'Виконати' (▶️) повинен бути підключений.")
-            return False
-
-        # Вихід 'Завершити' може бути не підключений, якщо цикл безкінечний? Ні, краще вимагати завжди.
-        if not out_end_socket or not out_end_socket.connections:
-            self.set_validation_state(False, "Вихід 'Завершити' (⏹️) повинен бути підключений.")
-            return False
-
-        self.set_validation_state(True)
-        return True
-
 
 # --- Нові класи для Макросів ---
 
@@ -1247,7 +1076,7 @@ class MacroNode(BaseNode):
             log.warning(f"MacroNode {self.id} missing 'properties_text'.")
         # --- [КОНЕЦ ИСПРАВЛЕНИЯ] ---
 
-    def validate(self, config):
+    def validation_error(self, config):
         main_window = None
         # --- [ЗМІНА] Безпечніший спосіб отримати main_window ---
         view = self.scene().views()[0] if self.scene() and self.scene().views() else None
@@ -1260,14 +1089,12 @@ class MacroNode(BaseNode):
         # --- КІНЕЦЬ ВИПРАВЛЕННЯ ---
 
         if not self.macro_id:
-            self.set_validation_state(False, "Макровузол не прив'язаний до визначення макросу (відсутній macro_id).")
-            return False
+            return 'macro_missing_id', "Макровузол не прив'язаний до визначення макросу (відсутній macro_id)."
         # --- ВИПРАВЛЕННЯ: Використовуємо project_manager ---
         elif not main_window or not main_window.project_manager.get_macro_data(
                 self.macro_id):  # Перевірка main_window додана
             # --- КІНЕЦЬ ВИПРАВЛЕННЯ ---
-            self.set_validation_state(False, f"Визначення макросу з ID '{self.macro_id}' не знайдено в проекті.")
-            return False
+            return 'macro_not_found', f"Визначення макросу з ID '{self.macro_id}' не знайдено в проекті."
         else:
             # --- ВИПРАВЛЕННЯ: Використовуємо project_manager ---
             macro_data = main_window.project_manager.get_macro_data(self.macro_id)
@@ -1289,21 +1116,16 @@ class MacroNode(BaseNode):
                         # Якщо і після оновлення не збігаються - помилка
                         log.error(
                             f"Failed to match sockets after update for MacroNode {self.id}. Defined: IN{defined_input_names}/OUT{defined_output_names}, Current: IN{current_input_names}/OUT{current_output_names}")
-                        self.set_validation_state(False,
-                                                  "Невідповідність сокетів визначенню макросу (після спроби оновлення).")
-                        return False
+                        return 'macro_sockets', "Невідповідність сокетів визначенню макросу (після спроби оновлення)."
                     else:
                         log.info(f"Successfully updated sockets for MacroNode {self.id} to match definition.")
-                        self.set_validation_state(True)  # Стан валідний після оновлення
-                        return True  # Повертаємо True після успішного оновлення
+                        return None  # Стан валідний після оновлення
                 except Exception as e:
                     log.error(f"Error auto-updating sockets for MacroNode {self.id}: {e}", exc_info=True)
-                    self.set_validation_state(False, "Помилка оновлення сокетів за визначенням макросу.")
-                    return False
+                    return 'macro_sockets', "Помилка оновлення сокетів за визначенням макросу."
 
             # Якщо сокети збігалися одразу
-            self.set_validation_state(True)
-            return True
+            return None
 
     # --- ДОДАНО: Перевизначення boundingRect ---
     def boundingRect(self):
@@ -1636,23 +1458,11 @@ class CommentItem(QGraphicsItem):
 
     @staticmethod
     def data_from_xml(xml_element):
-        return {'id': xml_element.get("id"),
-                'text': xml_element.text or "",  # Get text content
-                'pos': (float(xml_element.get("x")), float(xml_element.get("y"))),
-                'size': (float(xml_element.get("width")), float(xml_element.get("height")))}
+        return comment_data_from_xml(xml_element)
 
     @staticmethod
     def data_to_xml(parent_element, comment_data):
-        attrs = {
-            'id': str(comment_data.get('id', '')),
-            'x': str(comment_data.get('pos', [0, 0])[0]),
-            'y': str(comment_data.get('pos', [0, 0])[1]),
-            'width': str(comment_data.get('size', [0, 0])[0]),
-            'height': str(comment_data.get('size', [0, 0])[1])
-        }
-        comment_el = ET.SubElement(parent_element, "comment", **attrs)
-        # Ensure text is a string
-        comment_el.text = str(comment_data.get('text', ''))
+        comment_data_to_xml(parent_element, comment_data)
 
     @classmethod
     def from_data(cls, data, view):
@@ -1871,23 +1681,11 @@ class FrameItem(QGraphicsItem):
 
     @staticmethod
     def data_from_xml(xml_element):
-        return {'id': xml_element.get("id"),
-                'text': xml_element.text or "",  # Get text content
-                'pos': (float(xml_element.get("x")), float(xml_element.get("y"))),
-                'size': (float(xml_element.get("width")), float(xml_element.get("height")))}
+        return frame_data_from_xml(xml_element)
 
     @staticmethod
     def data_to_xml(parent_element, frame_data):
-        attrs = {
-            'id': str(frame_data.get('id', '')),
-            'x': str(frame_data.get('pos', [0, 0])[0]),
-            'y': str(frame_data.get('pos', [0, 0])[1]),
-            'width': str(frame_data.get('size', [0, 0])[0]),
-            'height': str(frame_data.get('size', [0, 0])[1])
-        }
-        frame_el = ET.SubElement(parent_element, "frame", **attrs)
-        # Ensure text is a string
-        frame_el.text = str(frame_data.get('text', ''))
+        frame_data_to_xml(parent_element, frame_data)
 
     @classmethod
     def from_data(cls, data, view):
@@ -1,12 +1,69 @@
 # -*- coding: utf-8 -*-
 import logging
-from PyQt6.QtCore import QPointF
+from PyQt6.QtCore import QPointF, pyqtSignal
+from PyQt6.QtWidgets import QGraphicsScene
 
 # Імпортуємо всі типи вузлів та елементів
-from nodes import (BaseNode, Connection, CommentItem, FrameItem, MacroNode)
+from nodes import (BaseNode, Connection, CommentItem, FrameItem, MacroNode, connection_edge)
+from core.graph import ScenarioGraph
+from core.diagnostics import DiagnosticsStore
 
 log = logging.getLogger(__name__)
 
+
+class EditorScene(QGraphicsScene):
+    """
+    Сцена редактора з моделлю графа (ScenarioGraph), яка синхронізується
+    з вузлами та з'єднаннями (BaseNode.itemChange, Socket.add/remove_connection),
+    та реєстром діагностик валідації (DiagnosticsStore).
+    """
+    # Множина ID вузлів, чиї діагностики змінились, або None - реєстр очищено повністю
+    diagnostics_changed = pyqtSignal(object)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.graph = ScenarioGraph(track_changes=True) # Журнал змін - для інкрементної валідації
+        self.diagnostics = DiagnosticsStore() # Заповнюється validation.py, застосовується до вузлів пакетом
+        self.validation_state = None # Стан останньої валідації (validation.ScenarioValidationState)
+        self.background_validation = None # validation.BackgroundScenarioValidator, створюється за потреби
+
+    def clear(self):
+        if self.background_validation is not None:
+            self.background_validation.cancel() # Результат для старого вмісту сцени вже не потрібен
+        super().clear()
+        self.graph.clear() # clear() видаляє елементи без сповіщень itemChange
+        self.validation_state = None
+        self.diagnostics.clear()
+        self.diagnostics.take_changed() # Вузлів більше немає - застосовувати нічого
+        self.diagnostics_changed.emit(None)
+
+
+def scene_graph(scene):
+    """
+    Повертає модель графа сцени. Для звичайної QGraphicsScene (без синхронізованого графа)
+    граф будується з елементів сцени за O(кількості елементів).
+    """
+    graph = getattr(scene, 'graph', None)
+    if graph is not None:
+        return graph
+    graph = ScenarioGraph()
+    items = scene.items() if scene else []
+    for item in items:
+        if isinstance(item, BaseNode):
+            graph.add_node(item.id, item)
+    for item in items:
+        if isinstance(item, Connection):
+            edge = connection_edge(item)
+            if edge:
+                graph.add_edge(*edge)
+    return graph
+
+
+def scene_node_info(item):
+    """Доступ до вузла сцени для аналізу графа в core: (тип, властивості, macro_id)."""
+    return type(item).__name__, item.properties, getattr(item, 'macro_id', None)
+
+
 def populate_scene_from_data(scene, data, view, macros_data=None):
     """
     Заповнює сцену графічними елементами з наданих даних.
@@ -136,3 +193,20 @@ def extract_data_from_scene(scene):
               f"Comments: {len(scene_data['comments'])}, "
               f"Frames: {len(scene_data['frames'])}")
     return scene_data
+
+
+def extract_graph_data(scene):
+    """
+    Легкий знімок вузлів та з'єднань сцени ({'nodes', 'connections'}) для валідації поза GUI-потоком.
+    Будується з моделі графа; списки властивостей копіюються, тому знімок не залежить від сцени.
+    """
+    graph = scene_graph(scene)
+    nodes = []
+    for node_id, item in graph.nodes.items():
+        node_data = {'id': node_id, 'node_type': type(item).__name__, 'properties': list(item.properties)}
+        if isinstance(item, MacroNode):
+            node_data['macro_id'] = item.macro_id
+        nodes.append(node_data)
+    connections = [{'from_node': from_id, 'from_socket': from_socket, 'to_node': to_id, 'to_socket': to_socket}
+                   for from_id, from_socket, to_id, to_socket in graph.edges()]
+    return {'nodes': nodes, 'connections': connections}
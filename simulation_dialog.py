@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Діалог порівняння прогонів сценарію від усіх зон тригера (core.simulation.simulate_all_zones):
+рядок на зону з групою однакових результатів, статусом, віртуальною тривалістю та
+хронологією дій. Подвійний клік (або Enter) по рядку вибирає зону для покрокової симуляції.
+"""
+import logging
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QDialogButtonBox
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from core.simulation import FINISHED, STEP_LIMIT, format_clock
+
+log = logging.getLogger(__name__)
+
+# Роль даних рядка: ID зони
+ZONE_ID_ROLE = Qt.ItemDataRole.UserRole
+
+STATUS_LABELS = {FINISHED: "Завершено", STEP_LIMIT: "Ліміт кроків"}
+
+
+class ZoneComparisonDialog(QDialog):
+    zone_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Симуляція всіх зон тригера")
+        self.resize(820, 480)
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(5)
+        self.tree.setHeaderLabels(["Зона", "Група", "Результат", "Тривалість", "Дії"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.itemActivated.connect(self._on_item_activated)
+        layout.addWidget(self.tree)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.close)
+        layout.addWidget(buttons)
+
+    def set_runs(self, runs, zone_label=None, action_label=None):
+        """
+        Показує список core.simulation.ZoneRun.
+        zone_label(zone_id), action_label(node_id) -> підписи (за замовчуванням - ID).
+        """
+        self.tree.clear()
+        items = []
+        for run in runs:
+            trace = run.trace
+            actions = ", ".join(f"{format_clock(time)} {action_label(node_id) if action_label else node_id}"
+                                for time, node_id in trace.timeline())
+            item = QTreeWidgetItem([(zone_label(run.zone_id) if zone_label else None) or str(run.zone_id),
+                                    str(run.group), STATUS_LABELS.get(trace.status, trace.status),
+                                    format_clock(trace.duration), actions or "-"])
+            item.setData(0, ZONE_ID_ROLE, run.zone_id)
+            item.setToolTip(4, actions.replace(", ", "\n"))
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+        for column in range(4):
+            self.tree.resizeColumnToContents(column)
+        groups = len({run.group for run in runs})
+        self.summary_label.setText(f"Зон: {len(runs)}, різних результатів: {groups}. "
+                                   f"Подвійний клік по рядку - покрокова симуляція зони.")
+        log.debug(f"Zone comparison shown: {len(runs)} zones, {groups} groups.")
+
+    def _on_item_activated(self, item, column):
+        zone_id = item.data(0, ZONE_ID_ROLE)
+        if zone_id is not None:
+            self.zone_activated.emit(zone_id)
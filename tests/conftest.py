@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Спільні дані тестів ядра (core): тести запускаються з кореня репозиторію без Qt."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIG = {'devices': [{'id': 'd', 'zones': [{'id': 'z', 'name': 'Z'}], 'outputs': [{'id': 'o', 'name': 'O'}]}],
+          'users': []}
+
+
+def node(node_id, node_type, props=(), **extra):
+    return {'id': node_id, 'node_type': node_type, 'properties': list(props), **extra}
+
+
+def conn(from_node, to_node, from_socket='out', to_socket='in'):
+    return {'from_node': from_node, 'from_socket': from_socket, 'to_node': to_node, 'to_socket': to_socket}
+
+
+def simple_scenario(output_id='o'):
+    """Тригер -> увімкнення виходу."""
+    return {'nodes': [node('t', 'TriggerNode', [('zones', ['z'])]),
+                      node('a', 'ActivateOutputNode', [('output_id', output_id)])],
+            'connections': [conn('t', 'a')]}
+
+
+@pytest.fixture
+def project_data():
+    """Проект із сценаріями, частина яких має помилки (невідомий вихід)."""
+    scenarios = {f's{i}': simple_scenario('o' if i % 2 else 'missing') for i in range(40)}
+    return {'config': CONFIG, 'scenarios': scenarios, 'macros': {}}
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from core.binary_format import BinaryFormatError, encode_project, decode_project, read_project, write_project
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_round_trip(tmp_path, project_data, compress):
+    project_data['scenarios']['s0']['nodes'][0]['pos'] = (1.5, -2.0)
+    project_data['macros']['m'] = {'name': 'M', 'nodes': [], 'connections': [], 'inputs': [], 'outputs': [],
+                                   'blob': b'\x00\xff', 'flags': (True, None, 3)}
+    path = tmp_path / 'project.tsb'
+    write_project(str(path), project_data, compress=compress)
+    assert read_project(str(path)) == project_data
+
+
+def test_failed_write_keeps_existing_file(tmp_path, project_data):
+    path = tmp_path / 'project.tsb'
+    write_project(str(path), project_data)
+    before = path.read_bytes()
+    with pytest.raises(TypeError):
+        write_project(str(path), {'scenarios': {'bad': object()}})
+    assert path.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ['project.tsb']
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_corrupted_input_raises_binary_format_error(project_data, compress):
+    payload = encode_project(project_data, compress=compress)
+    corrupted = [b'', b'XXXX' + payload[4:], payload[:len(payload) // 2], payload[:9]]
+    for position in range(8, len(payload), max(1, len(payload) // 50)):
+        flipped = bytearray(payload)
+        flipped[position] ^= 0xA5
+        corrupted.append(bytes(flipped))
+    for data in corrupted:
+        try:
+            decode_project(data)
+        except BinaryFormatError:
+            pass # Будь-яка інша помилка (zlib.error, IndexError...) провалить тест
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from conftest import node, conn
+
+from core.compiler import ProgramCache, compile_scenario
+
+NODES = [node('t', 'TriggerNode', [('zones', ['z'])]),
+         node('a', 'ActivateOutputNode', [('output_id', 'o')]),
+         node('b', 'ActivateOutputNode', [('output_id', 'o')])]
+
+
+def test_program_cache_respects_connection_order():
+    cache = ProgramCache()
+    forward = compile_scenario({'nodes': NODES, 'connections': [conn('t', 'a'), conn('t', 'b')]}, {}, cache)
+    backward = compile_scenario({'nodes': NODES, 'connections': [conn('t', 'b'), conn('t', 'a')]}, {}, cache)
+    assert [target for target, _edge in forward.outputs[0][0]] == [1, 2]
+    assert [target for target, _edge in backward.outputs[0][0]] == [2, 1]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_program_cache_hit_for_same_content():
+    cache = ProgramCache()
+    data = {'nodes': NODES, 'connections': [conn('t', 'a'), conn('t', 'b')]}
+    first = compile_scenario(data, {}, cache)
+    moved = {'nodes': [{**n, 'pos': (10, 10)} for n in NODES], 'connections': list(data['connections'])}
+    assert compile_scenario(moved, {}, cache) is first
+    assert cache.hits == 1
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from conftest import CONFIG, node, conn
+
+from core.diagnostics import ERROR, WARNING, DiagnosticsStore, count_severities
+from core.validator import validate_scenario_data
+
+TRIGGER = node('t', 'TriggerNode', [('zones', ['z'])])
+CONDITION = node('c', 'ConditionNodeZoneState', [('zone_id', 'z'), ('state', 'Тривога')])
+
+
+def action(node_id):
+    return node(node_id, 'ActivateOutputNode', [('output_id', 'o')])
+
+
+def loop_findings(nodes, connections):
+    diagnostics = validate_scenario_data({'nodes': nodes, 'connections': connections}, CONFIG)
+    return {d.node_id: (d.rule, d.severity) for d in diagnostics}
+
+
+def test_cycle_without_delay_is_warning():
+    data = {'nodes': [TRIGGER, CONDITION, action('act'), node('s', 'SequenceNode')],
+            'connections': [conn('t', 'c'), conn('c', 'act', 'out_true'), conn('c', 's', 'out_false'), conn('s', 'c')]}
+    assert loop_findings(data['nodes'], data['connections']) == {'c': ('busy_cycle', WARNING),
+                                                                  's': ('busy_cycle', WARNING)}
+    assert count_severities(validate_scenario_data(data, CONFIG)) == (0, 2)
+
+
+def test_polling_cycle_with_delay_is_accepted():
+    findings = loop_findings([TRIGGER, CONDITION, action('act'), node('d', 'DelayNode')],
+                             [conn('t', 'c'), conn('c', 'act', 'out_true'), conn('c', 'd', 'out_false'), conn('d', 'c')])
+    assert findings == {}
+
+
+def test_exitless_cycle_is_error():
+    findings = loop_findings([TRIGGER, node('a', 'DelayNode'), node('b', 'SequenceNode')],
+                             [conn('t', 'a'), conn('a', 'b'), conn('b', 'a')])
+    assert findings['a'] == ('infinite_cycle', ERROR)
+    assert findings['t'] == ('never_terminates', ERROR)
+
+
+def test_unbounded_repeat_without_action_is_error():
+    findings = loop_findings([TRIGGER, node('r', 'RepeatNode', [('count', -1)]), node('d', 'DelayNode'), action('end')],
+                             [conn('t', 'r'), conn('r', 'd', 'out_loop'), conn('r', 'end', 'out_end')])
+    assert findings['r'] == ('unbounded_repeat', ERROR)
+
+
+def test_macro_recursion_is_error():
+    macro = {'nodes': [node('i', 'MacroInputNode', name='I'), node('mm', 'MacroNode', macro_id='r'),
+                       node('o', 'MacroOutputNode', name='O')],
+             'connections': [conn('i', 'mm', 'out', 'I'), conn('mm', 'o', 'O', 'in')],
+             'inputs': [{'name': 'I', 'macro_input_node_id': 'i'}],
+             'outputs': [{'name': 'O', 'macro_output_node_id': 'o'}]}
+    diagnostics = validate_scenario_data(
+        {'nodes': [TRIGGER, node('mn', 'MacroNode', macro_id='r'), action('act')],
+         'connections': [conn('t', 'mn', 'out', 'I'), conn('mn', 'act', 'O', 'in')]}, CONFIG, {'r': macro})
+    assert ('mn', 'macro_recursion', ERROR) in {(d.node_id, d.rule, d.severity) for d in diagnostics}
+
+
+def test_primary_prefers_error_over_earlier_warning():
+    store = DiagnosticsStore()
+    store.add('n', 'busy_cycle', "warning", WARNING)
+    assert store.primary('n').severity == WARNING
+    store.add('n', 'unreachable', "error")
+    assert store.primary('n').rule == 'unreachable'
+    assert store.error_count() == 1
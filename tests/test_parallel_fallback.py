@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import core.validator as validator
+import core.xml_codec as xml_codec
+from core.xml_codec import read_project_xml, write_project_xml
+
+
+def _broken_pool(error):
+    class BrokenExecutor:
+        def __init__(self, *args, **kwargs):
+            raise error
+    return BrokenExecutor
+
+
+@pytest.mark.parametrize('error', [OSError("no processes"), BrokenProcessPool("worker died")])
+def test_validator_falls_back_to_in_process(monkeypatch, project_data, error):
+    expected = validator.validate_project_data(project_data)
+    monkeypatch.setattr(validator, 'PARALLEL_MIN_SCENARIOS', 2)
+    monkeypatch.setattr(validator, 'ProcessPoolExecutor', _broken_pool(error))
+    report = validator.validate_project_parallel(project_data, workers=2)
+    assert report == expected
+    assert list(report['scenarios']) == list(project_data['scenarios'])
+
+
+def test_parser_falls_back_to_sequential_decoding(monkeypatch, tmp_path, project_data):
+    path = str(tmp_path / 'project.xml')
+    write_project_xml(path, project_data)
+    expected = read_project_xml(path)
+    monkeypatch.setattr(xml_codec, 'ProcessPoolExecutor', _broken_pool(OSError("no processes")))
+    assert read_project_xml(path, workers=2) == expected
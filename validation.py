@@ -1,63 +1,312 @@
 # -*- coding: utf-8 -*-
 import logging
-from PyQt6.QtCore import QTimer # Потрібен для QTimer.singleShot
+from PyQt6.QtCore import QTimer, QObject, QRunnable, QThreadPool, pyqtSignal # QTimer.singleShot та фонова валідація
 
 # Імпортуємо необхідні типи вузлів
 from nodes import (BaseNode, TriggerNode, ActivateOutputNode, DeactivateOutputNode,
-                   SendSMSNode, MacroInputNode, MacroOutputNode, MacroNode, Connection)
+                   SendSMSNode, MacroInputNode, MacroOutputNode, MacroNode, RepeatNode, Connection)
 from constants import EDIT_MODE_SCENARIO, EDIT_MODE_MACRO # Потрібні для визначення режиму
+from scene_utils import scene_graph, scene_node_info, extract_graph_data # Модель графа сцени (вузли за ID, списки суміжності)
+from core.graph import ScenarioGraph, NODE_CHANGED, EDGE_ADDED, macro_socket_summaries # Записи журналу змін графа
+# Повідомлення логічних перевірок спільні з валідатором даних у core
+from core.validator import (MSG_NO_TRIGGER, MSG_MULTIPLE_TRIGGERS, MSG_UNREACHABLE, MSG_UNTERMINATED,
+                            MSG_INPUT_WITHOUT_OUTPUT,
+                            ValidationCancelled, validate_scenario_graph, validate_project_parallel)
+from core.diagnostics import Diagnostic, DiagnosticsStore
+from core.validation_cache import shared_cache, scenario_cache_key
+from core.loop_analysis import analyze_loops, LOOP_RULES
 
 log = logging.getLogger(__name__)
 
 # --- Функції валідації сценарію ---
 
-def validate_scenario_on_scene(scene, config):
+TERMINAL_NODE_TYPES = (ActivateOutputNode, DeactivateOutputNode, SendSMSNode)
+
+
+class ScenarioValidationState:
+    """
+    Результат останньої повної/інкрементної валідації сценарію на сцені.
+    Зберігається в EditorScene.validation_state і скидається при очищенні сцени.
+    """
+    __slots__ = ('config_version', 'trigger_id', 'reachable', 'macro_node_ids', 'loop_diagnostics')
+
+    def __init__(self, config_version, trigger_id, reachable, macro_node_ids, loop_diagnostics=None):
+        self.config_version = config_version
+        self.trigger_id = trigger_id
+        self.reachable = reachable # Множина ID вузлів, досяжних від тригера
+        self.macro_node_ids = macro_node_ids # MacroNode залежать від визначень макросів - перевіряються щоразу
+        self.loop_diagnostics = loop_diagnostics or {} # Останній результат analyze_loops {node_id: Diagnostic}
+
+
+class _ValidationTicket:
+    """Позначка запуску фонової валідації; новіший запуск скасовує попередній."""
+    __slots__ = ('cancelled',)
+
+    def __init__(self):
+        self.cancelled = False
+
+
+class _ScenarioValidationTask(QRunnable):
+    """Валідує знімок даних сценарію у потоці QThreadPool (без доступу до елементів сцени)."""
+
+    def __init__(self, ticket, snapshot, config, macros, result_signal):
+        super().__init__()
+        self.ticket = ticket
+        self.snapshot = snapshot
+        self.config = config
+        self.macros = macros
+        self.result_signal = result_signal
+
+    def run(self):
+        try:
+            graph = ScenarioGraph.from_data(self.snapshot, self.macros)
+            report = validate_scenario_graph(graph, self.config, self.macros, lambda: self.ticket.cancelled)
+        except ValidationCancelled:
+            log.debug("Background scenario validation cancelled.")
+            return
+        except Exception as e:
+            log.error(f"Background scenario validation failed: {e}", exc_info=True)
+            report = None # GUI виконає повну перевірку на сцені
+        if self.ticket.cancelled:
+            return
+        try:
+            self.result_signal.emit(self.ticket, report)
+        except RuntimeError: # Сцену (і власника сигналу) вже видалено
+            pass
+
+
+class BackgroundScenarioValidator(QObject):
+    """
+    Повна валідація сценарію у фоновому потоці на знімку даних (extract_graph_data).
+    Результат (список Diagnostic) застосовується до вузлів сцени одним пакетом у GUI-потоці;
+    новий запуск або cancel() відкидає результат попереднього.
+    Результати кешуються за хешем вмісту знімка (core.validation_cache.shared_cache), тому
+    повернення до незміненого сценарію застосовує діагностики одразу, без фонового запуску.
+    """
+    result_ready = pyqtSignal(object, object) # (ticket, ScenarioReport або None)
+
+    def __init__(self, scene):
+        super().__init__(scene)
+        self.scene = scene
+        self._ticket = None
+        self._config = None
+        self._macros = None
+        self._cache_key = None
+        self.result_ready.connect(self._apply_result) # Queued: сигнал надходить з потоку пулу
+
+    def is_running(self):
+        return self._ticket is not None
+
+    def cancel(self):
+        if self._ticket is not None:
+            self._ticket.cancelled = True
+            self._ticket = None
+
+    def start(self, config, macros):
+        self.cancel()
+        graph = self.scene.graph
+        graph.take_changes() # Знімок охоплює всі зміни на цей момент
+        self.scene.validation_state = None
+        # Сокети MacroNode звіряються з визначенням макросу в GUI-потоці (змінює елементи сцени)
+        for item in list(graph.nodes.values()):
+            if isinstance(item, MacroNode):
+                _node_error(item, config)
+        snapshot = extract_graph_data(self.scene)
+        self._config, self._macros = config, macros
+        self._cache_key = scenario_cache_key(snapshot, config, macros)
+        cached = shared_cache.get(self._cache_key)
+        if cached is not None:
+            log.debug(f"Scenario validation result taken from cache ({len(snapshot['nodes'])} nodes).")
+            self._apply_report(cached)
+            return
+        self._ticket = _ValidationTicket()
+        log.debug(f"Starting background scenario validation of {len(snapshot['nodes'])} nodes.")
+        QThreadPool.globalInstance().start(
+            _ScenarioValidationTask(self._ticket, snapshot, config, macros, self.result_ready))
+
+    def _apply_result(self, ticket, report):
+        if ticket is not self._ticket:
+            log.debug("Discarding stale background validation result.")
+            return
+        self._ticket = None
+        if report is None:
+            _validate_scenario(self.scene, self._config, self._macros, full=True, background=False)
+            return
+        self._apply_report(shared_cache.put(self._cache_key, report))
+
+    def _apply_report(self, report):
+        self.scene.diagnostics.load(report.diagnostics)
+        apply_diagnostics(self.scene, self.scene.diagnostics)
+        macro_node_ids = {node_id for node_id, item in self.scene.graph.nodes.items() if isinstance(item, MacroNode)}
+        log.debug(f"Background scenario validation applied: {len(report.diagnostics)} diagnostics.")
+
+        if report.trigger_id is not None:
+            loop_diagnostics = {d.node_id: d for d in report.diagnostics if d.rule in LOOP_RULES}
+            self.scene.validation_state = ScenarioValidationState(
+                getattr(self._config, 'version', None), report.trigger_id, set(report.reachable), macro_node_ids,
+                loop_diagnostics)
+            # Зміни після знімка (без нового запиту валідації) дочищаються інкрементно
+            _validate_scenario(self.scene, self._config, self._macros)
+
+
+def _scene_diagnostics(scene):
+    """
+    Повертає (реєстр діагностик, owned): реєстр EditorScene або тимчасовий для
+    звичайної QGraphicsScene (тоді стан застосовується до всіх вузлів).
+    """
+    store = getattr(scene, 'diagnostics', None)
+    return (store, True) if store is not None else (DiagnosticsStore(), False)
+
+def apply_diagnostics(scene, store, all_nodes=False):
+    """
+    Застосовує до вузлів сцени одним пакетом діагностики, змінені з попереднього застосування
+    (або до всіх вузлів, якщо all_nodes=True), і повідомляє панель (EditorScene.diagnostics_changed).
+    """
+    changed = store.take_changed()
+    nodes = scene_graph(scene).nodes
+    for node_id in (list(nodes) if all_nodes else changed):
+        node = nodes.get(node_id)
+        if node is None: # Вузол уже видалено зі сцени
+            continue
+        diagnostic = store.primary(node_id)
+        if diagnostic is None:
+            node.set_validation_state(True)
+        else:
+            node.set_validation_state(False, diagnostic.message, diagnostic.severity)
+    if changed and hasattr(scene, 'diagnostics_changed'):
+        scene.diagnostics_changed.emit(changed)
+
+
+def validate_scenario_on_scene(scene, config, full=False, macros=None):
     """
     Запускає валідацію сценарію на вказаній сцені з невеликою затримкою.
+    Якщо сцена веде журнал змін графа (EditorScene), перевіряються лише змінені вузли
+    та їхні сусіди, а повна перевірка виконується у фоновому потоці на знімку даних;
+    full=True примусово виконує повну перевірку. macros - визначення макросів проекту (знімок).
     """
     if not scene:
         log.warning("validate_scenario_on_scene: Scene is None.")
         return
     # Використовуємо singleShot для уникнення проблем з оновленням UI
-    QTimer.singleShot(1, lambda: _perform_scenario_validation(scene, config))
+    QTimer.singleShot(1, lambda: _validate_scenario(scene, config, macros, full))
 
-def _perform_scenario_validation(scene, config):
+def validate_scenario_now(scene, config, macros=None):
+    """
+    Синхронна валідація в GUI-потоці (наприклад, перед запуском симуляції):
+    скасовує фонову перевірку і після повернення стан вузлів актуальний.
+    """
+    if not scene:
+        log.warning("validate_scenario_now: Scene is None.")
+        return
+    background = getattr(scene, 'background_validation', None)
+    if background is not None and background.is_running():
+        background.cancel()
+        scene.validation_state = None
+    _validate_scenario(scene, config, macros, background=False)
+
+def _validate_scenario(scene, config, macros=None, full=False, background=True):
+    """
+    Обирає інкрементну або повну валідацію та зберігає стан для наступного проходу.
+    Повна перевірка EditorScene виконується у фоновому потоці, якщо background=True.
+    """
+    graph = scene_graph(scene)
+    changes = graph.take_changes()
+    state = getattr(scene, 'validation_state', None)
+    config_version = getattr(config, 'version', None) # Лише ConfigIndex має версію
+
+    if (not full and state is not None and changes is not None and config_version is not None
+            and state.config_version == config_version):
+        if not changes and not state.macro_node_ids:
+            log.debug("Scenario validation skipped: no graph changes since last pass.")
+            return
+        if _perform_incremental_validation(scene, config, state, changes, macros):
+            return
+        log.debug("Incremental validation not applicable, falling back to a full pass.")
+
+    if background and hasattr(scene, 'background_validation'):
+        if scene.background_validation is None:
+            scene.background_validation = BackgroundScenarioValidator(scene)
+        scene.background_validation.start(config, macros)
+        return
+
+    state = _perform_scenario_validation(scene, config, macros)
+    if hasattr(scene, 'validation_state'):
+        if state is not None:
+            state.config_version = config_version
+        scene.validation_state = state
+
+def _node_error(item, config):
+    """Крок 1: індивідуальна валідація вузла. Повертає Diagnostic або None."""
+    try:
+        error = item.validation_error(config)
+    except Exception as e:
+        log.error(f"  Error validating node {item.id}: {e}", exc_info=True)
+        return Diagnostic(item.id, 'validation_exception', f"Помилка валідації: {e}") # Позначаємо вузол як невалідний
+    log.debug(f"  Node {item.id} ({item.node_type}) validated. Error: {error[0] if error else None}")
+    return Diagnostic(item.id, *error) if error else None
+
+def _graph_logic_error(node, graph, reachable_ids, trigger_node, error):
+    """
+    Крок 4: недосяжний вузол (перекриває помилку вузла) або незавершений ланцюжок
+    (лише якщо інших помилок немає). Повертає підсумкову діагностику вузла або None.
+    """
+    is_reachable = node.id in reachable_ids
+    is_terminal = isinstance(node, TERMINAL_NODE_TYPES)
+    # MacroNode вважається термінальним, якщо у нього немає виходів АБО всі виходи підключені
+    is_macro_terminal = isinstance(node, MacroNode) and not node.get_output_sockets()
+
+    has_connected_outputs = bool(graph.connected_outputs(node.id))
+
+    if not is_reachable:
+        # Недосяжні вузли - це завжди помилка (крім самого тригера, якщо щось пішло не так)
+        if node is not trigger_node:
+             log.warning(f"  Node {node.id} is unreachable.")
+             return Diagnostic(node.id, 'unreachable', MSG_UNREACHABLE)
+    elif not is_terminal and not is_macro_terminal and not has_connected_outputs and error is None:
+         # Досяжний, але не термінальний і не має вихідних з'єднань
+         log.warning(f"  Node {node.id} is reachable but has no connected outputs (and is not terminal).")
+         return Diagnostic(node.id, 'unterminated', MSG_UNTERMINATED)
+    return error
+
+def _perform_scenario_validation(scene, config, macros=None):
     """
-    Виконує детальну валідацію сценарію на сцені.
+    Виконує детальну валідацію сценарію на сцені, записує результат у реєстр діагностик
+    і застосовує його до вузлів. macros - визначення макросів для аналізу циклів. Повертає ScenarioValidationState або None, якщо тригер
+    відсутній чи невалідний.
     """
     log.debug("Starting scenario validation...")
     if not scene:
         log.warning("_perform_scenario_validation: Scene is None.")
-        return
+        return None
+
+    store, owned = _scene_diagnostics(scene)
+    errors, state = _collect_scenario_errors(scene_graph(scene), config, macros)
+    store.load(errors.values())
+    apply_diagnostics(scene, store, all_nodes=not owned)
+    log.debug(f"Scenario validation finished: {len(errors)} nodes with errors.")
+    return state
 
+def _collect_scenario_errors(graph, config, macros=None):
+    """Повна перевірка графа сцени. Повертає ({node_id: Diagnostic}, ScenarioValidationState або None)."""
     all_nodes = []
     trigger_node = None
+    errors = {}
 
     # 1. Базова валідація кожного вузла
     log.debug("Step 1: Validating individual nodes...")
-    items_on_scene = scene.items() # Отримуємо список один раз
-    for item in items_on_scene:
+    for item in list(graph.nodes.values()): # Лише вузли, без сокетів, з'єднань та підписів
         if isinstance(item, BaseNode):
             all_nodes.append(item)
-            try:
-                # Спочатку скидаємо старі помилки валідації, пов'язані з логікою (недосяжність, незавершеність)
-                current_tooltip = item.error_icon.toolTip()
-                if current_tooltip in ["Вузол недосяжний від тригера.", "Ланцюжок логіки не завершено дією."]:
-                     item.set_validation_state(True) # Скидаємо, якщо немає інших помилок
-
-                # Викликаємо індивідуальну валідацію вузла
-                item.validate(config)
-                log.debug(f"  Node {item.id} ({item.node_type}) validated. Error visible: {item.error_icon.isVisible()}")
-            except Exception as e:
-                log.error(f"  Error validating node {item.id}: {e}", exc_info=True)
-                item.set_validation_state(False, f"Помилка валідації: {e}") # Позначаємо вузол як невалідний
+            error = _node_error(item, config)
+            if error:
+                errors[item.id] = error
 
             if isinstance(item, TriggerNode):
                 if trigger_node is None:
                     trigger_node = item
                 else:
                      log.warning("Multiple TriggerNodes found!") # Хоча логіка додавання це запобігає
-                     item.set_validation_state(False, "У сценарії може бути лише один тригер.")
+                     errors[item.id] = Diagnostic(item.id, 'multiple_triggers', MSG_MULTIPLE_TRIGGERS)
 
     # 2. Перевірка наявності та валідності тригера
     log.debug("Step 2: Checking trigger node...")
@@ -65,69 +314,100 @@ def _perform_scenario_validation(scene, config):
         log.warning("Scenario validation failed: TriggerNode not found.")
         # Позначаємо всі інші вузли (якщо вони ще не мають помилок)
         for node in all_nodes:
-            if not isinstance(node, TriggerNode) and not node.error_icon.isVisible():
-                node.set_validation_state(False, "В сценарії відсутній тригер.")
-        return # Подальша перевірка неможлива
+            if node.id not in errors:
+                errors[node.id] = Diagnostic(node.id, 'no_trigger', MSG_NO_TRIGGER)
+        return errors, None # Подальша перевірка неможлива
 
-    if trigger_node.error_icon.isVisible():
+    if trigger_node.id in errors:
         log.warning(f"Scenario validation stopped: TriggerNode {trigger_node.id} is invalid.")
-        return # Якщо сам тригер невалідний, перевірка досяжності не має сенсу
+        return errors, None # Якщо сам тригер невалідний, перевірка досяжності не має сенсу
 
     # 3. Перевірка досяжності вузлів від тригера
     log.debug("Step 3: Checking node reachability from trigger...")
-    reachable_nodes = {trigger_node}
-    queue = [trigger_node]
-    processed_connections = set() # Для уникнення зациклення в складних графах
-
-    while queue:
-        current_node = queue.pop(0)
-        log.debug(f"  Checking reachability from: {current_node.id}")
-        for socket in current_node.get_output_sockets():
-            for conn in socket.connections:
-                 # Перевірка валідності з'єднання та цільового вузла
-                 if conn in processed_connections or not conn.end_socket or not conn.end_socket.parentItem():
-                      # log.debug(f"    Skipping connection {conn} (processed or invalid end)")
-                      continue
-
-                 next_node = conn.end_socket.parentItem()
-                 if isinstance(next_node, BaseNode) and next_node not in reachable_nodes:
-                     log.debug(f"    Node {next_node.id} is reachable.")
-                     reachable_nodes.add(next_node)
-                     queue.append(next_node)
-                 processed_connections.add(conn)
-
+    # BFS по моделі графа: O(вузлів + ребер) без обходу елементів сцени
+    # MacroNode - "чорні скриньки": виходи досяжні лише з тих входів, до яких дійшло виконання
+    reachable_ids = graph.reachable_from(trigger_node.id, macro_socket_summaries(graph, macros, scene_node_info))
+    log.debug(f"  {len(reachable_ids)} of {len(all_nodes)} nodes are reachable.")
 
     # 4. Позначення недосяжних вузлів та перевірка незавершених ланцюжків
     log.debug("Step 4: Marking unreachable nodes and checking unterminated branches...")
-    TERMINAL_NODE_TYPES = (ActivateOutputNode, DeactivateOutputNode, SendSMSNode)
-
     for node in all_nodes:
-        is_reachable = node in reachable_nodes
-        is_terminal = isinstance(node, TERMINAL_NODE_TYPES)
-        # MacroNode вважається термінальним, якщо у нього немає виходів АБО всі виходи підключені
-        is_macro_terminal = isinstance(node, MacroNode) and not node.get_output_sockets()
-
-        has_connected_outputs = any(sock.connections for sock in node.get_output_sockets())
-
-        if not is_reachable:
-            # Недосяжні вузли - це завжди помилка (крім самого тригера, якщо щось пішло не так)
-            if node is not trigger_node:
-                 log.warning(f"  Node {node.id} is unreachable.")
-                 node.set_validation_state(False, "Вузол недосяжний від тригера.")
-        elif not is_terminal and not is_macro_terminal and not has_connected_outputs:
-             # Досяжний, але не термінальний і не має вихідних з'єднань
-             log.warning(f"  Node {node.id} is reachable but has no connected outputs (and is not terminal).")
-             # Показуємо помилку тільки якщо немає іншої помилки від validate()
-             if not node.error_icon.isVisible():
-                  node.set_validation_state(False, "Ланцюжок логіки не завершено дією.")
-        # else: # Вузол досяжний і або термінальний, або має виходи
-        #      # Якщо раніше була помилка про незавершеність, а тепер все ОК, скидаємо її
-        #      if node.error_icon.toolTip() == "Ланцюжок логіки не завершено дією." and not node.error_icon.isVisible():
-        #           log.debug(f"  Clearing 'unterminated branch' error for node {node.id}")
-        #           node.set_validation_state(True) # Скидаємо ТІЛЬКИ ЦЮ помилку
-
-
-    log.debug("Scenario validation finished.")
+        error = _graph_logic_error(node, graph, reachable_ids, trigger_node, errors.get(node.id))
+        if error:
+            errors[node.id] = error
+
+    # 5. Цикли та нескінченне виконання (з розгорнутими макросами)
+    log.debug("Step 5: Checking cycles and non-terminating paths...")
+    loop_diagnostics = analyze_loops(graph, macros, scene_node_info)
+    for node_id, diagnostic in loop_diagnostics.items():
+        errors.setdefault(node_id, diagnostic)
+
+    macro_node_ids = {node.id for node in all_nodes if isinstance(node, MacroNode)}
+    return errors, ScenarioValidationState(None, trigger_node.id, reachable_ids, macro_node_ids, loop_diagnostics)
+
+def _perform_incremental_validation(scene, config, state, changes, macros=None):
+    """
+    Повторно валідує лише вузли, зачеплені змінами графа (змінені вузли, кінці доданих/видалених
+    з'єднань, вузли зі зміненою досяжністю), та MacroNode. Досяжність оновлюється інкрементно
+    (у сценаріях з MacroNode - перераховується за їхніми зведеннями),
+    у реєстрі діагностик замінюються лише записи зачеплених вузлів. Аналіз циклів глобальний,
+    тому повторюється лише після зміни з'єднань або вузла "Повтор"; зачепленими стають вузли,
+    чия діагностика циклів змінилась.
+    Повертає False, якщо потрібна повна перевірка (змінився набір тригерів або тригер став невалідним).
+    """
+    dirty_ids, added_edges, removed_edges = set(), [], []
+    for kind, value in changes:
+        if kind == NODE_CHANGED:
+            dirty_ids.add(value)
+        else:
+            dirty_ids.update((value[0], value[2]))
+            (added_edges if kind == EDGE_ADDED else removed_edges).append(value)
+
+    graph = scene.graph
+    store = scene.diagnostics
+    nodes = graph.nodes
+    trigger_node = nodes.get(state.trigger_id)
+    if not isinstance(trigger_node, TriggerNode):
+        return False
+    for node_id in dirty_ids:
+        if node_id != state.trigger_id and isinstance(nodes.get(node_id), TriggerNode):
+            return False # Новий тригер - перевірка на дублікати потребує повного проходу
+        if isinstance(nodes.get(node_id), MacroNode):
+            state.macro_node_ids.add(node_id)
+        else:
+            state.macro_node_ids.discard(node_id)
+    if state.trigger_id in dirty_ids and _node_error(trigger_node, config):
+        return False
+
+    if state.macro_node_ids:
+        # Досяжність через MacroNode залежить від їхніх зведень - перераховується повністю
+        reachable = graph.reachable_from(state.trigger_id, macro_socket_summaries(graph, macros, scene_node_info))
+        changed_reachability = reachable ^ state.reachable
+        state.reachable = reachable
+    else:
+        changed_reachability = graph.update_reachable(state.reachable, state.trigger_id, added_edges, removed_edges)
+    affected_ids = dirty_ids | changed_reachability | state.macro_node_ids
+    if added_edges or removed_edges or any(isinstance(nodes.get(node_id), RepeatNode) for node_id in dirty_ids):
+        loop_diagnostics = analyze_loops(graph, macros, scene_node_info)
+        previous = state.loop_diagnostics
+        affected_ids |= {node_id for node_id in previous.keys() | loop_diagnostics.keys()
+                         if previous.get(node_id) != loop_diagnostics.get(node_id)}
+        state.loop_diagnostics = loop_diagnostics
+    affected_ids &= nodes.keys()
+    log.debug(f"Incremental scenario validation: {len(affected_ids)} of {len(nodes)} nodes affected "
+              f"({len(changes)} graph changes).")
+    for node_id in dirty_ids - nodes.keys(): # Видалені вузли
+        store.clear_node(node_id)
+    for node_id in affected_ids:
+        node = nodes[node_id]
+        if not isinstance(node, BaseNode):
+            continue
+        error = _node_error(node, config) if node is not trigger_node else None
+        error = _graph_logic_error(node, graph, state.reachable, trigger_node, error)
+        error = error or state.loop_diagnostics.get(node_id)
+        store.replace_node(node_id, [error] if error else [])
+    apply_diagnostics(scene, store)
+    return True
 
 
 # --- Функції валідації макросу ---
@@ -143,40 +423,28 @@ def validate_macro_on_scene(scene, config):
 
 def _perform_macro_validation(scene, config):
     """
-    Виконує детальну валідацію макросу на сцені.
+    Виконує детальну валідацію макросу на сцені, записує результат у реєстр діагностик
+    і застосовує його до вузлів.
     """
     log.debug("Starting macro validation...")
     if not scene:
         log.warning("_perform_macro_validation: Scene is None.")
         return
 
-    all_nodes = []
+    store, owned = _scene_diagnostics(scene)
+    errors = {}
     input_nodes = []
     output_nodes = []
+    graph = scene_graph(scene)
+    graph.take_changes() # Макрос завжди перевіряється повністю - журнал змін не потрібен
 
     # 1. Базова валідація та збір вузлів входу/виходу
     log.debug("Step 1: Validating individual nodes and collecting IO nodes...")
-    items_on_scene = scene.items()
-    for item in items_on_scene:
+    for item in list(graph.nodes.values()):
         if isinstance(item, BaseNode):
-            all_nodes.append(item)
-            try:
-                # Скидаємо старі помилки, специфічні для макро-валідації
-                current_tooltip = item.error_icon.toolTip()
-                macro_specific_errors = [
-                     "Ім'я входу", "Ім'я виходу", # Частина повідомлення про дублікат
-                     "нікуди не підключено", # Вхід не підключено
-                     "нічого не підключено" # До виходу нічого не підключено
-                ]
-                # Перевіряємо, чи починається tooltip з однієї з фраз
-                if any(current_tooltip.startswith(err) for err in macro_specific_errors):
-                     item.set_validation_state(True) # Скидаємо, якщо немає інших помилок
-
-                item.validate(config) # Індивідуальна валідація
-                log.debug(f"  Node {item.id} ({item.node_type}) validated. Error visible: {item.error_icon.isVisible()}")
-            except Exception as e:
-                log.error(f"  Error validating node {item.id}: {e}", exc_info=True)
-                item.set_validation_state(False, f"Помилка валідації: {e}")
+            error = _node_error(item, config) # Індивідуальна валідація
+            if error:
+                errors[item.id] = error
 
             if isinstance(item, MacroInputNode):
                 input_nodes.append(item)
@@ -197,13 +465,13 @@ def _perform_macro_validation(scene, config):
     for node in input_nodes:
         if input_name_counts.get(node.node_name, 1) > 1:
             log.warning(f"  Duplicate input name found: {node.node_name} (Node ID: {node.id})")
-            node.set_validation_state(False, f"Ім'я входу '{node.node_name}' не є унікальним.")
+            errors[node.id] = Diagnostic(node.id, 'duplicate_io_name', f"Ім'я входу '{node.node_name}' не є унікальним.")
             duplicate_found = True
 
     for node in output_nodes:
         if output_name_counts.get(node.node_name, 1) > 1:
             log.warning(f"  Duplicate output name found: {node.node_name} (Node ID: {node.id})")
-            node.set_validation_state(False, f"Ім'я виходу '{node.node_name}' не є унікальним.")
+            errors[node.id] = Diagnostic(node.id, 'duplicate_io_name', f"Ім'я виходу '{node.node_name}' не є унікальним.")
             duplicate_found = True
 
     if duplicate_found:
@@ -214,21 +482,84 @@ def _perform_macro_validation(scene, config):
     log.debug("Step 3: Checking IO node connections...")
     for inp_node in input_nodes:
         # Вхід повинен мати вихідний сокет і хоча б одне з'єднання з нього
-        if not inp_node.out_socket or not inp_node.out_socket.connections:
-            if not inp_node.error_icon.isVisible(): # Не перезаписуємо інші помилки
+        if not graph.successors(inp_node.id, "out"):
+            if inp_node.id not in errors: # Не перезаписуємо інші помилки
                 log.warning(f"  Input node '{inp_node.node_name}' (ID: {inp_node.id}) has no outgoing connection.")
-                inp_node.set_validation_state(False, f"Вхід '{inp_node.node_name}' нікуди не підключено.")
+                errors[inp_node.id] = Diagnostic(inp_node.id, 'io_unconnected',
+                                                 f"Вхід '{inp_node.node_name}' нікуди не підключено.")
 
     for outp_node in output_nodes:
         # Вихід повинен мати вхідний сокет і хоча б одне з'єднання до нього
-        if not outp_node.in_socket or not outp_node.in_socket.connections:
-            if not outp_node.error_icon.isVisible(): # Не перезаписуємо інші помилки
+        if not graph.predecessors(outp_node.id, "in"):
+            if outp_node.id not in errors: # Не перезаписуємо інші помилки
                 log.warning(f"  Output node '{outp_node.node_name}' (ID: {outp_node.id}) has no incoming connection.")
-                outp_node.set_validation_state(False, f"До виходу '{outp_node.node_name}' нічого не підключено.")
+                errors[outp_node.id] = Diagnostic(outp_node.id, 'io_unconnected',
+                                                  f"До виходу '{outp_node.node_name}' нічого не підключено.")
+
+    # 4. Перевірка досяжності виходів від входів
+    log.debug("Step 4: Checking reachability from inputs to outputs...")
+    # Один прохід по конденсації графа замість обходу від кожного входу
+    if output_nodes:
+        reachable = graph.reachable_subsets([n.id for n in input_nodes], [n.id for n in output_nodes])
+        for inp_node in input_nodes:
+            if not reachable[inp_node.id] and inp_node.id not in errors:
+                log.warning(f"  Input node '{inp_node.node_name}' (ID: {inp_node.id}) reaches no macro output.")
+                errors[inp_node.id] = Diagnostic(inp_node.id, 'io_no_output',
+                                                 MSG_INPUT_WITHOUT_OUTPUT.format(name=inp_node.node_name))
+
+    store.load(errors.values())
+    apply_diagnostics(scene, store, all_nodes=not owned)
+    log.debug("Macro validation finished.")
 
-    # 4. (Опціонально) Перевірка досяжності всіх виходів від усіх входів
-    # log.debug("Step 4: Checking reachability from inputs to outputs (optional)...")
-    # Ця перевірка складніша і може бути додана пізніше, якщо буде потрібна.
-    # Вона вимагає обходу графа від кожного входу.
 
-    log.debug("Macro validation finished.")
+# --- Валідація всього проекту ---
+
+class _ProjectValidationTask(QRunnable):
+    """Валідує знімок даних усього проекту (пул процесів запускається з потоку QThreadPool)."""
+
+    def __init__(self, project_data, result_signal):
+        super().__init__()
+        self.project_data = project_data
+        self.result_signal = result_signal
+
+    def run(self):
+        try:
+            report = validate_project_parallel(self.project_data, cache=shared_cache)
+        except Exception as e:
+            log.error(f"Project validation failed: {e}", exc_info=True)
+            report = None
+        try:
+            self.result_signal.emit(report)
+        except RuntimeError: # Власника сигналу вже видалено
+            pass
+
+
+class BackgroundProjectValidator(QObject):
+    """
+    Перевіряє всі сценарії та макроси проекту на рівні даних, не блокуючи GUI.
+    finished передає звіт core.validator.validate_project_data або None, якщо перевірка не вдалася.
+    """
+    finished = pyqtSignal(object)
+    _result_ready = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._running = False
+        self._result_ready.connect(self._on_result)
+
+    def is_running(self):
+        return self._running
+
+    def start(self, project_data):
+        """Запускає перевірку знімка project_data. Повертає False, якщо перевірка вже виконується."""
+        if self._running:
+            return False
+        self._running = True
+        log.info(f"Starting project validation of {len(project_data.get('scenarios', {}))} scenarios.")
+        QThreadPool.globalInstance().start(_ProjectValidationTask(project_data, self._result_ready))
+        return True
+
+    def _on_result(self, report):
+        self._running = False
+        self.finished.emit(report)
+
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Діалог зі звітом перевірки всього проекту: діагностики згруповані за сценаріями
+та макросами, подвійний клік (або Enter) по рядку переходить до вузла.
+"""
+import logging
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QDialogButtonBox
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from core.events import SCENARIO, MACRO
+from core.diagnostics import count_severities
+
+log = logging.getLogger(__name__)
+
+# Роль даних рядка діагностики: (kind, owner_id, node_id)
+TARGET_ROLE = Qt.ItemDataRole.UserRole
+
+
+class ProjectValidationDialog(QDialog):
+    # kind (core.events.SCENARIO або MACRO), ID сценарію/макросу, ID вузла
+    node_activated = pyqtSignal(str, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Перевірка проекту")
+        self.resize(720, 480)
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(3)
+        self.tree.setHeaderLabels(["Вузол", "Правило", "Повідомлення"])
+        self.tree.setRootIsDecorated(True)
+        self.tree.itemActivated.connect(self._on_item_activated)
+        layout.addWidget(self.tree)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.close)
+        layout.addWidget(buttons)
+
+    def set_report(self, report, macro_names=None):
+        """
+        Показує звіт core.validator.validate_project_data.
+        macro_names - {macro_id: name} для підписів макросів.
+        """
+        macro_names = macro_names or {}
+        self.tree.clear()
+        groups = [(SCENARIO, scenario_id, f"Сценарій: {scenario_id}", diagnostics)
+                  for scenario_id, diagnostics in report.get('scenarios', {}).items()]
+        groups += [(MACRO, macro_id, f"Макрос: {macro_names.get(macro_id, macro_id)}", diagnostics)
+                   for macro_id, diagnostics in report.get('macros', {}).items()]
+
+        total = errors = warnings = 0
+        for kind, owner_id, title, diagnostics in groups:
+            if not diagnostics:
+                continue
+            total += len(diagnostics)
+            group_errors, group_warnings = count_severities(diagnostics)
+            errors += group_errors
+            warnings += group_warnings
+            group_item = QTreeWidgetItem([f"{title} ({len(diagnostics)})"])
+            group_item.setFirstColumnSpanned(True)
+            for diagnostic in diagnostics:
+                child = QTreeWidgetItem([str(diagnostic.node_id), diagnostic.rule, diagnostic.message])
+                child.setData(0, TARGET_ROLE, (kind, owner_id, diagnostic.node_id))
+                child.setToolTip(2, diagnostic.message)
+                group_item.addChild(child)
+            self.tree.addTopLevelItem(group_item)
+            group_item.setFirstColumnSpanned(True)
+
+        checked = f"Перевірено сценаріїв: {len(report.get('scenarios', {}))}, макросів: {len(report.get('macros', {}))}."
+        if total:
+            warnings_text = f", попереджень: {warnings}" if warnings else ""
+            self.summary_label.setText(f"{checked} Знайдено помилок: {errors}{warnings_text} у {self.tree.topLevelItemCount()} об'єктах. "
+                                       f"Подвійний клік по рядку - перехід до вузла.")
+            self.tree.expandAll()
+            self.tree.resizeColumnToContents(0)
+            self.tree.resizeColumnToContents(1)
+        else:
+            self.summary_label.setText(f"{checked} Помилок не знайдено.")
+        log.debug(f"Project validation report shown: {total} diagnostics.")
+
+    def _on_item_activated(self, item, column):
+        target = item.data(0, TARGET_ROLE)
+        if target:
+            self.node_activated.emit(*target)